@@ -0,0 +1,107 @@
+"""
+Скан против seek: MONTH()/DAY()/YEAR() над колонкой vs полуоткрытый диапазон по transaction_timestamp.
+
+    cd backend
+    python -m bench.bench_date_predicates                       # на текущей таблице transactions
+    python -m bench.bench_date_predicates --seed-rows 5000000   # размножить данные в transactions_bench
+
+Для каждого случая печатает EXPLAIN (type/key/rows) и медиану времени выполнения.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from config import DB_URL
+from sql.schema import create_indexes
+
+BENCH_TABLE = "transactions_bench"
+
+
+def seed_table(conn, rows: int) -> str:
+    """Копия transactions, удваиваемая INSERT ... SELECT (со сдвигом по времени) до нужного объёма."""
+    conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+    conn.execute(text(f"CREATE TABLE {BENCH_TABLE} AS SELECT * FROM transactions"))
+    total = conn.execute(text(f"SELECT COUNT(*) FROM {BENCH_TABLE}")).scalar() or 0
+    if total == 0:
+        raise SystemExit("transactions пуста — сначала загрузите данные (ingest.py)")
+    shift = 1
+    while total < rows:
+        cols = _shifted_columns(conn, shift)
+        conn.execute(text(f"INSERT INTO {BENCH_TABLE} SELECT {cols} FROM {BENCH_TABLE}"))
+        total *= 2
+        shift *= 2
+        print(f"  seeded {total} rows")
+    create_indexes(conn, table=BENCH_TABLE)
+    return BENCH_TABLE
+
+
+def _shifted_columns(conn, shift_days: int) -> str:
+    cols = [r[0] for r in conn.execute(text(f"""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = '{BENCH_TABLE}'
+        ORDER BY ordinal_position
+    """))]
+    return ", ".join(
+        f"transaction_timestamp + INTERVAL {shift_days} DAY" if c == "transaction_timestamp" else c
+        for c in cols
+    )
+
+
+def cases(year: int, card_id: int, city: str):
+    city = city.replace("'", "''")
+    return [
+        ("month",
+         f"MONTH(transaction_timestamp) = 3 AND YEAR(transaction_timestamp) = {year}",
+         f"transaction_timestamp >= '{year}-03-01' AND transaction_timestamp < '{year}-04-01'"),
+        ("day",
+         f"MONTH(transaction_timestamp) = 3 AND DAY(transaction_timestamp) = 15 AND YEAR(transaction_timestamp) = {year}",
+         f"transaction_timestamp >= '{year}-03-15' AND transaction_timestamp < '{year}-03-16'"),
+        ("card+month",
+         f"card_id = {card_id} AND MONTH(transaction_timestamp) = 3 AND YEAR(transaction_timestamp) = {year}",
+         f"card_id = {card_id} AND transaction_timestamp >= '{year}-03-01' AND transaction_timestamp < '{year}-04-01'"),
+        ("city+month",
+         f"merchant_city = '{city}' AND MONTH(transaction_timestamp) = 3 AND YEAR(transaction_timestamp) = {year}",
+         f"merchant_city = '{city}' AND transaction_timestamp >= '{year}-03-01' AND transaction_timestamp < '{year}-04-01'"),
+    ]
+
+
+def run(conn, table: str, where: str, repeat: int):
+    sql = f"SELECT COUNT(*), SUM(transaction_amount_kzt) FROM {table} WHERE {where}"
+    plan = conn.execute(text("EXPLAIN " + sql)).mappings().first()
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(text(sql)).fetchall()
+        timings.append(time.perf_counter() - t0)
+    return plan, statistics.median(timings)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--table", default="transactions")
+    ap.add_argument("--seed-rows", type=int, default=0, help="размножить данные в transactions_bench до N строк")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    engine = create_engine(DB_URL)
+    with engine.begin() as conn:
+        table = seed_table(conn, args.seed_rows) if args.seed_rows else args.table
+        total = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        year = conn.execute(text(f"SELECT YEAR(MIN(transaction_timestamp)) FROM {table}")).scalar()
+        card_id, city = conn.execute(text(
+            f"SELECT card_id, merchant_city FROM {table} WHERE merchant_city IS NOT NULL LIMIT 1"
+        )).first()
+
+        print(f"table={table} rows={total}\n")
+        print(f"{'case':<12} {'variant':<8} {'type':<7} {'key':<16} {'rows':>10} {'median ms':>10}")
+        for name, legacy, ranged in cases(year, card_id, city):
+            for variant, where in (("func", legacy), ("range", ranged)):
+                plan, t = run(conn, table, where, args.repeat)
+                print(f"{name:<12} {variant:<8} {str(plan['type']):<7} {str(plan['key']):<16} "
+                      f"{plan['rows']:>10} {t * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
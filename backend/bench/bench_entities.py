@@ -0,0 +1,122 @@
+"""
+Извлечение параметров вопроса: один проход nlp.entities против прежних extract_* из main.py.
+
+    cd backend
+    python -m bench.bench_entities                 # сверка с эталоном + замер
+    python -m bench.bench_entities --check-only    # только сверка (код возврата 1 при расхождении)
+
+Эталон bench/data/entities_golden.jsonl (EN/RU/KZ) снят с прежней реализации:
+новый извлекатель обязан давать на нём ровно те же month/day/year/city/card_id/top_n.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+from nlp.entities import EN_MONTHS, RU_MONTHS_STEMS, KZ_MONTHS_STEMS, extract_entities
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "entities_golden.jsonl")
+FIELDS = ("month", "day", "year", "city", "card_id", "top_n")
+
+
+# --- прежняя реализация (копия из main.py до перехода на nlp.entities), только для замера ---
+
+def _legacy_year(q):
+    ym = re.search(r"(19|20)\d{2}", q)
+    return int(ym.group(0)) if ym else None
+
+
+def _legacy_month_year(q):
+    for stems in (EN_MONTHS, RU_MONTHS_STEMS, KZ_MONTHS_STEMS):
+        for stem, num in stems.items():
+            if stem in q:
+                return num, _legacy_year(q)
+    return None, None
+
+
+def _legacy_specific_date(q):
+    for name, num in EN_MONTHS.items():
+        m = re.search(rf"\b{name}\s+([0-3]?\d)\b", q)
+        if m:
+            return num, int(m.group(1)), _legacy_year(q)
+    m = re.search(r"\b([0-3]?\d)\b", q)
+    if m:
+        for stems in (RU_MONTHS_STEMS, KZ_MONTHS_STEMS):
+            for stem, num in stems.items():
+                if stem in q:
+                    return num, int(m.group(1)), _legacy_year(q)
+    return None, None, None
+
+
+def legacy_extract(query: str) -> dict:
+    q = query.lower()
+    month, day, year = _legacy_specific_date(q)
+    if day is None:
+        month, year = _legacy_month_year(q)
+    city = None
+    m = re.search(r"(?:в городе|город|in)\s+([A-Z][\w\-\s]+)", query)
+    if m and m.group(1).strip().split()[0] not in {"Total", "Revenue", "total", "revenue"}:
+        city = m.group(1).strip()
+    m = re.search(r"\b(?:cid|card[\s\-_]?id)\s*[:#]?\s*(\d+)\b", query, flags=re.IGNORECASE)
+    card_id = int(m.group(1)) if m else None
+    m = re.search(r"\bтоп[-\s]?(\d+)\b", q) or re.search(r"\btop[-\s]?(\d+)\b", q)
+    top_n = max(1, int(m.group(1))) if m else None
+    return {"month": month, "day": day, "year": year, "city": city, "card_id": card_id, "top_n": top_n}
+
+
+def new_extract(query: str) -> dict:
+    ents = extract_entities(query)
+    return {f: getattr(ents, f) for f in FIELDS}
+
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check(golden) -> int:
+    mismatches = 0
+    for case in golden:
+        got = new_extract(case["query"])
+        if got != case["expected"]:
+            mismatches += 1
+            print(f"MISMATCH {case['query']!r}\n  expected {case['expected']}\n  got      {got}")
+    print(f"golden: {len(golden) - mismatches}/{len(golden)} ok")
+    return mismatches
+
+
+def bench(fn, queries, repeats: int) -> float:
+    """Медиана по повторам, микросекунд на один вопрос."""
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for q in queries:
+            fn(q)
+        samples.append((time.perf_counter() - t0) / len(queries) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Entity extractor: golden check and microbenchmark")
+    ap.add_argument("--check-only", action="store_true")
+    ap.add_argument("--repeats", type=int, default=20)
+    args = ap.parse_args()
+
+    golden = load_golden()
+    if check(golden):
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    queries = [case["query"] for case in golden]
+    legacy_us = bench(legacy_extract, queries, args.repeats)
+    new_us = bench(new_extract, queries, args.repeats)
+    print(f"{'legacy extract_*':<20} {legacy_us:8.2f} us/query")
+    print(f"{'extract_entities':<20} {new_us:8.2f} us/query   x{legacy_us / new_us:.2f}")
+
+
+if __name__ == "__main__":
+    main()
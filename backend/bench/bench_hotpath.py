@@ -0,0 +1,307 @@
+"""
+Хелперы, которые /ask зовёт на каждый вопрос: извлечение дат/города/top-N, язык, интент (правила + локальная
+модель на промахе), is_single_row_aggregate. Замер — нс на вызов и память на вызов (tracemalloc) по трём
+корпусам: realistic (эталон entities, обучающая выборка интентов, вопросы нагрузочного теста), long (склейки
+вопросов на 1–64 КБ), adversarial (длинные числа, повторы месяцев и "in", смешанные алфавиты, юникод, пустые).
+
+    cd backend
+    python -m bench.bench_hotpath                       # сравнить с bench/data/hotpath_baseline.json, код 1 при регрессии
+    python -m bench.bench_hotpath --save-baseline       # записать новый эталон (после осознанного изменения)
+    python -m bench.bench_hotpath --threshold 0.5 --only detect_language,extract_city
+
+Регрессия — если время или память на вызов выросли больше чем на --threshold (доля) и при этом больше
+чем на --min-delta-ns / --min-delta-bytes (шум на наносекундных хелперах); подозрительные хелперы
+перемеряются (--confirm-repeats), прежде чем вернуть код 1. Время зависит от машины: эталон из
+репозитория — ориентир, на своей машине сначала --save-baseline на базовом коммите.
+"""
+import os
+
+# классификатор интентов — локальная модель: zero-shot тянет transformers и сеть
+os.environ["INTENT_CLASSIFIER"] = "local"
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from nlp.entities import extract_entities, extract_specific_date, extract_month_year, extract_city, extract_top_n
+from nlp.intent_detector import detect_intent, detect_intent_by_rules, load_intent_classifier
+from nlp.language import detect_language, warm_up as warm_up_language, _detect_normalized
+from sql.query_templates import get_sql_by_intent
+from sql.statement import is_single_row_aggregate
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+BASELINE_PATH = os.path.join(DATA_DIR, "hotpath_baseline.json")
+INTENTS_PATH = os.path.join(os.path.dirname(BENCH_DIR), "nlp", "data", "intents_train.jsonl")
+
+TEMPLATE_INTENTS = ("count_transactions", "top_cities", "average_amount", "average_amount_in_month",
+                    "transactions_in_month", "transactions_on_date", "top_merchants_by_revenue",
+                    "decline_rate_by_card")
+LLM_LIKE_SQL = [
+    "SELECT wallet_type, COUNT(*) AS n FROM transactions GROUP BY wallet_type ORDER BY n DESC LIMIT 10",
+    "SELECT merchant_city, AVG(transaction_amount_kzt) FROM transactions WHERE pos_entry_mode = 'Contactless' GROUP BY merchant_city",
+    "SELECT SUM(transaction_amount_kzt) AS total FROM transactions WHERE transaction_currency <> 'KZT'",
+    "SELECT MAX(transaction_timestamp) FROM transactions",
+    "SELECT transaction_id, card_id, transaction_amount_kzt FROM transactions WHERE card_id = 42 ORDER BY transaction_timestamp DESC",
+    "select count(*) from transactions where mcc_category = 'Restaurants' and merchant_city = 'Almaty'",
+]
+
+
+def _realistic_questions():
+    out = []
+    with open(os.path.join(DATA_DIR, "entities_golden.jsonl"), encoding="utf-8") as f:
+        out += [json.loads(line)["query"] for line in f if line.strip()]
+    with open(INTENTS_PATH, encoding="utf-8") as f:
+        out += [json.loads(line)["text"] for line in f if line.strip()]
+    rnd = random.Random(0)
+    with open(os.path.join(DATA_DIR, "loadtest_questions.json"), encoding="utf-8") as f:
+        for entry in json.load(f):
+            for text in entry["texts"]:
+                out.append(text.format(n=rnd.randint(3, 20), day=rnd.randint(1, 28), card=rnd.randint(1, 500)))
+    return out
+
+
+def _long_questions(realistic):
+    rnd = random.Random(1)
+    out = []
+    for size in (1024, 4096, 16384, 65536):
+        for _ in range(4):
+            parts, n = [], 0
+            while n < size:
+                q = rnd.choice(realistic)
+                parts.append(q)
+                n += len(q) + 1
+            out.append(" ".join(parts))
+    return out
+
+
+def _adversarial_questions():
+    return [
+        "",
+        "   \t\n  ",
+        "?!.,;:-—()[]{}",
+        "1 " * 5000,
+        "top " + "9" * 5000 + " cities",
+        "топ-" + "7" * 5000,
+        "card id " + "1" * 5000,
+        "March " + "3" * 5000,
+        "march " * 2000,
+        "января февраля марта апреля мая июня " * 300,
+        "in " * 3000 + "X",
+        "in " + "Almaty-" * 3000,
+        "город " * 2000 + "Алматы",
+        "transactions in " + "A" * 20000,
+        "a" * 100000,
+        "top 5 мерчантов in Алматы за march 2024 қала " * 50,
+        "Transaktionen im März in München für Karte 12",
+        "Dépenses moyennes à Paris en février",
+        "最多交易的城市是哪些？",
+        "ما هو متوسط مبلغ المعاملة؟",
+        "🔥💳📈 top 10 cities 🔥💳📈",
+        "ТОП 10 ГОРОДОВ ПО КОЛИЧЕСТВУ ТРАНЗАКЦИЙ",
+        "show all transactions on 31 31 31 31 march 31",
+        "decline rate card id cid card_id отказ " * 200,
+        "Average amount in Ust-Kamenogorsk during November 2023 for card id 123456789012345678901234567890",
+    ]
+
+
+def _sql_corpus():
+    realistic = []
+    for intent in TEMPLATE_INTENTS:
+        for month, day in ((None, None), (3, None), (3, 14)):
+            stmt = get_sql_by_intent(intent, top_n=10, month=month, day=day, card_id=42, use_rollups=False)
+            if stmt is not None:   # *_in_month / *_on_date без месяца/дня шаблона не дают
+                realistic += [stmt.sql, stmt.render()]
+    realistic += LLM_LIKE_SQL
+    long = [" UNION ALL ".join(LLM_LIKE_SQL * k) for k in (10, 50, 200)]
+    adversarial = ["", "count(" * 20000, "SELECT " + ", ".join(f"col{i}" for i in range(5000)) + " FROM t",
+                   "select x from t " + "group by " * 5000]
+    return {"realistic": realistic, "long": long, "adversarial": adversarial}
+
+
+def _entity_args(q: str):
+    ents = extract_entities(q)
+    lang = detect_language(q)
+    return (q, lang, ents.month, ents.year, ents.day)
+
+
+def build_cases():
+    """helper -> (fn, {корпус: [аргументы вызова]}); аргументы готовятся заранее, вне замера."""
+    realistic = _realistic_questions()
+    questions = {"realistic": realistic, "long": _long_questions(realistic), "adversarial": _adversarial_questions()}
+    single = {k: [(q,) for q in v] for k, v in questions.items()}
+    intent_args = {k: [_entity_args(q) for q in v] for k, v in questions.items()}
+    sql = {k: [(s,) for s in v] for k, v in _sql_corpus().items()}
+    return {
+        "extract_entities": (extract_entities, single),
+        "extract_specific_date": (extract_specific_date, single),
+        "extract_month_year": (extract_month_year, single),
+        "extract_city": (extract_city, single),
+        "extract_top_n": (extract_top_n, single),
+        "detect_language": (detect_language, single),
+        "detect_intent_by_rules": (detect_intent_by_rules, intent_args),
+        "detect_intent": (detect_intent, intent_args),
+        "is_single_row_aggregate": (is_single_row_aggregate, sql),
+    }
+
+
+def _reset(name: str) -> None:
+    # язык кэшируется в LRU: каждый проход начинаем с пустого кэша, иначе меряются только попадания
+    if name == "detect_language":
+        _detect_normalized.cache_clear()
+
+
+def timed_pass(name, fn, calls, min_time_ns: int) -> float:
+    """Прогоны корпуса подряд, пока не наберётся min_time_ns; нс на вызов."""
+    n = 0
+    t0 = time.perf_counter_ns()
+    while True:
+        _reset(name)
+        for args in calls:
+            fn(*args)
+        n += len(calls)
+        elapsed = time.perf_counter_ns() - t0
+        if elapsed >= min_time_ns:
+            return elapsed / n
+
+
+def alloc_per_call(name, fn, calls):
+    """Средний пик выделенной памяти за вызов и максимум пика (байты, tracemalloc)."""
+    _reset(name)
+    gc.collect()
+    tracemalloc.start()
+    total = worst = 0
+    try:
+        for args in calls:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn(*args)
+            peak = tracemalloc.get_traced_memory()[1] - before
+            total += peak
+            worst = max(worst, peak)
+    finally:
+        tracemalloc.stop()
+    return total / len(calls), worst
+
+
+def run(cases, repeats: int, min_time_ns: int, only=None, best=None):
+    """
+    Раунды по всем (хелпер, корпус) по очереди, итог — минимум по раундам. Так замеры одного хелпера
+    разнесены по всему прогону, и кратковременное замедление машины не портит их все разом.
+    best — минимумы прошлого прогона (перепроверка подозрительных), продолжаем с них.
+    """
+    plan = [(name, corpus, fn, calls) for name, (fn, corpora) in cases.items()
+            if not only or name in only for corpus, calls in corpora.items()]
+    for name, _, fn, calls in plan:   # прогрев: ленивые загрузки (langdetect, модель интентов), кэш regex
+        for args in calls:
+            fn(*args)
+    best = dict(best or {})
+    for _ in range(repeats):
+        gc.collect()
+        for name, corpus, fn, calls in plan:
+            ns = timed_pass(name, fn, calls, min_time_ns)
+            best[name, corpus] = min(best.get((name, corpus), ns), ns)
+    results = {}
+    for name, corpus, fn, calls in plan:
+        avg_bytes, peak_bytes = alloc_per_call(name, fn, calls)
+        results.setdefault(name, {})[corpus] = {
+            "calls": len(calls), "ns_per_call": round(best[name, corpus], 1),
+            "alloc_bytes_per_call": round(avg_bytes, 1), "alloc_peak_bytes": peak_bytes}
+    return results, best
+
+
+def compare(results, baseline, threshold: float, min_delta_ns: float, min_delta_bytes: float):
+    """[(хелпер, корпус, описание)] — всё, что выросло больше порога."""
+    regressions = []
+    for name, corpora in results.items():
+        for corpus, cur in corpora.items():
+            base = baseline.get(name, {}).get(corpus)
+            if not base:
+                continue
+            for key, floor in (("ns_per_call", min_delta_ns), ("alloc_bytes_per_call", min_delta_bytes)):
+                old, new = base[key], cur[key]
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append((name, corpus, f"{key} {old:,} -> {new:,} (+{(new - old) / old * 100:.0f}%)"))
+    return regressions
+
+
+def print_table(results, baseline) -> None:
+    print(f"{'helper':<26}{'corpus':<13}{'calls':>7}{'ns/call':>14}{'base':>12}{'bytes/call':>13}{'peak B':>10}")
+    for name, corpora in results.items():
+        for corpus, r in corpora.items():
+            base = baseline.get(name, {}).get(corpus, {}).get("ns_per_call", "")
+            print(f"{name:<26}{corpus:<13}{r['calls']:>7}{r['ns_per_call']:>14,.1f}{base:>12}"
+                  f"{r['alloc_bytes_per_call']:>13,.1f}{r['alloc_peak_bytes']:>10,}")
+
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NLP hot-path microbenchmark with a regression gate")
+    ap.add_argument("--repeats", type=int, default=7)
+    ap.add_argument("--confirm-repeats", type=int, default=10, help="re-measure suspected regressions (0 = off)")
+    ap.add_argument("--min-time-ms", type=float, default=30, help="minimum duration of one timed sample")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative growth, 0.25 = +25%%")
+    ap.add_argument("--min-delta-ns", type=float, default=300)
+    ap.add_argument("--min-delta-bytes", type=float, default=512)
+    ap.add_argument("--only", default="", help="comma-separated helper names")
+    args = ap.parse_args()
+
+    warm_up_language()
+    load_intent_classifier()
+    only = {x.strip() for x in args.only.split(",") if x.strip()} or None
+    cases = build_cases()
+    min_time_ns = int(args.min_time_ms * 1e6)
+    results, best = run(cases, args.repeats, min_time_ns, only)
+
+    stored = load_baseline(args.baseline)
+    baseline = stored.get("results", {})
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        merged = dict(baseline) if only else {}
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                "python": platform.python_version(), "platform": platform.platform(),
+                                "repeats": args.repeats},
+                       "results": merged}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nbaseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline")
+        return
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ns, args.min_delta_bytes)
+    if regressions and args.confirm_repeats:
+        # общая машина шумит: подозрительные хелперы перемеряем ещё раз, минимум берём по обоим прогонам
+        suspects = {name for name, _, _ in regressions}
+        print(f"\nre-measuring {', '.join(sorted(suspects))} ...")
+        again, _ = run(cases, args.confirm_repeats, min_time_ns, suspects, best)
+        results.update(again)
+        regressions = compare(again, baseline, args.threshold, args.min_delta_ns, args.min_delta_bytes)
+    if regressions:
+        print(f"\nREGRESSION (threshold +{args.threshold * 100:.0f}%):")
+        for name, corpus, line in regressions:
+            print(f"  {name}/{corpus}: {line}")
+        sys.exit(1)
+    print(f"\nno regressions vs baseline (threshold +{args.threshold * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
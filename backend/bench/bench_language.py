@@ -0,0 +1,68 @@
+"""
+Определение языка: nlp.language (алфавит -> langdetect для спорного -> LRU) против прежнего
+detect_language из main.py (langdetect.detect на каждый запрос, без seed).
+
+    cd backend
+    python -m bench.bench_language
+
+Вопросы и ожидаемые языки — из nlp/data/intents_train.jsonl (en / ru / kz).
+Печатает точность, долю ответов, совпавших между двумя прогонами (детерминизм), и время на вопрос.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from nlp import language
+
+TRAIN_PATH = os.path.join(os.path.dirname(__file__), "..", "nlp", "data", "intents_train.jsonl")
+EXPECTED = {"en": "en", "ru": "ru", "kz": "kk"}
+
+
+def legacy_detect_language(text: str) -> str:
+    try:
+        from langdetect import detect
+        return detect(text)
+    except Exception:
+        return "en"
+
+
+def load_questions():
+    with open(TRAIN_PATH, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(r["text"], EXPECTED[r["lang"]]) for r in rows]
+
+
+def run(name: str, fn, questions, repeats: int, before_each=None) -> None:
+    first = [fn(q) for q, _ in questions]
+    second = [fn(q) for q, _ in questions]
+    accuracy = sum(got == lang for got, (_, lang) in zip(first, questions)) / len(questions)
+    stable = sum(a == b for a, b in zip(first, second)) / len(questions)
+    samples = []
+    for _ in range(repeats):
+        if before_each:
+            before_each()
+        t0 = time.perf_counter()
+        for q, _ in questions:
+            fn(q)
+        samples.append((time.perf_counter() - t0) / len(questions) * 1e6)
+    print(f"{name:<28} accuracy={accuracy:.3f} deterministic={stable:.3f} {statistics.median(samples):10.2f} us/query")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Language detection benchmark")
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    questions = load_questions()
+    print(f"{len(questions)} questions")
+    run("legacy langdetect", legacy_detect_language, questions, args.repeats)
+    run("tiered, cold cache", language.detect_language, questions, args.repeats,
+        before_each=language._detect_normalized.cache_clear)
+    run("tiered, warm cache", language.detect_language, questions, args.repeats)
+    print(language.cache_info())
+
+
+if __name__ == "__main__":
+    main()
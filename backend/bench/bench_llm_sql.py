@@ -0,0 +1,80 @@
+"""
+SQL от LLM: новый клиент на каждый вопрос (как раньше) против общего клиента с пулом
+и постоянного кэша вопрос -> SQL. API заменяет локальная заглушка (bench/openai_stub.py).
+
+    cd backend
+    python -m bench.bench_llm_sql --questions 50 --latency-ms 100
+
+Печатает время на вопрос, число запросов к API и TCP-соединений для каждого сценария.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from bench.openai_stub import start_stub
+
+
+def main():
+    ap = argparse.ArgumentParser(description="LLM SQL client/cache benchmark against a local stub")
+    ap.add_argument("--questions", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=100)
+    ap.add_argument("--concurrency", type=int, default=10)
+    args = ap.parse_args()
+
+    stub = start_stub(latency_ms=args.latency_ms)
+    cache_dir = tempfile.mkdtemp(prefix="llm-sql-cache-")
+    # config читает окружение при импорте — выставляем до импорта sql_generator
+    os.environ.update({
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": stub.base_url,
+        "LLM_SQL_CACHE_PATH": os.path.join(cache_dir, "cache.sqlite3"),
+    })
+    from openai import OpenAI
+    from nlp import sql_generator
+
+    questions = [f"Which cities had the most transactions of type {i}?" for i in range(args.questions)]
+
+    def measure(name, fn):
+        requests, connections = stub.requests, stub.connections
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        print(f"{name:<34} {elapsed / len(questions) * 1000:8.2f} ms/question "
+              f"api_requests={stub.requests - requests:<5} connections={stub.connections - connections}")
+
+    def legacy():
+        for q in questions:
+            client = OpenAI(api_key="stub", base_url=stub.base_url)
+            client.chat.completions.create(model="stub", messages=sql_generator._messages(q), temperature=0.0)
+
+    # в API SQL попадает в кэш после EXPLAIN и выполнения (main.remember_llm_sql); здесь — сразу
+    def shared_client():
+        for q in questions:
+            sql_generator.remember_sql(q, sql_generator.sql_by_llm(q))
+
+    async def _concurrent():
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(q):
+            async with sem:
+                sql_generator.remember_sql(q, await sql_generator.sql_by_llm_async(q))
+        await asyncio.gather(*(one(q) for q in questions))
+
+    def reopen_cache():
+        sql_generator._sql_cache = None   # как после рестарта процесса: кэш читается из того же файла
+
+    measure("client per call (before)", legacy)
+    measure("shared client, cold cache", shared_client)
+    measure("shared client, warm cache", shared_client)
+    reopen_cache()
+    measure("after restart (same cache file)", shared_client)
+    sql_generator.get_sql_cache().purge()
+    measure(f"async x{args.concurrency}, cold cache", lambda: asyncio.run(_concurrent()))
+    print(sql_generator.get_sql_cache().stats())
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Литералы против bind-параметров: один и тот же поток шаблонных запросов (случайные месяц/день/карта/top_n)
+выполняется как SQL со значениями в тексте (каждое значение — новый текст, разбор заново) и как
+Statement из query_templates (текст один на шаблон, prepared statement из LRU соединения).
+
+    cd backend
+    python -m bench.bench_prepared                          # QUERY_ENGINE из config (mysql)
+    python -m bench.bench_prepared --engine duckdb          # PARQUET_PATH
+    python -m bench.bench_prepared --queries 20000 --concurrency 16
+
+Печатает число разных текстов SQL, QPS, медиану/p95 на запрос, для mysql — дельты
+Com_query / Com_stmt_prepare / Com_stmt_execute из SHOW GLOBAL STATUS (счётчики общие для сервера:
+на нагруженной базе цифры будут шумными) и счётчики LRU движка.
+"""
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from engines import create_query_engine
+from sql.query_templates import get_sql_by_intent, set_default_year
+
+INTENTS = ("average_amount_in_month", "top_cities", "transactions_in_month",
+           "transactions_on_date", "top_merchants_by_revenue", "decline_rate_by_card")
+STATUS_VARS = ("Com_query", "Com_stmt_prepare", "Com_stmt_execute", "Com_stmt_close")
+
+
+def workload(n: int, seed: int, limit: int):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        intent = rnd.choice(INTENTS)
+        stmt = get_sql_by_intent(intent, top_n=rnd.randint(1, 50), month=rnd.randint(1, 12),
+                                 day=rnd.randint(1, 28) if intent in ("transactions_on_date", "decline_rate_by_card") else None,
+                                 card_id=rnd.randint(1, 5000), use_rollups=False)
+        if intent.startswith("transactions_"):
+            stmt = stmt.with_limit(limit)
+        out.append(stmt)
+    return out
+
+
+def server_status(engine) -> dict:
+    if engine.name != "mysql":
+        return {}
+    names = ", ".join(f"'{v}'" for v in STATUS_VARS)
+    _, rows = engine._fetch_all(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({names})")
+    return {name: int(value) for name, value in rows}
+
+
+def run(name: str, engine, queries, concurrency: int) -> None:
+    def one(q):
+        t0 = time.perf_counter()
+        engine.read_df(q)
+        return time.perf_counter() - t0
+
+    before = server_status(engine)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, queries))
+    wall = time.perf_counter() - t0
+    after = server_status(engine)
+
+    texts = len({q if isinstance(q, str) else q.sql for q in queries})
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<8} texts={texts:<6} qps={len(queries) / wall:8.0f} "
+          f"median={statistics.median(latencies) * 1000:7.3f} ms  p95={p95 * 1000:7.3f} ms")
+    if before:
+        print("         " + "  ".join(f"{v}={after[v] - before[v]}" for v in STATUS_VARS))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Literal SQL vs bound prepared statements")
+    ap.add_argument("--engine", default=None, help="mysql | duckdb (default: config.QUERY_ENGINE)")
+    ap.add_argument("--queries", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--limit", type=int, default=10, help="LIMIT for listing intents (keeps execution cheap)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    engine = create_query_engine(args.engine)
+    set_default_year(engine.scalar("SELECT YEAR(MAX(transaction_timestamp)) FROM transactions"))
+    statements = workload(args.queries, args.seed, args.limit)
+    literal = [s.render() for s in statements]
+
+    # прогрев: пул соединений, кэши страниц/файлов — чтобы первый режим не платил за холодный старт
+    run("warmup", engine, literal[: max(1, len(literal) // 10)], args.concurrency)
+    run("literal", engine, literal, args.concurrency)
+    run("bound", engine, statements, args.concurrency)
+    if hasattr(engine, "prepared_stats"):
+        print(f"prepared LRU: {engine.prepared_stats()}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
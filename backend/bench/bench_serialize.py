@@ -0,0 +1,147 @@
+"""
+Путь результата /ask от строк курсора до тела ответа: прежний (DataFrame.from_records -> to_dict(records) ->
+jsonable_encoder -> JSONResponse) против нового (кортежи -> dict -> serialization.dumps, orjson если есть).
+Строки — как из курсора MySQL (datetime, Decimal, str, int, NULL); размеры 1 (count_transactions), 1k, 100k.
+
+    cd backend
+    python -m bench.bench_serialize
+    python -m bench.bench_serialize --sizes 1,1000,100000 --repeats 5
+    python -m bench.bench_serialize --parquet 'bench_data/*.parquet'    # + чтение из DuckDB: .df() против fetchall()
+
+Печатает CPU-время на запрос (time.process_time, медиана) и размер тела; тела обоих путей сверяются
+(json.loads одинаковый), иначе код возврата 1.
+"""
+import argparse
+import datetime
+import decimal
+import json
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import serialization
+
+COLUMNS = ["transaction_id", "transaction_timestamp", "card_id", "merchant_city", "mcc_category",
+           "transaction_amount_kzt", "transaction_currency", "original_amount", "wallet_type"]
+CITIES = ["Almaty", "Astana", "Shymkent", "Karaganda", "Aktobe"]
+CATEGORIES = ["Grocery Stores", "Restaurants", "Fuel", "Taxi", "Electronics"]
+
+
+def cursor_rows(n: int, seed: int = 0):
+    """Что вернул бы cursor.fetchall() для листинга транзакций; n == 1 — одна ячейка COUNT(*)."""
+    if n == 1:
+        return ["tx_count"], [(1000000,)]
+    rnd = random.Random(seed)
+    start = datetime.datetime(2024, 3, 1)
+    rows = []
+    for i in range(n):
+        foreign = rnd.random() < 0.07
+        rows.append((
+            f"tx{i:012d}",
+            start + datetime.timedelta(seconds=i * 7),
+            rnd.randint(1, 20000),
+            rnd.choice(CITIES),
+            rnd.choice(CATEGORIES),
+            decimal.Decimal(f"{rnd.uniform(100, 200000):.2f}"),
+            "USD" if foreign else "KZT",
+            f"{rnd.uniform(1, 400):.2f}" if foreign else None,
+            rnd.choice([None, None, "Apple Pay", "Google Pay"]),
+        ))
+    return COLUMNS, rows
+
+
+def payload(rows: list) -> dict:
+    # та же форма, что у main.ask_result
+    return {"query": "bench", "language": "en", "intent": "transactions_in_month", "params": {"limit": len(rows)},
+            "sql": "SELECT ...", "count": len(rows), "result": rows, "next_cursor": None}
+
+
+def old_path(columns, rows) -> bytes:
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    if df.isna().values.any():
+        df = df.astype(object).where(df.notna(), None)
+    return JSONResponse(content=jsonable_encoder(payload(df.to_dict(orient="records")))).body
+
+
+def new_path(columns, rows) -> bytes:
+    return serialization.dumps(payload([dict(zip(columns, row)) for row in rows]))
+
+
+def stdlib_path(columns, rows) -> bytes:
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        return new_path(columns, rows)
+    finally:
+        serialization.orjson = orjson
+
+
+def cpu_ms(fn, *args, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.process_time()
+        fn(*args)
+        samples.append((time.process_time() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def run_case(label: str, paths, repeats: int) -> bool:
+    """paths: [(имя, fn, args)]; первая — эталон для сверки тел."""
+    bodies = {name: fn(*args) for name, fn, args in paths}
+    reference = json.loads(next(iter(bodies.values())))
+    same = all(json.loads(body) == reference for body in bodies.values())
+    base = None
+    for name, fn, args in paths:
+        ms = cpu_ms(fn, *args, repeats=repeats)
+        base = base or ms
+        print(f"  {label:<16}{name:<24}{ms:>12.3f} ms cpu{len(bodies[name]):>14,} B   x{base / ms:.1f}")
+    if not same:
+        print(f"  {label}: RESPONSE BODIES DIFFER")
+    return same
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Result path benchmark: pandas + jsonable_encoder vs cursor tuples + dumps")
+    ap.add_argument("--sizes", default="1,1000,100000")
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--parquet", default=None, help="also time DuckDB reads over this parquet glob")
+    args = ap.parse_args()
+
+    print(f"orjson: {'yes' if serialization.orjson else 'no (stdlib json)'}")
+    ok = True
+    for n in (int(x) for x in args.sizes.split(",")):
+        columns, rows = cursor_rows(n)
+        repeats = args.repeats if n < 100000 else max(1, args.repeats // 2)
+        paths = [("pandas+jsonable_encoder", old_path, (columns, rows)), ("tuples+dumps", new_path, (columns, rows))]
+        if serialization.orjson:
+            paths.append(("tuples+dumps (stdlib)", stdlib_path, (columns, rows)))
+        ok &= run_case(f"{n} rows", paths, repeats)
+
+    if args.parquet:
+        from engines.duckdb_engine import DuckDBEngine
+        engine = DuckDBEngine(args.parquet)
+        for n in (int(x) for x in args.sizes.split(",")):
+            sql = "SELECT COUNT(*) AS tx_count FROM transactions" if n == 1 else \
+                f"SELECT * FROM transactions ORDER BY transaction_timestamp LIMIT {n}"
+
+            def old_duckdb():
+                df = engine.read_df(sql)
+                if df.isna().values.any():
+                    df = df.astype(object).where(df.notna(), None)
+                return JSONResponse(content=jsonable_encoder(payload(df.to_dict(orient="records")))).body
+
+            def new_duckdb():
+                return new_path(*engine.fetch_all(sql))
+
+            ok &= run_case(f"duckdb {n}", [("df+jsonable_encoder", old_duckdb, ()),
+                                            ("fetch_all+dumps", new_duckdb, ())], args.repeats)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Воспроизводимый нагрузочный тест /ask целиком офлайн: синтетические данные (bench/synth_data.py) на DuckDB,
+сервер uvicorn в отдельном процессе, взвешенная смесь вопросов EN/RU/KZ (bench/data/loadtest_questions.json)
+на фиксированных уровнях конкуренции. Итог — RPS и p50/p95/p99 общие и по интенту, JSON в bench/results/
+для сравнения между коммитами.
+
+    cd backend
+    python -m bench.loadtest                                          # 1M строк, конкуренция 1,8,32
+    python -m bench.loadtest --rows 10000000 --concurrency 1,16,64 --duration 30
+    python -m bench.loadtest --llm-stub --llm-latency-ms 300          # + вопросы мимо шаблонов через заглушку OpenAI
+    python -m bench.loadtest --url http://127.0.0.1:8000              # уже запущенный сервер (MySQL и т.п.)
+    python -m bench.loadtest --compare bench/results/<старый>.json    # дельты p95/RPS против прошлого прогона
+
+Кэш ответов по умолчанию выключен (CACHE_ENABLED=0) — меряется путь до базы; --cache включает.
+Вопросы с пометкой llm без --llm-stub пропускаются: сеть не нужна. Смесь и плейсхолдеры ({n}, {day}, {card})
+зависят только от --seed, так что два прогона с одинаковыми параметрами шлют одни и те же запросы.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+from bench import synth_data
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+QUESTIONS_PATH = os.path.join(BENCH_DIR, "data", "loadtest_questions.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def load_mix(path: str, with_llm: bool):
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for entry in json.load(f):
+            if entry.get("llm") and not with_llm:
+                continue
+            entries.append(entry)
+    return entries
+
+
+def make_requests(entries, n: int, seed: int, cards: int):
+    """n вопросов: запись выбирается по весу, текст — равновероятно, плейсхолдеры — случайные."""
+    rnd = random.Random(seed)
+    weights = [e["weight"] for e in entries]
+    out = []
+    for entry in rnd.choices(entries, weights=weights, k=n):
+        text = rnd.choice(entry["texts"]).format(
+            n=rnd.randint(3, 20), day=rnd.randint(1, 28), card=rnd.randint(1, min(cards, 500)))
+        out.append((entry["lang"], entry["intent"], text))
+    return out
+
+
+def percentile(sorted_values, p: float):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def _latency_summary(latencies):
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2) if values else None,
+        "p95_ms": round(percentile(values, 95) * 1000, 2) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 2) if values else None,
+        "max_ms": round(values[-1] * 1000, 2) if values else None,
+    }
+
+
+class Client:
+    """Keep-alive соединение на поток: меряется сервер, а не установка TCP."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def get(self, path: str):
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request("GET", path)
+                resp = self.conn.getresponse()
+                return resp.status, resp.read(), resp.getheader("X-Ask-Intent")
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def ask_path(text: str, limit: int) -> str:
+    return f"/ask?query={quote(text)}&limit={limit}"
+
+
+def run_level(base_url: str, requests, concurrency: int, limit: int, duration: float, timeout: float):
+    """Все потоки берут вопросы из общей очереди по кругу; стоп — по числу запросов или по времени."""
+    samples = []
+    lock = threading.Lock()
+    counter = iter(range(sys.maxsize))
+    deadline = time.perf_counter() + duration if duration else None
+    total = len(requests)
+
+    def worker():
+        client = Client(base_url, timeout)
+        local = []
+        while True:
+            with lock:
+                i = next(counter)
+            if deadline is None and i >= total:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            lang, expected, text = requests[i % total]
+            t0 = time.perf_counter()
+            try:
+                status, body, intent = client.get(ask_path(text, limit))
+            except Exception as e:
+                status, body, intent = 0, str(e).encode(), None
+            local.append((lang, expected, intent, status, time.perf_counter() - t0, len(body)))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - t0
+
+
+def summarize(samples, elapsed: float, concurrency: int):
+    ok = [s for s in samples if s[3] == 200]
+    by_intent, by_lang, errors = {}, {}, {}
+    for lang, expected, intent, status, latency, _ in samples:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+            continue
+        by_intent.setdefault(expected, []).append(latency)
+        by_lang.setdefault(lang, []).append(latency)
+    # шаблонный вопрос, который ушёл не в свой интент (обычно — в LLM), исказил бы сравнение латентности
+    misrouted = {}
+    for _, expected, intent, status, _, _ in ok:
+        if expected != "llm" and intent and intent != expected:
+            key = f"{expected}->{intent}"
+            misrouted[key] = misrouted.get(key, 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "elapsed_sec": round(elapsed, 3),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "errors": errors,
+        "bytes_avg": round(sum(s[5] for s in ok) / len(ok)) if ok else None,
+        "latency": _latency_summary([s[4] for s in ok]),
+        "by_intent": {k: _latency_summary(v) for k, v in sorted(by_intent.items())},
+        "by_lang": {k: _latency_summary(v) for k, v in sorted(by_lang.items())},
+        "misrouted": misrouted,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(data_dir: str, cache: bool, llm_base_url, workers: int, log_path: str):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "QUERY_ENGINE": "duckdb",
+        "PARQUET_PATH": os.path.join(os.path.abspath(data_dir), "*.parquet"),
+        "CACHE_ENABLED": "1" if cache else "0",
+        "LLM_SQL_CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="loadtest_llm_"), "cache.sqlite3"),
+    })
+    if llm_base_url:
+        env.update({"OPENAI_BASE_URL": llm_base_url, "OPENAI_API_KEY": "stub"})
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    log = open(log_path, "wb")
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def wait_healthy(base_url: str, proc, log_path: str, timeout: float = 300.0) -> dict:
+    client = Client(base_url, timeout=5)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}, see {log_path}")
+        try:
+            status, body, _ = client.get("/health")
+            if status == 200:
+                return json.loads(body)
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server did not become healthy in time, see {log_path}")
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, timeout=30)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def print_level(level: dict) -> None:
+    lat = level["latency"]
+    print(f"\nconcurrency={level['concurrency']}: {level['requests']} req in {level['elapsed_sec']}s, "
+          f"{level['rps']} req/s, errors={level['errors'] or 0}, "
+          f"p50={lat['p50_ms']} p95={lat['p95_ms']} p99={lat['p99_ms']} ms")
+    print(f"  {'intent':<28}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for intent, s in level["by_intent"].items():
+        print(f"  {intent:<28}{s['count']:>7}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+    if level["misrouted"]:
+        print(f"  misrouted: {level['misrouted']}")
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """p95 и RPS против прошлого прогона — уровни сопоставляются по конкуренции."""
+    print(f"\ncompare with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    old_levels = {lvl["concurrency"]: lvl for lvl in baseline["levels"]}
+    for level in current["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if not old:
+            continue
+        print(f"  concurrency={level['concurrency']}: rps {old['rps']} -> {level['rps']} ({_delta(old['rps'], level['rps'])})")
+        for intent, s in level["by_intent"].items():
+            o = old["by_intent"].get(intent)
+            if o and o["p95_ms"] and s["p95_ms"]:
+                print(f"    {intent:<28} p95 {o['p95_ms']:>9} -> {s['p95_ms']:>9} ms ({_delta(o['p95_ms'], s['p95_ms'])})")
+
+
+def _delta(old, new) -> str:
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline load test for /ask")
+    ap.add_argument("--rows", type=int, default=1_000_000, help="synthetic dataset size")
+    ap.add_argument("--data-dir", default="bench_data")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    ap.add_argument("--requests", type=int, default=500, help="requests per level (ignored with --duration)")
+    ap.add_argument("--duration", type=float, default=0, help="seconds per level instead of a fixed count")
+    ap.add_argument("--warmup", type=int, default=50)
+    ap.add_argument("--limit", type=int, default=100)
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    ap.add_argument("--cache", action="store_true", help="keep the response cache on")
+    ap.add_argument("--llm-stub", action="store_true", help="include LLM questions, served by bench/openai_stub")
+    ap.add_argument("--llm-latency-ms", type=float, default=300)
+    ap.add_argument("--url", default=None, help="use a running server instead of starting one")
+    ap.add_argument("--questions", default=QUESTIONS_PATH)
+    ap.add_argument("--out", default=None, help="result JSON (default bench/results/<commit>_<time>.json)")
+    ap.add_argument("--compare", default=None, help="previous result JSON")
+    args = ap.parse_args()
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    manifest = None if args.url else synth_data.ensure(args.rows, args.data_dir, seed=args.seed)
+
+    stub = proc = None
+    llm_base_url = None
+    if args.llm_stub and not args.url:
+        from bench.openai_stub import StubServer
+        stub = StubServer(("127.0.0.1", 0), latency_sec=args.llm_latency_ms / 1000.0)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        llm_base_url = stub.base_url
+
+    log_path = os.path.join(tempfile.gettempdir(), "loadtest_server.log")
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        proc, base_url = start_server(args.data_dir, args.cache, llm_base_url, args.workers, log_path)
+    try:
+        health = wait_healthy(base_url, proc, log_path)
+        entries = load_mix(args.questions, with_llm=args.llm_stub)
+        cards = (manifest or {}).get("cards", 500)
+        n = max(args.requests, 1)
+        warmup = make_requests(entries, args.warmup, args.seed + 1, cards)
+        requests = make_requests(entries, n if not args.duration else 10_000, args.seed, cards)
+        if warmup:
+            run_level(base_url, warmup, min(4, max(levels)), args.limit, 0, args.timeout)
+
+        result = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "url": args.url,
+                "engine": health.get("engine") if args.url else "duckdb",
+                "dataset": manifest,
+                "seed": args.seed,
+                "cache": args.cache,
+                "llm_stub": args.llm_stub,
+                "limit": args.limit,
+                "workers": args.workers,
+                "requests_per_level": None if args.duration else n,
+                "duration_per_level": args.duration or None,
+                "cpu_count": os.cpu_count(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "levels": [],
+        }
+        for concurrency in levels:
+            samples, elapsed = run_level(base_url, requests, concurrency, args.limit, args.duration, args.timeout)
+            level = summarize(samples, elapsed, concurrency)
+            result["levels"].append(level)
+            print_level(level)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if stub is not None:
+            result_stub = {"requests": stub.requests, "connections": stub.connections}
+            stub.shutdown()
+            print(f"\nOpenAI stub: {result_stub}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{result['meta']['commit']}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\nsaved {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Локальная заглушка OpenAI Chat Completions API — для бенчмарков и ручной проверки без ключа и сети.
+
+    cd backend
+    python -m bench.openai_stub --port 8089 --latency-ms 300
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn main:app
+
+На POST .../chat/completions отвечает одним и тем же SQL в ```sql``` блоке после искусственной
+задержки. Считает запросы и TCP-соединения — видно, переиспользует ли клиент пул.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_SQL = "SELECT merchant_city, COUNT(*) AS tx_count FROM transactions GROUP BY merchant_city ORDER BY tx_count DESC LIMIT 10"
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_sec: float = 0.0, sql: str = CANNED_SQL):
+        super().__init__(address, StubHandler)
+        self.latency_sec = latency_sec
+        self.sql = sql
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: одно соединение на много запросов, если клиент его держит
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.endswith("/chat/completions"):
+            return self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+        self.server.count("requests")
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": {"message": "invalid JSON"}})
+        if self.server.latency_sec:
+            time.sleep(self.server.latency_sec)
+        content = f"```sql\n{self.server.sql}\n```"
+        self._reply(200, {
+            "id": f"chatcmpl-stub-{self.server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _reply(self, status: int, obj: dict) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_stub(latency_ms: float = 0.0, port: int = 0, host: str = "127.0.0.1") -> StubServer:
+    """Заглушка в фоновом потоке; port=0 — любой свободный. Остановка — server.shutdown()."""
+    server = StubServer((host, port), latency_sec=latency_ms / 1000.0)
+    threading.Thread(target=server.serve_forever, name="openai-stub", daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local stub for the OpenAI chat completions API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    args = ap.parse_args()
+    server = StubServer((args.host, args.port), latency_sec=args.latency_ms / 1000.0)
+    print(f"OpenAI stub on {server.base_url} (latency {args.latency_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Синтетический датасет transactions для нагрузочных тестов — схема как nlp/sql_generator.SCHEMA
+(+ auth_status, его читает шаблон decline_rate_by_card), распределения похожи на реальные:
+города и мерчанты с перекосом, сумма — логнормальная, время растёт от файла к файлу (как при дозагрузке).
+
+    cd backend
+    python -m bench.synth_data --rows 1000000 --out bench_data            # 1 файл на 1M строк
+    python -m bench.synth_data --rows 100000000 --out bench_data          # 100 файлов, память — один файл
+
+Результат — parquet-файлы + manifest.json (rows, seed, year). Стенд — DuckDB прямо над файлами
+(QUERY_ENGINE=duckdb PARQUET_PATH='bench_data/*.parquet'); для MySQL — python ingest.py --parquet 'bench_data/*.parquet'.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CITIES = ["Almaty", "Astana", "Shymkent", "Karaganda", "Aktobe", "Taraz", "Pavlodar", "Ust-Kamenogorsk",
+          "Semey", "Atyrau", "Kostanay", "Kyzylorda", "Uralsk", "Petropavl", "Aktau", "Turkestan"]
+BANKS = ["Kaspi Bank", "Halyk Bank", "Jusan Bank", "ForteBank", "Bank CenterCredit", "Freedom Bank", "Eurasian Bank"]
+MCC = [(5411, "Grocery Stores"), (5812, "Restaurants"), (5541, "Fuel"), (5912, "Pharmacies"), (5311, "Department Stores"),
+       (4121, "Taxi"), (5999, "Retail"), (4814, "Telecom"), (5732, "Electronics"), (7011, "Hotels"), (4511, "Airlines"),
+       (5651, "Clothing")]
+TX_TYPES = (["POS", "ECOM", "ATM_WITHDRAWAL", "P2P", "BILL_PAYMENT"], [0.55, 0.25, 0.08, 0.08, 0.04])
+CURRENCIES = (["KZT", "USD", "EUR", "RUB"], [0.93, 0.04, 0.02, 0.01])
+RATES = {"KZT": 1.0, "USD": 1 / 470.0, "EUR": 1 / 510.0, "RUB": 1 / 5.2}
+COUNTRIES = (["KAZ", "RUS", "TUR", "ARE", "USA"], [0.94, 0.03, 0.01, 0.01, 0.01])
+ENTRY_MODES = (["Contactless", "Chip", "ECOM", "Swipe", "Manual"], [0.5, 0.2, 0.25, 0.04, 0.01])
+WALLETS = ([None, "Apple Pay", "Google Pay", "Samsung Pay"], [0.7, 0.15, 0.12, 0.03])
+AUTH = (["Approved", "Declined"], [0.95, 0.05])
+
+ROWS_PER_FILE = 1_000_000
+
+
+def _zipf_index(rng, n_values: int, size: int, a: float = 1.2) -> np.ndarray:
+    """Индексы 0..n_values-1 с перекосом (часть значений встречается намного чаще)."""
+    return (rng.zipf(a, size) - 1) % n_values
+
+
+def _strings(values, indices) -> pa.Array:
+    return pa.array(values, type=pa.string()).take(pa.array(indices))
+
+
+def _choice(rng, spec, size):
+    values, p = spec
+    return _strings(values, rng.choice(len(values), size=size, p=p))
+
+
+def make_batch(rng, start_id: int, size: int, ts_from: float, ts_to: float, n_cards: int, n_merchants: int) -> pa.Table:
+    ts = np.sort(rng.uniform(ts_from, ts_to, size)).astype("datetime64[s]")
+    merchant = _zipf_index(rng, n_merchants, size) + 1
+    mcc_idx = merchant % len(MCC)                      # у мерчанта одна категория
+    city_idx = _zipf_index(rng, len(CITIES), size, a=1.6)
+    currency_idx = rng.choice(len(CURRENCIES[0]), size=size, p=CURRENCIES[1])
+    amount = np.round(np.exp(rng.normal(8.5, 1.2, size)), 2)
+    rates = np.array([RATES[c] for c in CURRENCIES[0]])[currency_idx]
+    original = np.where(currency_idx == 0, None, np.round(amount * rates, 2).astype(str))
+    months = rng.integers(1, 13, size)
+    years = rng.integers(25, 31, size)
+    return pa.table({
+        "transaction_id": pa.array([f"tx{i:012d}" for i in range(start_id, start_id + size)]),
+        "transaction_timestamp": pa.array(ts, type=pa.timestamp("s")),
+        "card_id": pa.array(_zipf_index(rng, n_cards, size, a=1.1) + 1, type=pa.int32()),
+        "expiry_date": pa.array([f"{m:02d}/{y}" for m, y in zip(months.tolist(), years.tolist())]),
+        "issuer_bank_name": _strings(BANKS, _zipf_index(rng, len(BANKS), size, a=1.5)),
+        "merchant_id": pa.array(merchant, type=pa.int32()),
+        "merchant_mcc": _strings([str(code) for code, _ in MCC], mcc_idx).cast(pa.int32()),
+        "mcc_category": _strings([name for _, name in MCC], mcc_idx),
+        "merchant_city": _strings(CITIES, city_idx),
+        "transaction_type": _choice(rng, TX_TYPES, size),
+        "transaction_amount_kzt": pa.array(amount, type=pa.float64()),
+        "transaction_currency": _strings(CURRENCIES[0], currency_idx),
+        "original_amount": pa.array(original, type=pa.string()),
+        "acquirer_country_iso": _choice(rng, COUNTRIES, size),
+        "pos_entry_mode": _choice(rng, ENTRY_MODES, size),
+        "wallet_type": _choice(rng, WALLETS, size),
+        "auth_status": _choice(rng, AUTH, size),
+    })
+
+
+def read_manifest(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def generate(rows: int, out_dir: str, seed: int = 0, year: int = 2024, rows_per_file: int = ROWS_PER_FILE) -> dict:
+    """Пишет ceil(rows / rows_per_file) файлов; год делится между файлами по порядку."""
+    os.makedirs(out_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(out_dir, "transactions_*.parquet")):
+        os.remove(old)
+    rng = np.random.default_rng(seed)
+    n_files = max(1, -(-rows // rows_per_file))
+    year_from = datetime(year, 1, 1).timestamp()
+    year_to = datetime(year + 1, 1, 1).timestamp()
+    span = (year_to - year_from) / n_files
+    n_cards, n_merchants = max(100, rows // 50), max(50, rows // 500)
+    t0 = time.perf_counter()
+    written = 0
+    for k in range(n_files):
+        size = min(rows_per_file, rows - written)
+        table = make_batch(rng, written, size, year_from + k * span, year_from + (k + 1) * span, n_cards, n_merchants)
+        pq.write_table(table, os.path.join(out_dir, f"transactions_{k:05d}.parquet"), row_group_size=128_000)
+        written += size
+        print(f"  {written:,}/{rows:,} rows ({time.perf_counter() - t0:.1f}s)")
+    manifest = {"rows": rows, "seed": seed, "year": year, "files": n_files, "cards": n_cards, "merchants": n_merchants}
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def ensure(rows: int, out_dir: str, seed: int = 0, year: int = 2024) -> dict:
+    """Готовый датасет с теми же параметрами переиспользуется — генерация 100M строк не бесплатна."""
+    manifest = read_manifest(out_dir)
+    if manifest and manifest.get("rows") == rows and manifest.get("seed") == seed and manifest.get("year") == year:
+        return manifest
+    return generate(rows, out_dir, seed=seed, year=year)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic transactions dataset (parquet)")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--out", default="bench_data")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--year", type=int, default=2024)
+    ap.add_argument("--rows-per-file", type=int, default=ROWS_PER_FILE)
+    args = ap.parse_args()
+    manifest = generate(args.rows, args.out, seed=args.seed, year=args.year, rows_per_file=args.rows_per_file)
+    print(json.dumps(manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import datetime
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def _as_datetime(v) -> datetime.datetime:
+    return v if isinstance(v, datetime.datetime) else datetime.datetime.combine(v, datetime.time.min)
+
+
+def _overlaps(entry_range, change) -> bool:
+    """entry_range — [start, end) дат из шаблона или None (весь диапазон); change — [from, to] включительно."""
+    if entry_range is None:
+        return True
+    start, end = entry_range
+    changed_from, changed_to = change
+    return _as_datetime(changed_from) < _as_datetime(end) and _as_datetime(changed_to) >= _as_datetime(start)
+
+
+def encode_result(result) -> bytes:
+    return dumps(result)
+
+
+def decode_result(data: bytes):
+    return json.loads(data)
+
+
+class MemoryBackend:
+    """LRU в памяти процесса с бюджетом по байтам. Значения — уже сериализованные bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.evictions = 0
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()   # key -> (expires_at, bytes, date_range)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, data, _ = item
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._items.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes, ttl: float, date_range=None) -> None:
+        if len(data) > self.max_bytes:
+            return  # одиночный результат больше всего бюджета — не кэшируем
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (time.monotonic() + ttl, data, date_range)
+            self.used_bytes += len(data)
+            while self.used_bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.used_bytes = 0
+
+    def clear_ranges(self, changes) -> int:
+        """Удаляет только записи, чей диапазон дат пересекается с изменениями. Возвращает число удалённых."""
+        with self._lock:
+            stale = [k for k, (_, _, rng) in self._items.items() if any(_overlaps(rng, c) for c in changes)]
+            for k in stale:
+                self._drop(k)
+            return len(stale)
+
+    def _drop(self, key: str) -> None:
+        _, data, _ = self._items.pop(key)
+        self.used_bytes -= len(data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._items), "bytes": self.used_bytes,
+                "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """
+    Общий кэш для нескольких воркеров. Вытеснение по памяти — на стороне Redis
+    (maxmemory + allkeys-lru), TTL — через SET ... EX.
+    """
+
+    PREFIX = "ask:"
+
+    def __init__(self, url: str):
+        import redis  # опциональная зависимость: нужна только при CACHE_BACKEND=redis
+        self._r = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._r.get(self.PREFIX + key)
+
+    def set(self, key: str, data: bytes, ttl: float, date_range=None) -> None:
+        self._r.set(self.PREFIX + key, data, ex=max(1, int(ttl)))
+
+    def clear_ranges(self, changes) -> int:
+        # диапазоны в Redis не храним — сбрасываем всё
+        self.clear()
+        return -1
+
+    def clear(self) -> None:
+        keys = list(self._r.scan_iter(match=self.PREFIX + "*", count=1000))
+        for i in range(0, len(keys), 500):
+            self._r.delete(*keys[i:i + 500])
+
+    def stats(self) -> Dict[str, Any]:
+        info = self._r.info("memory")
+        return {"bytes": info.get("used_memory"), "max_bytes": info.get("maxmemory")}
+
+
+class ResultCache:
+    """
+    Кэш результатов /ask: ключ — итоговый SQL (он однозначно определяется
+    intent + top_n/month/day/year/city/card_id/limit) и имя движка.
+    Сбрасывается явно (invalidate) и автоматически, когда меняется версия данных:
+    on_data_change подписан на data_version.DataVersionWatcher.
+    """
+
+    def __init__(self, backend, ttl_default: float, ttl_by_intent: Optional[Dict[str, float]] = None):
+        self.backend = backend
+        self.ttl_default = ttl_default
+        self.ttl_by_intent = ttl_by_intent or {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # get/put зовутся из нескольких потоков db_executor, сброс — из потока DataVersionWatcher
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(engine_name: str, sql: str) -> str:
+        normalized = " ".join(sql.split())
+        return hashlib.sha256(f"{engine_name}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        try:
+            data = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Result cache get failed: {e}")
+            data = None
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return decode_result(data)
+
+    def put(self, key: str, result, intent: Optional[str] = None, date_range=None) -> None:
+        """date_range — [start, end) дат, которые прочитал запрос (None — без фильтра по дате)."""
+        ttl = self.ttl_by_intent.get(intent, self.ttl_default)
+        if ttl <= 0:
+            return
+        try:
+            self.backend.set(key, encode_result(result), ttl, date_range)
+        except Exception as e:
+            logger.warning(f"Result cache put failed: {e}")
+
+    def invalidate(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.invalidations += 1
+        logger.info("Result cache invalidated")
+
+    def invalidate_ranges(self, changes) -> None:
+        """Сброс только записей, пересекающихся с изменёнными диапазонами [(from, to), ...]."""
+        dropped = self.backend.clear_ranges(changes)
+        with self._lock:
+            self.invalidations += 1
+        logger.info(f"Result cache invalidated for {changes}: {dropped} entries dropped")
+
+    def on_data_change(self, changes: Optional[list]) -> None:
+        """Данные перезалиты/дозалиты: changes — затронутые диапазоны дат (сброс только их) или None (всё)."""
+        if changes:
+            self.invalidate_ranges(changes)
+        else:
+            self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+        total = hits + misses
+        try:
+            backend_stats = self.backend.stats()
+        except Exception as e:
+            backend_stats = {"error": str(e)}
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+            "invalidations": invalidations,
+            **backend_stats,
+        }
+
+
+def create_result_cache(backend: str, max_bytes: int, redis_url: str,
+                        ttl_default: float, ttl_by_intent: Dict[str, float]) -> ResultCache:
+    if backend == "redis":
+        store = RedisBackend(redis_url)
+    elif backend == "memory":
+        store = MemoryBackend(max_bytes)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+    return ResultCache(store, ttl_default=ttl_default, ttl_by_intent=ttl_by_intent)
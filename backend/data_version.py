@@ -0,0 +1,78 @@
+import logging
+import threading
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DataVersionWatcher:
+    """
+    Версия данных: её меняет загрузчик (sql/schema.py: bump_data_version), у DuckDB — состав и mtime файлов.
+    Фоновый поток сверяет version_fn() раз в poll_sec и при смене вызывает подписчиков — сброс кэша
+    результатов, перечитывание года по умолчанию и роллапов; от того, включён ли кэш, не зависит.
+    changes_fn(старая_версия) -> затронутые диапазоны дат [(from, to), ...] или None (изменилось всё).
+    """
+
+    def __init__(self, version_fn: Callable[[], Any], poll_sec: float,
+                 changes_fn: Optional[Callable[[Any], Optional[list]]] = None):
+        self.poll_sec = poll_sec
+        self.version = None
+        self.changes_seen = 0
+        self._version_fn = version_fn
+        self._changes_fn = changes_fn
+        self._listeners: List[Callable[[Optional[list]], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, fn: Callable[[Optional[list]], None]) -> None:
+        """fn(changes) — при каждой смене версии; changes — как у changes_fn."""
+        self._listeners.append(fn)
+
+    def start(self) -> None:
+        """Запоминает текущую версию; poll_sec <= 0 — без фонового опроса (только check())."""
+        with self._lock:
+            self.version = self._read_version()
+        if self.poll_sec > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-version", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def check(self) -> bool:
+        """Одна сверка версии; True — версия сменилась и подписчики вызваны."""
+        with self._lock:
+            version = self._read_version()
+            if version == self.version:
+                return False
+            logger.info(f"Data version changed: {self.version} -> {version}")
+            changes = self._read_changes(self.version)
+            self.version = version
+            self.changes_seen += 1
+            for fn in self._listeners:
+                try:
+                    fn(changes)
+                except Exception as e:
+                    logger.warning(f"Data version change hook failed: {e}")
+            return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_sec):
+            self.check()
+
+    def _read_version(self):
+        try:
+            return self._version_fn()
+        except Exception as e:
+            logger.warning(f"Could not read data version: {e}")
+            return self.version
+
+    def _read_changes(self, since_version) -> Optional[list]:
+        if not self._changes_fn:
+            return None
+        try:
+            return self._changes_fn(since_version)
+        except Exception as e:
+            logger.warning(f"Could not read data changes: {e}")
+            return None
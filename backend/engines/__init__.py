@@ -0,0 +1,24 @@
+from typing import Optional
+
+from config import (
+    QUERY_ENGINE, DB_URL, PARQUET_PATH, DUCKDB_THREADS, PREPARED_STATEMENT_CACHE_SIZE,
+    QUERY_TIMEOUT_MS, STREAM_QUERY_TIMEOUT_MS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE_SEC, DB_POOL_TIMEOUT_SEC,
+)
+from engines.base import QueryEngine
+
+
+def create_query_engine(name: Optional[str] = None) -> QueryEngine:
+    """Движок по имени или по config.QUERY_ENGINE."""
+    name = (name or QUERY_ENGINE).lower()
+    if name == "mysql":
+        from engines.mysql_engine import MySQLEngine
+        return MySQLEngine(DB_URL, prepared_cache_size=PREPARED_STATEMENT_CACHE_SIZE,
+                           statement_timeout_ms=QUERY_TIMEOUT_MS, stream_timeout_ms=STREAM_QUERY_TIMEOUT_MS,
+                           pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                           pool_recycle=DB_POOL_RECYCLE_SEC, pool_timeout=DB_POOL_TIMEOUT_SEC)
+    if name == "duckdb":
+        from engines.duckdb_engine import DuckDBEngine
+        return DuckDBEngine(PARQUET_PATH, threads=DUCKDB_THREADS,
+                            statement_timeout_ms=QUERY_TIMEOUT_MS, stream_timeout_ms=STREAM_QUERY_TIMEOUT_MS)
+    raise ValueError(f"Unknown QUERY_ENGINE: {name}")
@@ -0,0 +1,96 @@
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from sql.statement import Statement
+
+# SQL-строка (выполняется как есть) или Statement из sql/query_templates.py (текст + bind-параметры)
+Query = Union[str, Statement]
+
+
+class QueryTimeout(Exception):
+    """Запрос прерван по лимиту времени выполнения (QUERY_TIMEOUT_MS / STREAM_QUERY_TIMEOUT_MS)."""
+
+    def __init__(self, timeout_ms: int):
+        super().__init__(f"Query cancelled: exceeded the {timeout_ms} ms execution time limit")
+        self.timeout_ms = timeout_ms
+
+
+class QueryEngine:
+    """
+    То, на чём /ask выполняет SQL. Реализации:
+      - MySQLEngine  (engines/mysql_engine.py)  — SQLAlchemy + MySQL;
+      - DuckDBEngine (engines/duckdb_engine.py) — встроенный колоночный движок поверх Parquet.
+    """
+
+    name = "base"
+
+    def fetch_all(self, sql: Query) -> Tuple[List[str], List[tuple]]:
+        """Выполняет SELECT: (columns, rows) — кортежи прямо из курсора, без pandas. NULL -> None."""
+        raise NotImplementedError
+
+    def read_df(self, sql: Query):
+        """Выполняет SELECT и возвращает pandas.DataFrame."""
+        import pandas as pd
+
+        columns, rows = self.fetch_all(sql)
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def iter_batches(self, sql: Query, batch_size: int) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Потоковое чтение: (columns, rows) пачками по batch_size строк, без материализации
+        всего результата. Незавершённый генератор нужно закрыть (.close()).
+        """
+        raise NotImplementedError
+
+    def iter_arrow_batches(self, sql: Query, batch_size: int):
+        """
+        То же, что iter_batches, но пачками pyarrow.RecordBatch с единой схемой.
+        Общая реализация выводит типы по первой пачке; движки с типами в курсоре переопределяют.
+        """
+        import pyarrow as pa
+
+        schema = None
+        for columns, rows in self.iter_batches(sql, batch_size):
+            values = list(zip(*rows)) if rows else [[] for _ in columns]
+            if schema is None:
+                arrays = [pa.array(v, from_pandas=True) for v in values]
+                # колонка целиком из NULL в первой пачке — дальше могут прийти строки
+                schema = pa.schema([
+                    pa.field(c, pa.string() if a.type == pa.null() else a.type) for c, a in zip(columns, arrays)
+                ])
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(v, type=f.type, from_pandas=True) for v, f in zip(values, schema)], schema=schema
+            )
+
+    def scalar(self, sql: Query) -> Optional[Any]:
+        """Первая колонка первой строки (или None)."""
+        raise NotImplementedError
+
+    def explain_rows(self, sql: Query) -> Optional[int]:
+        """Оценка планировщика: сколько строк прочитает запрос (без выполнения); None — оценки нет."""
+        return None
+
+    def pool_status(self) -> Optional[dict]:
+        """Статистика пула соединений (выдано, overflow, ожидание, таймауты); None — пула нет."""
+        return None
+
+    def has_rollups(self) -> bool:
+        """Есть ли дневные роллапы (sql/schema.py: ROLLUPS)."""
+        return False
+
+    def data_version(self) -> Optional[Any]:
+        """Меняется при каждой перезагрузке/дозагрузке данных (для сброса кэшей); None — неизвестно."""
+        return None
+
+    def data_changes(self, since_version) -> Optional[list]:
+        """
+        Затронутые диапазоны [(from, to), ...] по версиям после since_version;
+        None — неизвестно, сбрасывать всё.
+        """
+        return None
+
+    def ping(self) -> None:
+        """Бросает исключение, если движок недоступен."""
+        self.scalar("SELECT 1")
+
+    def dispose(self) -> None:
+        pass
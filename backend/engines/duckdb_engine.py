@@ -0,0 +1,152 @@
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from engines.base import QueryEngine, Query, QueryTimeout
+from sql.statement import as_statement
+
+# Операторы-"вложенные циклы": читают произведение входов, а своей оценки кардинальности в плане не имеют
+_NESTED_LOOP_OPERATORS = ("CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN")
+
+
+def _duckdb_args(sql: Query):
+    """Statement -> (текст, параметры) для DuckDB: плейсхолдеры %s -> '?'; строка — как есть."""
+    stmt = as_statement(sql)
+    if not stmt.params:
+        return (stmt.sql,)
+    return stmt.sql.replace("%s", "?"), list(stmt.params)
+
+
+def _plan_rows(node: dict):
+    """(оценка строк на выходе узла, оценка прочитанных строк в поддереве) по EXPLAIN (FORMAT JSON)."""
+    children = [_plan_rows(c) for c in node.get("children", ())]
+    examined = sum(work for _, work in children)
+    estimate = str(node.get("extra_info", {}).get("Estimated Cardinality", "")).replace(",", "")
+    if node.get("name") in _NESTED_LOOP_OPERATORS:
+        product = 1
+        for rows, _ in children:
+            product *= max(rows, 1)
+        rows = int(estimate) if estimate.isdigit() else product
+        return rows, examined + product
+    rows = int(estimate) if estimate.isdigit() else max((r for r, _ in children), default=0)
+    return rows, examined + rows
+
+
+class DuckDBEngine(QueryEngine):
+    """
+    Встроенный колоночный движок: view `transactions` прямо над parquet-файлами.
+    DuckDB сам проталкивает в скан фильтры (с отсечением row group'ов по min/max статистике)
+    и проекцию (читаются только нужные колонки), выполнение векторизованное и в процессе —
+    без сетевого round trip'а. Шаблоны из query_templates.py (диапазоны по timestamp, ROUND/AVG/
+    GROUP BY/LIMIT) выполняются как есть.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, parquet_path: str, threads: int = 0, statement_timeout_ms: int = 0,
+                 stream_timeout_ms: int = 0):
+        import duckdb  # опциональная зависимость: нужна только при QUERY_ENGINE=duckdb
+
+        self._parquet_path = parquet_path
+        self._con = duckdb.connect(database=":memory:")
+        if threads:
+            self._con.execute(f"SET threads = {int(threads)}")
+        pattern = parquet_path.replace("'", "''")
+        # в view — сам шаблон пути, а не список файлов: DuckDB раскрывает glob при каждом запросе,
+        # и новые файлы (их видит data_version) читаются сразу, без рестарта.
+        # CAST над уже-TIMESTAMP колонкой — no-op, и pushdown по ней сохраняется;
+        # если в файле timestamp строкой — приводим, как parquet.py делал через pd.to_datetime
+        self._con.execute(f"""
+            CREATE VIEW transactions AS
+            SELECT * REPLACE (CAST(transaction_timestamp AS TIMESTAMP) AS transaction_timestamp)
+            FROM read_parquet('{pattern}', union_by_name = true)
+        """)
+        self._local = threading.local()
+        # лимиты времени: по таймеру cursor.interrupt() — DuckDB прерывает запрос внутри движка
+        self.statement_timeout_ms = statement_timeout_ms
+        self.stream_timeout_ms = stream_timeout_ms
+
+    def _cursor(self):
+        # одно соединение DuckDB нельзя делить между потоками — у каждого свой cursor()
+        cur = getattr(self._local, "cur", None)
+        if cur is None:
+            cur = self._local.cur = self._con.cursor()
+        return cur
+
+    @contextmanager
+    def _time_limit(self, cur, timeout_ms: int):
+        import duckdb
+
+        timer = threading.Timer(timeout_ms / 1000.0, cur.interrupt) if timeout_ms else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+        try:
+            yield
+        except duckdb.InterruptException as e:
+            raise QueryTimeout(timeout_ms) from e
+        finally:
+            if timer:
+                timer.cancel()
+
+    def fetch_all(self, sql: Query):
+        cur = self._cursor()
+        with self._time_limit(cur, self.statement_timeout_ms):
+            cur.execute(*_duckdb_args(sql))
+            return [d[0] for d in cur.description], cur.fetchall()
+
+    def read_df(self, sql: Query):
+        cur = self._cursor()
+        with self._time_limit(cur, self.statement_timeout_ms):
+            return cur.execute(*_duckdb_args(sql)).df()
+
+    def iter_batches(self, sql: Query, batch_size: int):
+        # свой cursor на весь поток: генератор могут дёргать из разных потоков,
+        # а thread-local курсор в это время нужен другим запросам
+        cur = self._con.cursor()
+        try:
+            with self._time_limit(cur, self.stream_timeout_ms):
+                cur.execute(*_duckdb_args(sql))
+                columns = [d[0] for d in cur.description]
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield columns, rows
+        finally:
+            cur.close()
+
+    def iter_arrow_batches(self, sql: Query, batch_size: int):
+        # DuckDB отдаёт Arrow нативно — без промежуточных Python-кортежей
+        cur = self._con.cursor()
+        try:
+            with self._time_limit(cur, self.stream_timeout_ms):
+                reader = cur.execute(*_duckdb_args(sql)).fetch_record_batch(batch_size)
+                for batch in reader:
+                    yield batch
+        finally:
+            cur.close()
+
+    def scalar(self, sql: Query):
+        cur = self._cursor()
+        with self._time_limit(cur, self.statement_timeout_ms):
+            row = cur.execute(*_duckdb_args(sql)).fetchone()
+        return row[0] if row else None
+
+    def explain_rows(self, sql: Query):
+        query, *params = _duckdb_args(sql)
+        plan = self._cursor().execute("EXPLAIN (FORMAT JSON) " + query, *params).fetchall()
+        return sum(_plan_rows(node)[1] for node in json.loads(plan[0][1]))
+
+    def data_version(self):
+        # состав файлов + их mtime/size: новый или перезаписанный файл меняет версию
+        return tuple(
+            (f, st.st_mtime_ns, st.st_size)
+            for f in sorted(glob.glob(self._parquet_path))
+            for st in (os.stat(f),)
+        )
+
+    def dispose(self) -> None:
+        self._con.close()
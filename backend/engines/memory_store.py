@@ -0,0 +1,346 @@
+import logging
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from engines.base import QueryEngine
+from sql.query_templates import month_range, day_range
+
+logger = logging.getLogger(__name__)
+
+# Колонки, которые нужны шаблонным интентам; порядок загрузки = порядок листинга (ORDER BY шаблона),
+# поэтому индекс по дате — это просто смещения в уже отсортированных массивах.
+LOAD_SQL = """
+    SELECT transaction_id, transaction_timestamp, merchant_id, merchant_city, transaction_amount_kzt,
+           transaction_type, wallet_type, pos_entry_mode, mcc_category
+    FROM transactions
+    ORDER BY transaction_timestamp, transaction_id
+"""
+# Колонки ответа листинга — как в sql/query_templates._transactions_listing
+LISTING_COLUMNS = ("transaction_id", "transaction_timestamp", "merchant_city", "transaction_type",
+                   "transaction_amount_kzt", "wallet_type", "pos_entry_mode", "mcc_category")
+DICT_COLUMNS = ("merchant_city", "transaction_type", "wallet_type", "pos_entry_mode", "mcc_category")
+SUPPORTED_INTENTS = ("count_transactions", "average_amount", "average_amount_in_month", "top_cities",
+                     "top_merchants_by_revenue", "transactions_in_month", "transactions_on_date")
+
+_NULL_TS = np.iinfo(np.int64).min   # NaT: NULL-время встаёт в начало и не попадает ни в один диапазон
+_CENT = Decimal("0.01")
+_AVG_SCALE = Decimal("0.000001")    # MySQL: AVG(DECIMAL(.., 2)) -> 6 знаков (div_precision_increment), потом ROUND
+
+
+def _micros(value) -> int:
+    return int(np.datetime64(value, "us").astype(np.int64))
+
+
+def _codes_dtype(n: int):
+    """Самый узкий знаковый тип под коды словаря (-1 — NULL)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class _Snapshot:
+    """Неизменяемый срез данных одной версии: массивы NumPy, отсортированные по (timestamp, id)."""
+
+    def __init__(self, table, version):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        self.version = version
+        self.rows = table.num_rows
+        self.loaded_at = time.time()
+
+        ts = table.column("transaction_timestamp").cast(pa.timestamp("us"))
+        self.ts = ts.to_numpy().view(np.int64).copy()   # NULL -> NaT == int64 min
+
+        amount_col = table.column("transaction_amount_kzt")
+        self.amount_decimal = pa.types.is_decimal(amount_col.type)   # MySQL DECIMAL -> ответы Decimal, как у драйвера
+        amount = pc.cast(amount_col, pa.float64()).to_numpy(zero_copy_only=False)
+        self.amount_valid = ~np.isnan(amount)
+        cents = np.rint(np.where(self.amount_valid, amount, 0.0) * 100)
+        # суммы в копейках int64 — точные; дробнее копейки (или огромные) — остаются float64
+        self.amount_cents = bool(np.all(np.abs(cents - np.where(self.amount_valid, amount, 0.0) * 100) < 1e-6)
+                                 and np.all(np.abs(cents) < 2 ** 53))
+        self.amount = cents.astype(np.int64) if self.amount_cents else np.where(self.amount_valid, amount, 0.0)
+
+        # у данных из MySQL порядок уже верный; NULL-время в DuckDB идёт в конец — тогда досортировываем
+        order = None
+        if self.rows > 1 and not np.all(self.ts[:-1] <= self.ts[1:]):
+            order = np.argsort(self.ts, kind="stable")
+            self.ts = self.ts[order]
+            self.amount = self.amount[order]
+            self.amount_valid = self.amount_valid[order]
+
+        def take(column):
+            column = column.combine_chunks() if hasattr(column, "combine_chunks") else column
+            return column.take(pa.array(order)) if order is not None else column
+
+        self.transaction_id = take(table.column("transaction_id"))
+
+        # строки — словарь + коды; NULL -> -1
+        self.dicts: Dict[str, list] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        for name in DICT_COLUMNS:
+            encoded = take(table.column(name)).dictionary_encode()
+            values = encoded.dictionary.to_pylist()
+            codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False)
+            self.dicts[name] = values
+            self.codes[name] = codes.astype(_codes_dtype(len(values)))
+
+        merchant = take(table.column("merchant_id"))
+        merchant_valid = pc.is_valid(merchant).to_numpy(zero_copy_only=False)
+        merchant_ids = pc.fill_null(merchant, 0).to_numpy(zero_copy_only=False)
+
+        # префиксные суммы: сумма и число непустых сумм на любом отрезке [lo, hi) — за O(1)
+        self.amount_prefix = np.concatenate(([0], np.cumsum(self.amount)))
+        self.valid_prefix = np.concatenate(([0], np.cumsum(self.amount_valid, dtype=np.int64)))
+
+        # индекс по месяцам: (год, месяц) -> [lo, hi) в отсортированных массивах
+        self.months: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        valid_ts = self.ts[self.ts != _NULL_TS]
+        if len(valid_ts):
+            first = valid_ts[0].astype("datetime64[us]").astype("datetime64[M]")
+            last = valid_ts[-1].astype("datetime64[us]").astype("datetime64[M]")
+            bounds = np.arange(first, last + 2, dtype="datetime64[M]")
+            offsets = np.searchsorted(self.ts, bounds.astype("datetime64[us]").astype(np.int64), side="left")
+            for month, lo, hi in zip(bounds[:-1].tolist(), offsets[:-1].tolist(), offsets[1:].tolist()):
+                self.months[(month.year, month.month)] = (lo, hi)
+
+        # агрегаты без фильтра по дате не зависят от вопроса — считаем при загрузке, top-K — на запросе
+        cities = self.codes["merchant_city"]
+        self.city_counts = np.bincount(cities[cities >= 0], minlength=len(self.dicts["merchant_city"]))
+        if "" in self.dicts["merchant_city"]:
+            self.city_counts[self.dicts["merchant_city"].index("")] = 0
+        self.merchant_ids, dense = np.unique(merchant_ids[merchant_valid], return_inverse=True)
+        self.merchant_tx = np.bincount(dense, minlength=len(self.merchant_ids))
+        with_amount = self.amount_valid[merchant_valid]
+        self.merchant_revenue = np.bincount(dense, weights=self.amount[merchant_valid] * with_amount,
+                                            minlength=len(self.merchant_ids))
+        self.merchant_has_amount = np.bincount(dense, weights=with_amount, minlength=len(self.merchant_ids)) > 0
+
+    def nbytes(self) -> int:
+        arrays = [self.ts, self.amount, self.amount_valid, self.amount_prefix, self.valid_prefix,
+                  self.city_counts, self.merchant_ids, self.merchant_tx, self.merchant_revenue,
+                  self.merchant_has_amount, *self.codes.values()]
+        return int(sum(a.nbytes for a in arrays) + self.transaction_id.nbytes)
+
+    # --- диапазоны ---
+
+    def slice(self, start: date, end: date) -> Tuple[int, int]:
+        """[lo, hi) строк с start <= ts < end. Целый месяц — из индекса, иначе бинарный поиск внутри месяца."""
+        if start.day == 1 and end == month_range(start.month, start.year)[1]:
+            hit = self.months.get((start.year, start.month))
+            if hit:
+                return hit
+        lo_bound, hi_bound = self.months.get((start.year, start.month), (0, self.rows))
+        lo = lo_bound + int(np.searchsorted(self.ts[lo_bound:hi_bound], _micros(start), side="left"))
+        hi = lo + int(np.searchsorted(self.ts[lo:], _micros(end), side="left")) if end > start else lo
+        return lo, hi
+
+    # --- значения в типах драйвера ---
+
+    def money(self, value):
+        """Сумма из внутреннего представления: DECIMAL-источник -> Decimal, иначе float."""
+        if self.amount_cents:
+            cents = int(round(value))
+            return Decimal(cents).scaleb(-2) if self.amount_decimal else cents / 100
+        return Decimal(repr(float(value))) if self.amount_decimal else float(value)
+
+    def average(self, lo: int, hi: int):
+        """ROUND(AVG(amount), 2) по строкам [lo, hi); нет сумм -> None (NULL)."""
+        count = int(self.valid_prefix[hi] - self.valid_prefix[lo])
+        if not count:
+            return None
+        total = self.amount_prefix[hi] - self.amount_prefix[lo]
+        if self.amount_cents:
+            exact = Decimal(int(total)) / Decimal(count) / 100
+        else:
+            exact = Decimal(repr(float(total) / count))
+        if self.amount_decimal:
+            return exact.quantize(_AVG_SCALE, ROUND_HALF_UP).quantize(_CENT, ROUND_HALF_UP)
+        return float(exact.quantize(_CENT, ROUND_HALF_UP))
+
+    def listing(self, lo: int, hi: int, after, limit: Optional[int]) -> List[dict]:
+        if after:
+            after_ts, after_id = after
+            t = _micros(after_ts)
+            p = lo + int(np.searchsorted(self.ts[lo:hi], t, side="left"))
+            q = lo + int(np.searchsorted(self.ts[lo:hi], t, side="right"))
+            # та же секунда: дальше строки с id > курсора (внутри секунды — в порядке id из БД)
+            ids = self.transaction_id.slice(p, q - p).to_pylist()
+            lo = p + next((i for i, v in enumerate(ids) if str(v) > after_id), len(ids))
+        if limit:
+            hi = min(hi, lo + int(limit))
+        if hi <= lo:
+            return []
+        columns = {
+            "transaction_id": self.transaction_id.slice(lo, hi - lo).to_pylist(),
+            "transaction_timestamp": [None if t == _NULL_TS else t
+                                      for t in self.ts[lo:hi].astype("datetime64[us]").tolist()],
+            "transaction_amount_kzt": [self.money(a) if ok else None
+                                       for a, ok in zip(self.amount[lo:hi].tolist(), self.amount_valid[lo:hi].tolist())],
+        }
+        for name in DICT_COLUMNS:
+            values = self.dicts[name]
+            columns[name] = [values[c] if c >= 0 else None for c in self.codes[name][lo:hi].tolist()]
+        return [dict(zip(LISTING_COLUMNS, row)) for row in zip(*(columns[c] for c in LISTING_COLUMNS))]
+
+    def top_k(self, scores: np.ndarray, k: int, eligible: np.ndarray) -> np.ndarray:
+        """Индексы k лучших по убыванию score среди eligible: argpartition O(n), сортируются только k."""
+        candidates = np.flatnonzero(eligible)
+        k = min(int(k), len(candidates))
+        if k <= 0:
+            return candidates[:0]
+        part = candidates[np.argpartition(-scores[candidates], k - 1)[:k]] if k < len(candidates) else candidates
+        return part[np.argsort(-scores[part], kind="stable")]
+
+
+class ColumnStore:
+    """
+    Шаблонные интенты (count, average*, top_cities, top_merchants_by_revenue, листинги по дате) — прямо из
+    памяти процесса, без похода в БД. Колонки — в NumPy (строки словарём), данные отсортированы по
+    (timestamp, id), индекс по месяцам — смещения в них. Остальное (карта, LLM SQL, потоковые ответы) идёт в БД.
+
+    Версия данных (engine.data_version) опрашивается не чаще раза в poll_sec: при смене срез считается
+    устаревшим (answer -> None, ответы снова из БД), а новый грузится в фоне и подменяет старый целиком.
+    """
+
+    def __init__(self, engine: QueryEngine, max_rows: int, poll_sec: float, batch_rows: int = 100_000):
+        self.engine = engine
+        self.max_rows = max_rows
+        self.poll_sec = poll_sec
+        self.batch_rows = batch_rows
+        self._snapshot: Optional[_Snapshot] = None
+        self._stale = True
+        self._loading = False
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.answered = 0
+        self.loads = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Первая загрузка — в фоне: до её окончания вопросы идут в БД."""
+        self._reload_async()
+
+    def _read_version(self):
+        try:
+            return self.engine.data_version()
+        except Exception as e:
+            logger.warning(f"Memory store: could not read data version: {e}")
+            return None
+
+    def _reload_async(self) -> None:
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._reload, name="memory-store-load", daemon=True).start()
+
+    def _reload(self) -> None:
+        try:
+            import pyarrow as pa
+
+            version = self._read_version()
+            started = time.perf_counter()
+            batches, rows = [], 0
+            gen = self.engine.iter_arrow_batches(LOAD_SQL, self.batch_rows)
+            try:
+                for batch in gen:
+                    rows += batch.num_rows
+                    if self.max_rows and rows > self.max_rows:
+                        raise ValueError(f"transactions has more than MEMORY_STORE_MAX_ROWS={self.max_rows} rows")
+                    batches.append(batch)
+            finally:
+                gen.close()
+            table = pa.Table.from_batches(batches) if batches else None
+            if table is None:
+                raise ValueError("transactions is empty")
+            snapshot = _Snapshot(table, version)
+            with self._lock:
+                self._snapshot = snapshot
+                self._stale = version != self._read_version()   # данные поменялись во время загрузки
+                self.loads += 1
+                self.last_error = None
+            logger.info(f"Memory store loaded {snapshot.rows} rows, {snapshot.nbytes() / 2 ** 20:.1f} MiB "
+                        f"in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Memory store load failed, template intents use the database: {e}")
+        finally:
+            with self._lock:
+                self._loading = False
+            self._checked_at = time.monotonic()
+
+    def _current(self) -> Optional[_Snapshot]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        now = time.monotonic()
+        if now - self._checked_at >= self.poll_sec and not self._loading:
+            self._checked_at = now
+            if self._read_version() != snapshot.version:
+                self._stale = True
+                logger.info("Memory store: data version changed, reloading")
+                self._reload_async()
+        return None if self._stale else snapshot
+
+    def answer(self, intent: str, params: Dict[str, Any], after: Optional[Tuple[datetime, str]] = None) -> Optional[list]:
+        """Строки ответа как у SQL шаблона или None — интент не поддерживается / данные не загружены."""
+        if intent not in SUPPORTED_INTENTS:
+            return None
+        s = self._current()
+        if s is None:
+            return None
+        month, day, year = params.get("month"), params.get("day"), params.get("year")
+
+        if intent == "count_transactions":
+            rows = [{"total_transactions": s.rows}]
+        elif intent == "average_amount":
+            rows = [{"average_amount": s.average(0, s.rows)}]
+        elif intent == "average_amount_in_month":
+            if not month:
+                return None
+            rows = [{"average_amount": s.average(*s.slice(*month_range(month, year)))}]
+        elif intent == "top_cities":
+            top = s.top_k(s.city_counts, params.get("top_n") or 10, s.city_counts > 0)
+            rows = [{"merchant_city": s.dicts["merchant_city"][i], "transaction_count": int(s.city_counts[i])}
+                    for i in top.tolist()]
+        elif intent == "top_merchants_by_revenue":
+            # SUM без единой суммы — NULL, в ORDER BY ... DESC он последний
+            scores = np.where(s.merchant_has_amount, s.merchant_revenue, -np.inf)
+            top = s.top_k(scores, params.get("top_n") or 10, s.merchant_tx > 0)
+            rows = [{"merchant_id": int(s.merchant_ids[i]),
+                     "total_revenue": s.money(s.merchant_revenue[i]) if s.merchant_has_amount[i] else None,
+                     "tx_count": int(s.merchant_tx[i])} for i in top.tolist()]
+        elif intent == "transactions_in_month":
+            if not month:
+                return None
+            rows = s.listing(*s.slice(*month_range(month, year)), after, params.get("limit"))
+        else:  # transactions_on_date
+            if not (month and day):
+                return None
+            rng = day_range(month, day, year)
+            rows = s.listing(*s.slice(*rng), after, params.get("limit")) if rng else []
+        self.answered += 1
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        s = self._snapshot
+        return {
+            "loaded": s is not None,
+            "stale": self._stale,
+            "loading": self._loading,
+            "rows": s.rows if s else None,
+            "bytes": s.nbytes() if s else None,
+            "months": len(s.months) if s else None,
+            "exact_cents": s.amount_cents if s else None,
+            "loads": self.loads,
+            "answered": self.answered,
+            "last_error": self.last_error,
+        }
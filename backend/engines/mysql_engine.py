@@ -0,0 +1,272 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+
+from engines.base import QueryEngine, Query, QueryTimeout
+from engines.pool_stats import PoolTelemetry
+from sql.schema import rollups_exist, read_data_version, read_data_changes
+from sql.statement import Statement, as_statement
+
+logger = logging.getLogger(__name__)
+
+
+# FieldType (mysql-connector) -> тип Arrow; DECIMAL -> float64, как и в JSON-ответе; прочее — строка
+_MYSQL_ARROW_TYPES = {
+    **{t: "int64" for t in ("TINY", "SHORT", "LONG", "LONGLONG", "INT24", "YEAR")},
+    **{t: "float64" for t in ("FLOAT", "DOUBLE", "DECIMAL", "NEWDECIMAL")},
+    "DATETIME": "timestamp",
+    "TIMESTAMP": "timestamp",
+    "DATE": "date32",
+}
+
+
+def _arrow_schema(description):
+    import pyarrow as pa
+    from mysql.connector import FieldType
+
+    types = {"int64": pa.int64(), "float64": pa.float64(), "timestamp": pa.timestamp("us"),
+             "date32": pa.date32(), "string": pa.string()}
+    return pa.schema([
+        pa.field(d[0], types[_MYSQL_ARROW_TYPES.get(FieldType.get_info(d[1]), "string")])
+        for d in description
+    ])
+
+
+def _arrow_column(values, field):
+    import pyarrow as pa
+
+    if pa.types.is_floating(field.type):
+        values = [None if v is None else float(v) for v in values]   # Decimal -> float
+    elif pa.types.is_string(field.type):
+        values = [None if v is None else (v.decode("utf-8", "replace") if isinstance(v, (bytes, bytearray)) else str(v))
+                  for v in values]
+    return pa.array(values, type=field.type)
+
+
+# ER_QUERY_TIMEOUT (max_execution_time) и ER_QUERY_INTERRUPTED (KILL QUERY)
+_TIMEOUT_ERRNOS = (3024, 1317)
+
+
+def _set_max_execution_time(conn, timeout_ms: int) -> None:
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SET SESSION max_execution_time = {int(timeout_ms)}")
+    finally:
+        cur.close()
+
+
+class MySQLEngine(QueryEngine):
+    name = "mysql"
+
+    def __init__(self, url: str, prepared_cache_size: int = 64, statement_timeout_ms: int = 0,
+                 stream_timeout_ms: int = 0, pool_size: int = 5, max_overflow: int = 10,
+                 pool_recycle: int = -1, pool_timeout: float = 30):
+        # pool_recycle — раньше wait_timeout сервера, иначе pre_ping будет ловить закрытые сервером соединения
+        self.engine = create_engine(url, pool_pre_ping=True, pool_size=pool_size, max_overflow=max_overflow,
+                                    pool_recycle=pool_recycle, pool_timeout=pool_timeout)
+        self.pool_telemetry = PoolTelemetry(self.engine.pool, pool_size, max_overflow, pool_timeout)
+        self.prepared_cache_size = prepared_cache_size
+        # лимит времени на сервере: max_execution_time сессии (для SELECT, в т.ч. prepared) —
+        # ставится каждому новому соединению пула; 0 — без лимита
+        self.statement_timeout_ms = statement_timeout_ms
+        self.stream_timeout_ms = stream_timeout_ms
+        if statement_timeout_ms:
+            event.listen(self.engine, "connect",
+                         lambda dbapi_conn, record: _set_max_execution_time(dbapi_conn, statement_timeout_ms))
+        self._stats_lock = threading.Lock()
+        self.statements_prepared = 0
+        self.statements_reused = 0
+
+    def _prepared_cursor(self, conn, sql: str):
+        """
+        Подготовленный курсор под текст sql из LRU этого соединения (conn.info живёт, пока живёт
+        DBAPI-соединение). Курсор mysql-connector с prepared=True делает COM_STMT_PREPARE при первом
+        execute, дальше для того же текста — только COM_STMT_EXECUTE с новыми параметрами.
+        Вытесненный курсор закрывается — сервер освобождает statement (лимит max_prepared_stmt_count).
+
+        Возвращает (курсор, текст): курсор сравнивает текст с прошлым execute по `is`, поэтому
+        выполнять нужно тем же объектом строки, с которым он был подготовлен.
+        """
+        cache = conn.info.get("prepared_cursors")
+        if cache is None:
+            cache = conn.info["prepared_cursors"] = OrderedDict()
+        entry = cache.get(sql)
+        with self._stats_lock:
+            if entry is not None:
+                self.statements_reused += 1
+            else:
+                self.statements_prepared += 1
+        if entry is not None:
+            cache.move_to_end(sql)
+            return entry
+        entry = cache[sql] = (conn.cursor(prepared=True), sql)
+        while len(cache) > self.prepared_cache_size:
+            _, (evicted, _) = cache.popitem(last=False)
+            try:
+                evicted.close()
+            except Exception as e:
+                logger.warning(f"Could not close prepared statement: {e}")
+        return entry
+
+    def _raw_connection(self):
+        with self.pool_telemetry.checkout():
+            return self.engine.raw_connection()
+
+    @contextmanager
+    def _connect(self):
+        with self.pool_telemetry.checkout():
+            conn = self.engine.connect()
+        with conn:
+            yield conn
+
+    def pool_status(self):
+        return self.pool_telemetry.snapshot()
+
+    def fetch_all(self, sql: Query):
+        """(columns, rows) целиком. Statement с prepare=True — через подготовленный курсор, прочее — как есть."""
+        stmt = as_statement(sql)
+        conn = self._raw_connection()
+        try:
+            if stmt.prepare and self.prepared_cache_size > 0:
+                cur, prepared_sql = self._prepared_cursor(conn, stmt.sql)
+                try:
+                    cur.execute(prepared_sql, stmt.params)
+                    return [d[0] for d in cur.description], cur.fetchall()
+                except Exception as e:
+                    # курсор в неизвестном состоянии — подготовим заново в следующий раз
+                    conn.info["prepared_cursors"].pop(stmt.sql, None)
+                    try:
+                        cur.close()
+                    except Exception:
+                        pass
+                    self._raise_timeout(e, self.statement_timeout_ms)
+                    raise
+            cur = conn.cursor()
+            try:
+                cur.execute(stmt.sql, stmt.params or None)
+                return [d[0] for d in cur.description], cur.fetchall()
+            except Exception as e:
+                self._raise_timeout(e, self.statement_timeout_ms)
+                raise
+            finally:
+                cur.close()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _raise_timeout(e: Exception, timeout_ms: int) -> None:
+        if getattr(e, "errno", None) in _TIMEOUT_ERRNOS:
+            raise QueryTimeout(timeout_ms) from e
+
+    def _stream_cursor(self, conn, stmt: Statement):
+        """Небуферизованный курсор для выгрузки; на время потока — свой лимит (STREAM_QUERY_TIMEOUT_MS)."""
+        if self.stream_timeout_ms != self.statement_timeout_ms:
+            _set_max_execution_time(conn, self.stream_timeout_ms)
+        cur = conn.cursor(buffered=False)
+        try:
+            cur.execute(stmt.sql, stmt.params or None)
+        except Exception as e:
+            self._raise_timeout(e, self.stream_timeout_ms)
+            raise
+        return cur
+
+    def _end_stream(self, conn) -> None:
+        if self.stream_timeout_ms != self.statement_timeout_ms:
+            _set_max_execution_time(conn, self.statement_timeout_ms)
+
+    def explain_rows(self, sql: Query):
+        """
+        EXPLAIN: в пределах одного SELECT (id) таблицы соединяются вложенными циклами — строки
+        перемножаются, разные SELECT (подзапросы, UNION) складываются.
+        """
+        stmt = as_statement(sql)
+        columns, rows = self.fetch_all(Statement("EXPLAIN " + stmt.sql, stmt.params, prepare=False))
+        id_col, rows_col = columns.index("id"), columns.index("rows")
+        per_select = {}
+        for row in rows:
+            per_select[row[id_col]] = per_select.get(row[id_col], 1) * max(int(row[rows_col] or 1), 1)
+        return sum(per_select.values())
+
+    def prepared_stats(self) -> dict:
+        return {"cache_size": self.prepared_cache_size,
+                "prepared": self.statements_prepared, "reused": self.statements_reused}
+
+    def iter_batches(self, sql: Query, batch_size: int):
+        # mysql-connector: обычный (не buffered) курсор — серверный поток строк,
+        # fetchmany читает из сокета по мере надобности, память клиента = одна пачка.
+        # Подготовленные курсоры здесь не используются: они буферизуют результат.
+        stmt = as_statement(sql)
+        conn = self._raw_connection()
+        finished = False
+        try:
+            cur = self._stream_cursor(conn, stmt)
+            columns = [d[0] for d in cur.description]
+            while True:
+                try:
+                    rows = cur.fetchmany(batch_size)
+                except Exception as e:
+                    self._raise_timeout(e, self.stream_timeout_ms)
+                    raise
+                if not rows:
+                    break
+                yield columns, rows
+            finished = True
+            cur.close()
+            self._end_stream(conn)
+        finally:
+            if not finished:
+                # недочитанный результат оставляет соединение в неконсистентном состоянии — в пул не возвращаем
+                conn.invalidate()
+            conn.close()
+
+    def iter_arrow_batches(self, sql: Query, batch_size: int):
+        # схема — по типам колонок из cursor.description, а не по первой пачке
+        import pyarrow as pa
+
+        stmt = as_statement(sql)
+        conn = self._raw_connection()
+        finished = False
+        try:
+            cur = self._stream_cursor(conn, stmt)
+            schema = _arrow_schema(cur.description)
+            while True:
+                try:
+                    rows = cur.fetchmany(batch_size)
+                except Exception as e:
+                    self._raise_timeout(e, self.stream_timeout_ms)
+                    raise
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [_arrow_column(v, f) for v, f in zip(columns, schema)], schema=schema
+                )
+            finished = True
+            cur.close()
+            self._end_stream(conn)
+        finally:
+            if not finished:
+                conn.invalidate()
+            conn.close()
+
+    def scalar(self, sql: Query):
+        _, rows = self.fetch_all(sql)
+        return rows[0][0] if rows else None
+
+    def has_rollups(self) -> bool:
+        with self._connect() as conn:
+            return rollups_exist(conn)
+
+    def data_version(self):
+        with self._connect() as conn:
+            return read_data_version(conn)
+
+    def data_changes(self, since_version):
+        with self._connect() as conn:
+            return read_data_changes(conn, since_version)
+
+    def dispose(self) -> None:
+        self.engine.dispose()
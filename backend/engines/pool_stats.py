@@ -0,0 +1,75 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+# Границы корзин гистограммы ожидания соединения, мс (последняя корзина — всё, что дольше)
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolTelemetry:
+    """
+    Живая статистика пула SQLAlchemy (QueuePool): сколько соединений выдано, сколько из них сверх
+    pool_size (overflow), сколько ждали соединения (гистограмма) и сколько не дождались (pool_timeout).
+    Ожидание меряется вокруг выдачи соединения — туда входит и установка нового соединения.
+    """
+
+    def __init__(self, pool, pool_size: int, max_overflow: int, timeout_sec: float):
+        self.pool = pool
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout_sec = timeout_sec
+        self._lock = threading.Lock()
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_count = 0
+        self.wait_sum_sec = 0.0
+        self.timeouts = 0
+
+    @contextmanager
+    def checkout(self):
+        """with telemetry.checkout(): conn = engine.raw_connection() — замер ожидания и таймаутов."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        except PoolTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        self.observe_wait(time.perf_counter() - t0)
+
+    def observe_wait(self, seconds: float) -> None:
+        ms = seconds * 1000
+        i = 0
+        while i < len(WAIT_BUCKETS_MS) and ms > WAIT_BUCKETS_MS[i]:
+            i += 1
+        with self._lock:
+            self.wait_buckets[i] += 1
+            self.wait_count += 1
+            self.wait_sum_sec += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        capacity = self.pool_size + max(self.max_overflow, 0)
+        checked_out = self.pool.checkedout()
+        with self._lock:
+            buckets = list(self.wait_buckets)
+            count, total, timeouts = self.wait_count, self.wait_sum_sec, self.timeouts
+        cumulative, histogram = 0, {}
+        for bound, n in zip([*WAIT_BUCKETS_MS, "+Inf"], buckets):
+            cumulative += n
+            histogram[f"le_{bound}ms" if bound != "+Inf" else "le_inf"] = cumulative
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "timeout_sec": self.timeout_sec,
+            "checked_out": checked_out,
+            "checked_in": self.pool.checkedin(),
+            "overflow_in_use": max(self.pool.overflow(), 0),
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+            "checkouts": count,
+            "wait_avg_ms": round(total / count * 1000, 3) if count else None,
+            "wait_total_ms": round(total * 1000, 3),
+            "wait_histogram_ms": histogram,   # накопительно: сколько выдач уложилось в <= N мс
+            "checkout_timeouts": timeouts,
+        }
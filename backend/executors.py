@@ -0,0 +1,24 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DB_EXECUTOR_WORKERS
+
+# Блокирующие вызовы драйвера БД — в свой пул (по умолчанию = pool_size + max_overflow SQLAlchemy),
+# а не в общий threadpool Starlette, где живут и /health, и прочие sync-эндпоинты.
+# CPU-тяжёлая классификация интента сюда не попадает: у zero-shot свой поток с микро-пакетами
+# (nlp/micro_batcher.py), переполнение его очереди — ExecutorBusy.
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+async def run_db(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    db_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,423 @@
+"""
+Загрузка parquet -> MySQL (таблица transactions) с ограниченной памятью.
+
+    cd backend
+    python ingest.py                                   # PARQUET_PATH из config (example_dataset.parquet)
+    python ingest.py --parquet "data/*.parquet" --workers 4 --batch-rows 100000
+
+Как устроено:
+  - задачи = row group'ы всех файлов; N процессов-воркеров читают свои row group'ы пачками
+    по --batch-rows строк (в памяти воркера — одна пачка);
+  - пачка приводится к целевым типам (Arrow compute, без pandas) и грузится самым быстрым
+    доступным способом: LOAD DATA LOCAL INFILE из временного TSV, иначе — многострочные
+    INSERT'ы через executemany (--method auto пробует первый и откатывается на второй);
+  - всё льётся в transactions__new; затем индексы, роллапы (тоже __new) и одна атомарная
+    RENAME TABLE подменяет их все разом — API не видит полузагруженных данных;
+  - в конце — строки/сек и пиковая память.
+
+Дозагрузка (--mode append) вместо полной перезаливки:
+  - берутся только новые и изменившиеся (дописанные, перезаписанные) файлы — по журналу ingest_files:
+    путь + размер + mtime; изменившиеся читаются целиком: поздние строки и исправления могут иметь
+    время раньше high-water mark, отсекать по нему нельзя;
+  - строки льются в transactions__delta и переносятся в transactions без дублей по transaction_id
+    (уже загруженные строки изменившегося файла отбрасываются здесь);
+  - роллапы пересчитываются только за затронутые дни, watermark обновляется;
+  - в журнал версий (data_changes) пишется затронутый диапазон дат — API сбросит кэш только по нему.
+
+    python ingest.py --mode append --parquet "data/*.parquet"
+"""
+import argparse
+import glob
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from config import DB_URL, PARQUET_PATH
+from sql.schema import (
+    create_indexes, build_rollups, refresh_rollup_days, rollups_exist, ROLLUPS, TRANSACTION_ID_LENGTH,
+    ensure_meta_tables, bump_data_version, read_watermark, write_watermark, INGESTED_FILES_TABLE,
+)
+
+TABLE = "transactions"
+NEW_SUFFIX = "__new"
+OLD_SUFFIX = "__old"
+DELTA_SUFFIX = "__delta"
+
+# Колонки из индексов — VARCHAR фиксированной длины, а не TEXT
+VARCHAR_COLUMNS = {"transaction_id": TRANSACTION_ID_LENGTH, "merchant_city": 255, "mcc_category": 255}
+# Может лежать в parquet строкой — приводим к TIMESTAMP (раньше это делал pd.to_datetime)
+TIMESTAMP_COLUMNS = ("transaction_timestamp",)
+
+
+# --- схема ---
+
+def target_schema(files) -> pa.Schema:
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files])
+    fields = []
+    for field in schema:
+        if field.name in TIMESTAMP_COLUMNS or pa.types.is_timestamp(field.type):
+            field = field.with_type(pa.timestamp("us"))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def mysql_type(field: pa.Field) -> str:
+    t = field.type
+    if field.name in VARCHAR_COLUMNS:
+        return f"VARCHAR({VARCHAR_COLUMNS[field.name]})"
+    if pa.types.is_timestamp(t):
+        return "DATETIME(6)"
+    if pa.types.is_boolean(t):
+        return "TINYINT(1)"
+    if pa.types.is_integer(t):
+        return "BIGINT"
+    if pa.types.is_floating(t):
+        return "DOUBLE"
+    if pa.types.is_decimal(t):
+        return f"DECIMAL({t.precision},{t.scale})"
+    if pa.types.is_date(t):
+        return "DATE"
+    return "TEXT"
+
+
+def create_table_sql(table: str, schema: pa.Schema) -> str:
+    cols = ",\n    ".join(f"`{f.name}` {mysql_type(f)} NULL" for f in schema)
+    return f"CREATE TABLE {table} (\n    {cols}\n) CHARACTER SET utf8mb4"
+
+
+# --- преобразование пачки ---
+
+def to_target(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """Колонки в порядке и типах целевой схемы; отсутствующие в файле — NULL."""
+    arrays = []
+    for field in schema:
+        idx = batch.schema.get_field_index(field.name)
+        col = batch.column(idx) if idx >= 0 else pa.nulls(batch.num_rows, type=field.type)
+        if pa.types.is_timestamp(field.type):
+            if pa.types.is_timestamp(col.type) and col.type.tz is not None:
+                col = col.cast(pa.timestamp(col.type.unit))          # UTC wall time, без tz
+            col = col.cast(pa.timestamp("us"), safe=False)           # строки/ns -> us
+        arrays.append(col)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _escape(col):
+    # экранирование LOAD DATA (ESCAPED BY '\\'): \ -> \\, таб/перевод строки -> \t \n \r, " -> \"
+    for old, new in (("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r"), ('"', '\\"')):
+        col = pc.replace_substring(col, old, new)
+    return col
+
+
+def write_tsv(batch: pa.RecordBatch, path: str) -> None:
+    """
+    Пачка -> TSV для LOAD DATA: поля через таб, строки через перевод строки, экранирование — _escape.
+    Пишется напрямую (склейка строк в Arrow compute): pyarrow.csv без кавычек отказывается писать
+    значения с двойной кавычкой, а удвоение кавычек LOAD DATA без ENCLOSED BY не понимает.
+    """
+    cols = []
+    for col in batch.columns:
+        if pa.types.is_boolean(col.type):
+            col = col.cast(pa.int8())
+        if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+            s = _escape(col.cast(pa.string()))
+        else:
+            s = col.cast(pa.string())        # timestamp -> 'YYYY-MM-DD HH:MM:SS.ffffff'
+        cols.append(pc.fill_null(s, "\\N"))  # \N — NULL для LOAD DATA
+    with open(path, "wb") as f:
+        if batch.num_rows == 0:
+            return
+        lines = pc.binary_join_element_wise(pc.binary_join_element_wise(*cols, "\t"), "\n", "")
+        data = pc.binary_join(pa.ListArray.from_arrays(pa.array([0, len(lines)], pa.int32()), lines), "")[0]
+        f.write(data.as_buffer())
+
+
+# --- воркеры ---
+
+_worker_engine = None
+_worker_method = None
+
+
+def _init_worker(db_url: str, method: str) -> None:
+    global _worker_engine, _worker_method
+    _worker_engine = create_engine(db_url, poolclass=NullPool, connect_args={"allow_local_infile": True})
+    _worker_method = method
+
+
+def _load_data(cur, table: str, batch: pa.RecordBatch) -> None:
+    fd, path = tempfile.mkstemp(suffix=".tsv", prefix="ingest_")
+    os.close(fd)
+    try:
+        write_tsv(batch, path)
+        cols = ", ".join(f"`{c}`" for c in batch.schema.names)
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({cols})"
+        )
+    finally:
+        os.unlink(path)
+
+
+def _insert(cur, table: str, batch: pa.RecordBatch) -> None:
+    cols = ", ".join(f"`{c}`" for c in batch.schema.names)
+    placeholders = ", ".join(["%s"] * batch.num_columns)
+    rows = list(zip(*(c.to_pylist() for c in batch.columns)))
+    # mysql-connector переписывает executemany для INSERT в многострочный INSERT ... VALUES (...), (...)
+    cur.executemany(f"INSERT INTO {table} ({cols}) VALUES ({placeholders})", rows)
+
+
+def load_row_group(path: str, row_group: int, table: str, schema: pa.Schema, batch_rows: int):
+    """Один row group -> таблица. Возвращает (строк, метод)."""
+    global _worker_method
+    conn = _worker_engine.raw_connection()
+    rows = 0
+    try:
+        cur = conn.cursor()
+        pf = pq.ParquetFile(path)
+        for raw in pf.iter_batches(batch_size=batch_rows, row_groups=[row_group]):
+            batch = to_target(raw, schema)
+            if _worker_method in ("auto", "load-data"):
+                try:
+                    _load_data(cur, table, batch)
+                    if _worker_method == "auto":
+                        _worker_method = "load-data"
+                except Exception as e:
+                    if _worker_method == "load-data":
+                        raise
+                    # local_infile выключен на сервере/клиенте и т.п. — дальше только INSERT'ы
+                    print(f"⚠️  LOAD DATA недоступен ({e}), переключаюсь на INSERT")
+                    _worker_method = "insert"
+                    _insert(cur, table, batch)
+            else:
+                _insert(cur, table, batch)
+            conn.commit()
+            rows += batch.num_rows
+        cur.close()
+    finally:
+        conn.close()
+    return rows, _worker_method
+
+
+# --- подмена таблиц ---
+
+def swap_in(conn, tables) -> None:
+    """Одна RENAME TABLE: x -> x__old, x__new -> x для всех таблиц сразу (атомарно в MySQL)."""
+    existing = {r[0] for r in conn.execute(text(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()"
+    ))}
+    renames = []
+    for t in tables:
+        conn.execute(text(f"DROP TABLE IF EXISTS {t}{OLD_SUFFIX}"))
+        if t in existing:
+            renames.append(f"{t} TO {t}{OLD_SUFFIX}")
+        renames.append(f"{t}{NEW_SUFFIX} TO {t}")
+    conn.execute(text("RENAME TABLE " + ", ".join(renames)))
+    for t in tables:
+        conn.execute(text(f"DROP TABLE IF EXISTS {t}{OLD_SUFFIX}"))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss в Linux — в КБ; у детей — максимум по всем завершённым воркерам
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _table_columns(conn, table: str) -> list:
+    return [r[0] for r in conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = :table
+        ORDER BY ordinal_position
+    """), {"table": table})]
+
+
+def _file_signature(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def plan_files(conn, files):
+    """(новые, изменившиеся) по журналу ingest_files; неизменившиеся пропускаем."""
+    known = {r[0]: (r[1], r[2]) for r in conn.execute(text(
+        f"SELECT path, size, mtime_ns FROM {INGESTED_FILES_TABLE}"
+    ))}
+    new, changed = [], []
+    for f in files:
+        sig = known.get(os.path.abspath(f))
+        if sig is None:
+            new.append(f)
+        elif sig != _file_signature(f):
+            changed.append(f)
+    return new, changed
+
+
+def record_files(conn, rows_by_file: dict, replace: bool = False) -> None:
+    """row_count — строк в текущей версии файла (изменившийся файл перечитан целиком)."""
+    if replace:
+        conn.execute(text(f"DELETE FROM {INGESTED_FILES_TABLE}"))
+    for f, rows in rows_by_file.items():
+        size, mtime_ns = _file_signature(f)
+        conn.execute(text(f"""
+            INSERT INTO {INGESTED_FILES_TABLE} (path, size, mtime_ns, row_count, ingested_at)
+            VALUES (:path, :size, :mtime_ns, :rows, NOW())
+            ON DUPLICATE KEY UPDATE size = :size, mtime_ns = :mtime_ns,
+                                    row_count = :rows, ingested_at = NOW()
+        """), {"path": os.path.abspath(f), "size": size, "mtime_ns": mtime_ns, "rows": rows})
+
+
+def run_workers(tasks, table: str, schema: pa.Schema, args):
+    """tasks: [(файл, row group)]. Возвращает (строк, строк по файлам)."""
+    t0 = time.perf_counter()
+    total = 0
+    rows_by_file = {}
+    methods = set()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(DB_URL, args.method)) as pool:
+        futures = {
+            pool.submit(load_row_group, f, rg, table, schema, args.batch_rows): f
+            for f, rg in tasks
+        }
+        for i, fut in enumerate(as_completed(futures), 1):
+            rows, method = fut.result()
+            total += rows
+            rows_by_file[futures[fut]] = rows_by_file.get(futures[fut], 0) + rows
+            methods.add(method)
+            elapsed = time.perf_counter() - t0
+            print(f"  [{i}/{len(tasks)}] {total} строк, {total / max(elapsed, 1e-9):,.0f} строк/с")
+    load_sec = time.perf_counter() - t0
+    print(f"✅ Загружено {total} строк за {load_sec:.1f} с ({total / max(load_sec, 1e-9):,.0f} строк/с, "
+          f"метод: {', '.join(sorted(methods))})")
+    return total, rows_by_file
+
+
+def _row_group_tasks(files):
+    return [(f, rg) for f in files for rg in range(pq.ParquetFile(f).num_row_groups)]
+
+
+def merge_delta_sql(table: str, delta: str, cols: str) -> str:
+    """
+    INSERT строк дельты, которых ещё нет в table, по transaction_id: дубли и с уже загруженными строками
+    (изменившийся файл перечитан целиком), и внутри самой дельты (из дублей — самая ранняя).
+    """
+    return f"""
+        INSERT INTO {table} ({cols})
+        SELECT {cols} FROM (
+            SELECT d.*, ROW_NUMBER() OVER (PARTITION BY d.transaction_id ORDER BY d.transaction_timestamp) AS _rn
+            FROM {delta} d
+            LEFT JOIN {table} t ON t.transaction_id = d.transaction_id
+            WHERE t.transaction_id IS NULL
+        ) x
+        WHERE x._rn = 1
+    """
+
+
+def replace_all(engine, files, schema: pa.Schema, args) -> None:
+    """Полная перезаливка: всё в __new, затем атомарная подмена."""
+    tasks = _row_group_tasks(files)
+    print(f"✅ Файлов: {len(files)}, row group'ов: {len(tasks)}, колонок: {len(schema)}")
+
+    new_table = TABLE + NEW_SUFFIX
+    with engine.begin() as conn:
+        ensure_meta_tables(conn)
+        conn.execute(text(f"DROP TABLE IF EXISTS {new_table}"))
+        conn.execute(text(create_table_sql(new_table, schema)))
+
+    total, rows_by_file = run_workers(tasks, new_table, schema, args)
+
+    t1 = time.perf_counter()
+    with engine.begin() as conn:
+        create_indexes(conn, table=new_table)
+        build_rollups(conn, source=new_table, suffix=NEW_SUFFIX)
+        swap_in(conn, [TABLE, *ROLLUPS])
+    with engine.begin() as conn:
+        write_watermark(conn)
+        record_files(conn, rows_by_file, replace=True)
+        # Новая версия данных (диапазон не указан — изменилось всё): API сбросит кэш целиком
+        bump_data_version(conn, row_count=total)
+    print(f"✅ Индексы, роллапы и подмена таблиц: {time.perf_counter() - t1:.1f} с")
+
+
+def append_new(engine, files, schema: pa.Schema, args) -> None:
+    """Дозагрузка: новые и изменившиеся файлы целиком; без дублей по transaction_id."""
+    with engine.begin() as conn:
+        ensure_meta_tables(conn)
+        live_columns = _table_columns(conn, TABLE)
+        if live_columns:
+            create_indexes(conn)   # в т.ч. idx_tx_id для дедупликации
+            new, changed = plan_files(conn, files)
+            watermark = read_watermark(conn)
+            has_rollups = rollups_exist(conn)
+    if not live_columns:
+        # после выхода из блока: replace_all берёт свои соединения и делает RENAME/DROP —
+        # транзакция и блокировки метаданных этого соединения ему мешать не должны
+        print(f"⚠️  Таблицы {TABLE} ещё нет — выполняю полную загрузку")
+        return replace_all(engine, files, schema, args)
+
+    tasks = _row_group_tasks(new) + _row_group_tasks(changed)
+    print(f"✅ Новых файлов: {len(new)}, изменившихся: {len(changed)}, watermark: {watermark}")
+    if not tasks:
+        print("✅ Новых данных нет")
+        return
+
+    # колонки — как у живой таблицы (файл с лишними колонками не ломает вставку)
+    schema = pa.schema([f for f in schema if f.name in live_columns])
+    delta = TABLE + DELTA_SUFFIX
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {delta}"))
+        conn.execute(text(f"CREATE TABLE {delta} LIKE {TABLE}"))
+
+    total, rows_by_file = run_workers(tasks, delta, schema, args)
+
+    t1 = time.perf_counter()
+    cols = ", ".join(f"`{c}`" for c in schema.names)
+    with engine.begin() as conn:
+        changed_from, changed_to = conn.execute(text(
+            f"SELECT MIN(transaction_timestamp), MAX(transaction_timestamp) FROM {delta}"
+        )).first()
+        inserted = conn.execute(text(merge_delta_sql(TABLE, delta, cols))).rowcount
+        if inserted and has_rollups and changed_from is not None:
+            refresh_rollup_days(conn, changed_from.date(), changed_to.date())
+        write_watermark(conn)
+        record_files(conn, rows_by_file)
+        if inserted:
+            version = bump_data_version(conn, changed_from=changed_from, changed_to=changed_to, row_count=inserted)
+            print(f"✅ Версия данных {version}: {changed_from} .. {changed_to}")
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {delta}"))
+    print(f"✅ Добавлено {inserted} новых строк из {total} (дубли отброшены), "
+          f"слияние и роллапы: {time.perf_counter() - t1:.1f} с")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--parquet", default=PARQUET_PATH, help="файл или глоб parquet-файлов")
+    ap.add_argument("--mode", choices=("replace", "append"), default="replace",
+                    help="replace — полная перезаливка, append — только новые файлы/строки")
+    ap.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    ap.add_argument("--batch-rows", type=int, default=100_000, help="строк в пачке (ограничивает память воркера)")
+    ap.add_argument("--method", choices=("auto", "load-data", "insert"), default="auto")
+    args = ap.parse_args(argv)
+
+    files = sorted(glob.glob(args.parquet))
+    if not files:
+        raise SystemExit(f"❌ Нет файлов по пути {args.parquet}")
+    schema = target_schema(files)
+    engine = create_engine(DB_URL)
+
+    t0 = time.perf_counter()
+    if args.mode == "append":
+        append_new(engine, files, schema, args)
+    else:
+        replace_all(engine, files, schema, args)
+    print(f"📈 Итого {time.perf_counter() - t0:.1f} с, пиковая память процесса: {_peak_rss_mb():.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
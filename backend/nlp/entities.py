@@ -0,0 +1,183 @@
+# nlp/entities.py
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+# --- helpers: распознаём месяц/день/год/город/карточку ---
+
+RU_MONTHS_STEMS = {
+    "январь": 1, "февраль": 2, "март": 3, "апрель": 4, "май": 5, "июнь": 6, "июль": 7,
+    "август": 8, "сентябрь": 9, "октябрь": 10, "ноябрь": 11, "декабрь": 12
+}
+KZ_MONTHS_STEMS = {
+    "қаңтар": 1, "ақпан": 2, "наурыз": 3, "сәуір": 4, "мамыр": 5, "маусым": 6, "шілде": 7,
+    "тамыз": 8, "қыркүйек": 9, "қазан": 10, "қараша": 11, "желтоқсан": 12
+}
+EN_MONTHS = {
+    "january":1,"february":2,"march":3,"april":4,"may":5,"june":6,
+    "july":7,"august":8,"september":9,"october":10,"november":11,"december":12
+}
+
+# Если в вопросе несколько месяцев, выигрывает первый по порядку словарей (EN, затем RU, затем KZ),
+# а не первый по тексту — так было и при поиске `name in q` циклом по словарям.
+_MONTH_PRIORITY = {}   # имя -> (приоритет, номер месяца)
+for _name, _num in [*EN_MONTHS.items(), *RU_MONTHS_STEMS.items(), *KZ_MONTHS_STEMS.items()]:
+    _MONTH_PRIORITY[_name] = (len(_MONTH_PRIORITY), _num)
+
+
+def _alternation(names) -> str:
+    return "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+
+
+# Один проход по тексту в нижнем регистре. Вся альтернатива — внутри lookahead, поэтому
+# finditer пробует каждую позицию и находит все вхождения, даже перекрывающиеся
+# (месяц внутри слова, "мартовский", тоже считается — как раньше). В одной позиции
+# может начаться только одна из веток, так что порядок веток ничего не теряет.
+_SCAN = re.compile(
+    r"(?=(?:"
+    rf"(?P<en_date>\b(?P<en_name>{_alternation(EN_MONTHS)})\s+(?P<en_day>[0-3]?\d)\b)"
+    rf"|(?P<month>{_alternation(_MONTH_PRIORITY)})"
+    r"|(?P<year>(?:19|20)\d{2})"
+    r"|(?P<num>\b[0-3]?\d\b)"
+    r"|\b(?P<top_word>топ|top)[-\s]?(?P<top>\d+)\b"
+    r"|\b(?:cid|card[\s\-_]?id)\s*[:#]?\s*(?P<card_id>\d+)\b"
+    r"))"
+)
+
+# Город — по исходному тексту: без IGNORECASE и с требованием заглавной буквы у города,
+# это отсечёт 'by total revenue'. Только 'in', 'город', 'в городе' — без 'by'.
+_CITY = re.compile(r"(?:в городе|город|in)\s+([A-Z][\w\-\s]+)")
+_CITY_STOP_WORDS = {"Total", "Revenue", "total", "revenue"}   # простая защита от "Total Revenue"
+
+# Длиннее — не top-N и не card_id (BIGINT: 19 цифр); заодно int() на тысячах цифр падает с ValueError
+_MAX_DIGITS = 18
+
+
+@dataclass
+class Entities:
+    """Параметры вопроса для шаблонов SQL. spans — позиции найденного в query.lower() (поле -> (start, end))."""
+    month: Optional[int] = None
+    day: Optional[int] = None
+    year: Optional[int] = None
+    city: Optional[str] = None
+    card_id: Optional[int] = None
+    top_n: Optional[int] = None      # None — "top N" в тексте нет
+    spans: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+
+def _scan(q: str) -> dict:
+    """Все кандидаты за один проход finditer. q — уже в нижнем регистре."""
+    found = {}
+    best_en_date = best_month = best_local_month = None   # (приоритет, номер месяца, span, ...)
+    for m in _SCAN.finditer(q):
+        if m.group("en_date") is not None:
+            prio, num = _MONTH_PRIORITY[m.group("en_name")]
+            if best_en_date is None or prio < best_en_date[0]:
+                best_en_date = (prio, num, m.span("en_name"), int(m.group("en_day")), m.span("en_day"))
+            if best_month is None or prio < best_month[0]:
+                best_month = (prio, num, m.span("en_name"))
+        elif m.group("month") is not None:
+            prio, num = _MONTH_PRIORITY[m.group("month")]
+            if best_month is None or prio < best_month[0]:
+                best_month = (prio, num, m.span("month"))
+            if m.group("month") not in EN_MONTHS and (best_local_month is None or prio < best_local_month[0]):
+                best_local_month = (prio, num, m.span("month"))
+        elif m.group("year") is not None:
+            found.setdefault("year", (int(m.group("year")), m.span("year")))
+        elif m.group("num") is not None:
+            found.setdefault("num", (int(m.group("num")), m.span("num")))
+        elif m.group("top") is not None:
+            if len(m.group("top")) <= _MAX_DIGITS:
+                found.setdefault(m.group("top_word"), (max(1, int(m.group("top"))), m.span("top")))
+        elif m.group("card_id") is not None:
+            if len(m.group("card_id")) <= _MAX_DIGITS:
+                found.setdefault("card_id", (int(m.group("card_id")), m.span("card_id")))
+    found["en_date"] = best_en_date
+    found["month"] = best_month
+    found["local_month"] = best_local_month
+    return found
+
+
+def _specific_date(found: dict):
+    """(month, day, month_span, day_span) для 'December 15' / '15 декабря' / '15 қазан', иначе None."""
+    if found["en_date"]:
+        _, month, month_span, day, day_span = found["en_date"]
+        return month, day, month_span, day_span
+    # RU/KZ: день — первое одно-двузначное число в тексте
+    if found.get("num") and found["local_month"]:
+        _, month, month_span = found["local_month"]
+        day, day_span = found["num"]
+        return month, day, month_span, day_span
+    return None
+
+
+def _city(query: str):
+    m = _CITY.search(query)
+    if m:
+        candidate = m.group(1).strip()
+        if candidate.split()[0] not in _CITY_STOP_WORDS:
+            return candidate, m.span(1)
+    return None
+
+
+def extract_entities(query: str) -> Entities:
+    """
+    Все параметры вопроса за один проход по тексту (+ поиск города с учётом регистра).
+    Сперва ищем КОНКРЕТНЫЙ ДЕНЬ ('December 15 [2023]' / '15 декабря 2023' / '15 қазан 2023'),
+    если его нет — только месяц (EN полные, RU/KZ по стемам) + опц. год.
+    """
+    found = _scan(query.lower())
+    ents = Entities()
+
+    date = _specific_date(found)
+    if date:
+        ents.month, ents.day, ents.spans["month"], ents.spans["day"] = date
+    elif found["month"]:
+        _, ents.month, ents.spans["month"] = found["month"]
+    if ents.month is not None and found.get("year"):
+        ents.year, ents.spans["year"] = found["year"]
+
+    top = found.get("топ") or found.get("top")
+    if top:
+        ents.top_n, ents.spans["top_n"] = top
+    if found.get("card_id"):
+        ents.card_id, ents.spans["card_id"] = found["card_id"]
+    city = _city(query)
+    if city:
+        ents.city, ents.spans["city"] = city
+    return ents
+
+
+# Отдельные извлекатели — тонкие обёртки с прежними сигнатурами
+
+def extract_top_n(query: str, default_n: int = 5) -> int:
+    top_n = extract_entities(query).top_n
+    return default_n if top_n is None else top_n
+
+
+def extract_month_year(query: str):
+    """Ловим месяц (EN полные, RU/KZ по стемам) + опц. год"""
+    found = _scan(query.lower())
+    if not found["month"]:
+        return None, None
+    year = found.get("year")
+    return found["month"][1], year[0] if year else None
+
+
+def extract_specific_date(query: str):
+    """(month, day, year|None), если нашли конкретный ДЕНЬ, иначе (None, None, None)."""
+    found = _scan(query.lower())
+    date = _specific_date(found)
+    if not date:
+        return None, None, None
+    year = found.get("year")
+    return date[0], date[1], year[0] if year else None
+
+
+def extract_city(query: str) -> Optional[str]:
+    city = _city(query)
+    return city[0] if city else None
+
+
+def extract_card_id(query: str) -> Optional[int]:
+    return extract_entities(query).card_id
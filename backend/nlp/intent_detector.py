@@ -1,11 +1,23 @@
 
+import asyncio
 import logging
-from typing import Optional
+import threading
+from typing import Dict, List, Optional
+
+from config import (
+    INTENT_CLASSIFIER, INTENT_MODEL_PATH, INTENT_MIN_CONFIDENCE, INTENT_MIN_MARGIN,
+    ZERO_SHOT_MAX_BATCH, ZERO_SHOT_MAX_WAIT_MS, ZERO_SHOT_MEMO_SIZE, NLP_EXECUTOR_MAX_PENDING,
+)
+from executors import ExecutorBusy
+from nlp.micro_batcher import MicroBatcher, QueueFull
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 _classifier = None
+_intent_model = None
+_zero_shot = None
+_zero_shot_lock = threading.Lock()
 _labels = [
     "count_transactions",
     "top_cities",
@@ -35,16 +47,67 @@ def _load_classifier():
             _classifier = None
     return _classifier
 
+def _load_intent_model():
+    global _intent_model
+    if _intent_model is None:
+        try:
+            from nlp.intent_model import IntentModel
+            _intent_model = IntentModel.load(INTENT_MODEL_PATH)
+            if set(_intent_model.labels) != set(_labels):
+                logger.warning(f"Intent model labels differ from _labels: {_intent_model.labels}")
+            logger.info(f"Intent model loaded from {INTENT_MODEL_PATH}")
+        except Exception as e:
+            logger.warning(f"Failed to load intent model: {e}")
+            _intent_model = None
+    return _intent_model
+
+def _zero_shot_batch(texts: List[str]) -> List[str]:
+    # пары (текст, метка) для всех текстов пакета — одним прогоном модели
+    res = _classifier(texts, _labels, batch_size=len(texts) * len(_labels))
+    if isinstance(res, dict):
+        res = [res]
+    return [r["labels"][0] for r in res]
+
+def _zero_shot_batcher() -> Optional[MicroBatcher]:
+    global _zero_shot
+    with _zero_shot_lock:
+        if _zero_shot is None and _load_classifier() is not None:
+            _zero_shot = MicroBatcher(_zero_shot_batch, max_batch=ZERO_SHOT_MAX_BATCH,
+                                      max_wait_sec=ZERO_SHOT_MAX_WAIT_MS / 1000.0,
+                                      max_pending=NLP_EXECUTOR_MAX_PENDING, memo_size=ZERO_SHOT_MEMO_SIZE,
+                                      name="zero-shot")
+    return _zero_shot
+
+def load_intent_classifier():
+    """Загрузка при старте приложения, чтобы первый запрос с промахом правил не платил за неё."""
+    if INTENT_CLASSIFIER == "local":
+        _load_intent_model()
+    elif INTENT_CLASSIFIER == "zero-shot":
+        _zero_shot_batcher()
+
+def close_intent_classifier():
+    """Остановка приложения: ждущие zero-shot запросы получают ошибку, а не висят до таймаута."""
+    if _zero_shot is not None:
+        _zero_shot.close()
+
 def detect_intent(query: str,
                   lang: Optional[str] = "en",
                   month: Optional[int] = None,
                   year: Optional[int] = None,
                   day: Optional[int] = None) -> str:
     """
-    Простые правила + (опционально) HF zero-shot.
+    Простые правила + классификатор (config.INTENT_CLASSIFIER: local | zero-shot | off).
     Если есть day -> transactions_on_date.
     Если есть month (без day) -> *_in_month.
     """
+    return detect_intent_by_rules(query, lang=lang, month=month, year=year, day=day) or classify_intent(query)
+
+def detect_intent_by_rules(query: str,
+                           lang: Optional[str] = "en",
+                           month: Optional[int] = None,
+                           year: Optional[int] = None,
+                           day: Optional[int] = None) -> Optional[str]:
+    """Только правила (дёшево, можно звать прямо в event loop). None — правила не сработали."""
     q = query.lower()
 
     # День указан -> транзакции за конкретную дату
@@ -84,13 +147,56 @@ def detect_intent(query: str,
     if any(k in q for k in ("average", "avg", "средн", "орташа", "amount", "сумм")):
         return "average_amount"
 
-    # HF fallback
-    clf = _load_classifier()
-    if clf:
-        try:
-            res = clf(query, _labels)
-            return res["labels"][0]
-        except Exception as e:
-            logger.warning(f"Classifier error: {e}")
+    return None
 
-    return "unknown"
+def classify_intent(query: str) -> str:
+    """
+    Fallback, когда правила не сработали. local — доли миллисекунды;
+    zero-shot — блокирует до ответа пакета, в async-коде — classify_intent_async.
+    """
+    return classify_intents([query])[0]
+
+def _confident_label(probs: Dict[str, float]) -> str:
+    """
+    Метка локальной модели или unknown: вопрос без шаблона (другие колонки, distinct, другие группировки)
+    лучше отдать LLM, чем ответить похожим шаблоном. Нужна и уверенность, и отрыв от второй метки.
+    """
+    ranked = sorted(probs.values(), reverse=True)
+    label = max(probs, key=probs.get)
+    margin = ranked[0] - (ranked[1] if len(ranked) > 1 else 0.0)
+    return label if ranked[0] >= INTENT_MIN_CONFIDENCE and margin >= INTENT_MIN_MARGIN else "unknown"
+
+def classify_intents(queries: List[str]) -> List[str]:
+    """Пакетная классификация; неуверенный ответ локальной модели -> unknown."""
+    if INTENT_CLASSIFIER == "local":
+        model = _load_intent_model()
+        if model:
+            return [_confident_label(probs) for probs in model.predict_proba(queries)]
+    elif INTENT_CLASSIFIER == "zero-shot":
+        batcher = _zero_shot_batcher()
+        if batcher:
+            try:
+                return batcher.predict(queries)
+            except Exception as e:
+                logger.warning(f"Classifier error: {e}")
+    return ["unknown"] * len(queries)
+
+async def classify_intent_async(query: str) -> str:
+    """Для /ask: zero-shot ждёт свой микро-пакет, не занимая поток event loop'а; очередь полна -> ExecutorBusy."""
+    if INTENT_CLASSIFIER != "zero-shot":
+        return classify_intent(query)
+    batcher = _zero_shot_batcher()
+    if batcher is None:
+        return "unknown"
+    try:
+        return await asyncio.wrap_future(batcher.submit(query))
+    except QueueFull as e:
+        raise ExecutorBusy(str(e))
+    except Exception as e:
+        logger.warning(f"Classifier error: {e}")
+        return "unknown"
+
+def intent_scores(queries: List[str]) -> List[Dict[str, float]]:
+    """Откалиброванные вероятности локальной модели по всем _labels (пустые, если модели нет)."""
+    model = _load_intent_model()
+    return model.predict_proba(queries) if model else [{} for _ in queries]
@@ -0,0 +1,246 @@
+# nlp/intent_model.py
+"""
+Лёгкий локальный классификатор интентов вместо zero-shot BART:
+символьные n-граммы (EN/RU/KZ без токенизатора) + линейная модель (мультиномиальная логрегрессия).
+Обучается офлайн на nlp/data/intents_train.jsonl, артефакт — JSON с весами:
+
+    cd backend
+    python -m nlp.intent_model                       # обучить и сохранить nlp/data/intent_model.json
+    python -m nlp.intent_model --eval-only           # только кросс-валидация
+
+Уверенности откалиброваны температурой, подобранной по out-of-fold логитам.
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+NGRAM_MIN = 2
+NGRAM_MAX = 4
+_DIGITS = re.compile(r"\d")
+# Названия месяцев (с падежными окончаниями) -> один символ: для интента важно, что месяц назван, а не какой
+_MONTH_WORDS = re.compile(
+    r"\b(?:january|february|march|april|may|june|july|august|september|october|november|december"
+    r"|январ\w*|феврал\w*|март\w*|апрел\w*|ма[йяе]\b|июн\w*|июл\w*|август\w*|сентябр\w*|октябр\w*|ноябр\w*|декабр\w*"
+    r"|қаңтар\w*|ақпан\w*|наурыз\w*|сәуір\w*|мамыр\w*|маусым\w*|шілде\w*|тамыз\w*|қыркүйек\w*|қазан\w*"
+    r"|қараша\w*|желтоқсан\w*)"
+)
+
+
+def char_ngrams(text: str) -> Dict[str, float]:
+    """Признаки текста: n-граммы символов (цифры -> '0', месяцы -> '§', чтобы даты обобщались), sublinear tf + L2."""
+    t = _MONTH_WORDS.sub("§", _DIGITS.sub("0", text.lower()))
+    t = " " + " ".join(t.split()) + " "
+    counts: Dict[str, int] = {}
+    for n in range(NGRAM_MIN, NGRAM_MAX + 1):
+        for i in range(len(t) - n + 1):
+            g = t[i:i + n]
+            counts[g] = counts.get(g, 0) + 1
+    feats = {g: 1.0 + math.log(c) for g, c in counts.items()}
+    norm = math.sqrt(sum(v * v for v in feats.values())) or 1.0
+    return {g: v / norm for g, v in feats.items()}
+
+
+def _softmax(logits: Sequence[float], temperature: float = 1.0) -> List[float]:
+    m = max(logits)
+    exps = [math.exp((x - m) / temperature) for x in logits]
+    s = sum(exps)
+    return [e / s for e in exps]
+
+
+class IntentModel:
+    """Веса: n-грамма -> вектор по меткам; неизвестные n-граммы просто не вносят вклад."""
+
+    def __init__(self, labels: List[str], weights: Dict[str, List[float]], bias: List[float],
+                 temperature: float = 1.0):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = list(bias)
+        self.temperature = temperature
+
+    def logits(self, text: str) -> List[float]:
+        scores = list(self.bias)
+        k = len(scores)
+        for g, v in char_ngrams(text).items():
+            w = self.weights.get(g)
+            if w is not None:
+                for j in range(k):
+                    scores[j] += v * w[j]
+        return scores
+
+    def predict_proba(self, texts: Sequence[str]) -> List[Dict[str, float]]:
+        """Пакетно: для каждого текста — откалиброванные вероятности по всем меткам."""
+        return [dict(zip(self.labels, _softmax(self.logits(t), self.temperature))) for t in texts]
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """Пакетно: (лучшая метка, её вероятность) для каждого текста."""
+        out = []
+        for t in texts:
+            probs = _softmax(self.logits(t), self.temperature)
+            j = max(range(len(probs)), key=probs.__getitem__)
+            out.append((self.labels[j], probs[j]))
+        return out
+
+    def to_dict(self, precision: int = 3, min_weight: float = 1e-2) -> dict:
+        weights = {
+            g: [round(x, precision) for x in w]
+            for g, w in self.weights.items() if max(abs(x) for x in w) >= min_weight
+        }
+        return {
+            "format": "char-ngram-logreg/1",
+            "ngram_range": [NGRAM_MIN, NGRAM_MAX],
+            "labels": self.labels,
+            "temperature": round(self.temperature, precision),
+            "bias": [round(x, precision) for x in self.bias],
+            "weights": weights,
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("ngram_range") != [NGRAM_MIN, NGRAM_MAX]:
+            raise ValueError(f"Unsupported intent model artifact: {path}")
+        return cls(data["labels"], data["weights"], data["bias"], data.get("temperature", 1.0))
+
+
+# --- обучение ---
+
+def load_examples(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def train(texts: Sequence[str], targets: Sequence[str], labels: List[str],
+          epochs: int = 20, lr: float = 0.5, l2: float = 1e-4, seed: int = 13) -> IntentModel:
+    """SGD с Adagrad по мультиномиальной логрегрессии. Температура здесь = 1 (калибровка — в fit())."""
+    index = {label: j for j, label in enumerate(labels)}
+    k = len(labels)
+    data = [(char_ngrams(t), index[y]) for t, y in zip(texts, targets)]
+    weights: Dict[str, List[float]] = {}
+    grad_sq: Dict[str, List[float]] = {}
+    bias = [0.0] * k
+    bias_sq = [1e-8] * k
+    rnd = random.Random(seed)
+    for _ in range(epochs):
+        rnd.shuffle(data)
+        for feats, y in data:
+            scores = list(bias)
+            for g, v in feats.items():
+                w = weights.get(g)
+                if w is not None:
+                    for j in range(k):
+                        scores[j] += v * w[j]
+            probs = _softmax(scores)
+            err = [p - (1.0 if j == y else 0.0) for j, p in enumerate(probs)]
+            for j in range(k):
+                bias_sq[j] += err[j] * err[j]
+                bias[j] -= lr * err[j] / math.sqrt(bias_sq[j])
+            for g, v in feats.items():
+                w = weights.setdefault(g, [0.0] * k)
+                sq = grad_sq.setdefault(g, [1e-8] * k)
+                for j in range(k):
+                    grad = err[j] * v + l2 * w[j]
+                    sq[j] += grad * grad
+                    w[j] -= lr * grad / math.sqrt(sq[j])
+    return IntentModel(labels, weights, bias)
+
+
+def _folds(n: int, k: int, seed: int) -> List[List[int]]:
+    idx = list(range(n))
+    random.Random(seed).shuffle(idx)
+    return [idx[i::k] for i in range(k)]
+
+
+def cross_val_logits(texts, targets, labels, folds: int = 5, seed: int = 13, **train_kw) -> List[List[float]]:
+    """Out-of-fold логиты: каждый пример оценивает модель, которая его не видела."""
+    out: List[Optional[List[float]]] = [None] * len(texts)
+    for fold in _folds(len(texts), folds, seed):
+        held = set(fold)
+        model = train([t for i, t in enumerate(texts) if i not in held],
+                      [y for i, y in enumerate(targets) if i not in held], labels, seed=seed, **train_kw)
+        for i in fold:
+            out[i] = model.logits(texts[i])
+    return out
+
+
+def fit_temperature(logits: List[List[float]], targets: Sequence[str], labels: List[str]) -> float:
+    """Температура с минимальным NLL на out-of-fold логитах (перебор по сетке — параметр один)."""
+    index = {label: j for j, label in enumerate(labels)}
+
+    def nll(temp: float) -> float:
+        return -sum(math.log(max(_softmax(z, temp)[index[y]], 1e-12)) for z, y in zip(logits, targets)) / len(targets)
+
+    grid = [0.1 * i for i in range(1, 101)]
+    return min(grid, key=nll)
+
+
+def evaluate(logits, targets, labels, temperature: float) -> Dict[str, float]:
+    """Точность и ECE (ожидаемая ошибка калибровки, 10 бинов) на out-of-fold логитах."""
+    bins = [[0, 0.0, 0.0] for _ in range(10)]   # n, сумма уверенностей, число верных
+    correct = 0
+    for z, y in zip(logits, targets):
+        probs = _softmax(z, temperature)
+        j = max(range(len(probs)), key=probs.__getitem__)
+        hit = labels[j] == y
+        correct += hit
+        b = bins[min(int(probs[j] * 10), 9)]
+        b[0] += 1
+        b[1] += probs[j]
+        b[2] += hit
+    n = len(targets)
+    ece = sum(abs(b[1] - b[2]) for b in bins if b[0]) / n
+    return {"accuracy": correct / n, "ece": ece}
+
+
+def fit(examples: List[dict], labels: List[str], folds: int = 5, **train_kw) -> Tuple[IntentModel, dict]:
+    unknown = {e["intent"] for e in examples} - set(labels)
+    if unknown:
+        raise ValueError(f"Training data has intents outside of labels: {sorted(unknown)}")
+    texts = [e["text"] for e in examples]
+    targets = [e["intent"] for e in examples]
+    oof = cross_val_logits(texts, targets, labels, folds=folds, **train_kw)
+    temperature = fit_temperature(oof, targets, labels)
+    report = {"temperature": temperature,
+              "uncalibrated": evaluate(oof, targets, labels, 1.0),
+              "calibrated": evaluate(oof, targets, labels, temperature)}
+    model = train(texts, targets, labels, **train_kw)
+    model.temperature = temperature
+    return model, report
+
+
+def main():
+    import os
+    from nlp.intent_detector import _labels
+
+    here = os.path.join(os.path.dirname(__file__), "data")
+    ap = argparse.ArgumentParser(description="Train the local char n-gram intent classifier")
+    ap.add_argument("--data", default=os.path.join(here, "intents_train.jsonl"))
+    ap.add_argument("--out", default=os.path.join(here, "intent_model.json"))
+    ap.add_argument("--epochs", type=int, default=20)
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--eval-only", action="store_true")
+    args = ap.parse_args()
+
+    examples = load_examples(args.data)
+    model, report = fit(examples, _labels, folds=args.folds, epochs=args.epochs)
+    print(f"examples={len(examples)} labels={len(_labels)} temperature={report['temperature']:.1f}")
+    for name in ("uncalibrated", "calibrated"):
+        r = report[name]
+        print(f"  cv {name:<13} accuracy={r['accuracy']:.3f} ece={r['ece']:.3f}")
+    if not args.eval_only:
+        model.save(args.out)
+        print(f"saved {args.out} ({os.path.getsize(args.out) // 1024} KiB, {len(model.to_dict()['weights'])} n-grams)")
+
+
+if __name__ == "__main__":
+    main()
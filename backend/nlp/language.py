@@ -0,0 +1,81 @@
+# nlp/language.py
+import logging
+from functools import lru_cache
+
+from config import LANG_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Буквы, которые есть в казахской кириллице и которых нет в русской
+KZ_LETTERS = frozenset("әғқңөұүһі")
+# Доля букв одного алфавита, при которой смешанный текст ("top 5 мерчантов") не считается спорным
+SCRIPT_MAJORITY = 0.8
+
+_detector = None
+
+
+def _load_detector():
+    """langdetect — только для спорных случаев; seed фиксируем, иначе ответы недетерминированы."""
+    global _detector
+    if _detector is None:
+        try:
+            from langdetect import DetectorFactory, detect
+            DetectorFactory.seed = 0
+            _detector = detect
+        except Exception as e:
+            logger.warning(f"langdetect unavailable, ambiguous text defaults to en: {e}")
+            _detector = lambda text: "en"
+    return _detector
+
+
+def _by_script(text: str):
+    """Один проход по символам: 'kk' / 'ru' / 'en' по алфавиту или None, если алфавит не решает."""
+    latin = cyrillic = other = 0
+    for ch in text:
+        if "a" <= ch <= "z":
+            latin += 1
+        elif "а" <= ch <= "я" or ch == "ё":
+            cyrillic += 1
+        elif ch in KZ_LETTERS:
+            return "kk"
+        elif ch.isalpha():
+            other += 1   # латиница с диакритикой, другие алфавиты
+    letters = latin + cyrillic + other
+    if letters == 0:
+        return "en"   # только цифры/знаки — как прежний fallback
+    if cyrillic / letters >= SCRIPT_MAJORITY:
+        return "ru"
+    if latin / letters >= SCRIPT_MAJORITY and other == 0:
+        return "en"
+    return None
+
+
+@lru_cache(maxsize=LANG_CACHE_SIZE)
+def _detect_normalized(text: str) -> str:
+    lang = _by_script(text)
+    if lang is not None:
+        return lang
+    try:
+        return _load_detector()(text)
+    except Exception:
+        return "en"
+
+
+def detect_language(text: str) -> str:
+    """
+    EN/RU/KZ: сперва по алфавиту (казахские буквы -> kk, кириллица -> ru, латиница -> en),
+    langdetect — только если алфавит не решает (смешанный текст, диакритика). Результаты — в LRU.
+    """
+    return _detect_normalized(" ".join(text.lower().split()))
+
+
+def warm_up() -> None:
+    """langdetect грузит профили при первом вызове — делаем это при старте, а не в запросе."""
+    try:
+        _load_detector()("warm up")
+    except Exception:
+        pass
+
+
+def cache_info():
+    return _detect_normalized.cache_info()
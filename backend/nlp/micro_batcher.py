@@ -0,0 +1,163 @@
+# nlp/micro_batcher.py
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BatcherClosed(Exception):
+    pass
+
+
+def _resolve(fut: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Future отменён вызывающим (asyncio.wrap_future при отмене запроса) — результат просто некому отдать."""
+    try:
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class MicroBatcher:
+    """
+    Собирает одновременные вызовы модели в микро-пакеты: один поток-обработчик берёт первый запрос,
+    добирает ещё до max_batch штук, ожидая не дольше max_wait_sec, и делает ОДИН пакетный вызов
+    predict_batch(texts) -> results (в том же порядке). Каждый вызывающий получает свой результат через Future.
+
+    Результаты запоминаются по нормализованному тексту (LRU на memo_size записей); одинаковый запрос,
+    уже стоящий в очереди, второй раз не считается, но у каждого вызывающего свой Future: отмена одного
+    (клиент отключился — asyncio.wrap_future отменяет Future) не задевает остальных.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[str]], List[Any]], max_batch: int = 16,
+                 max_wait_sec: float = 0.01, max_pending: int = 256, memo_size: int = 10000,
+                 name: str = "micro-batcher"):
+        self.predict_batch = predict_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait_sec = max_wait_sec
+        self.memo_size = memo_size
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_pending)
+        self._memo: "OrderedDict[str, Any]" = OrderedDict()
+        self._inflight: Dict[str, List[Future]] = {}   # ключ в очереди/в пакете -> ждущие его Future
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.memo_hits = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        key = normalize_query(text)
+        with self._lock:
+            if self._closed:
+                raise BatcherClosed("Micro-batcher is closed")
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.memo_hits += 1
+                fut: Future = Future()
+                fut.set_result(self._memo[key])
+                return fut
+            fut = Future()
+            waiters = self._inflight.get(key)
+            if waiters is not None:
+                waiters.append(fut)
+                return fut
+            try:
+                self._queue.put_nowait((key, text))
+            except queue.Full:
+                raise QueueFull("Micro-batch queue is full")
+            self._inflight[key] = [fut]
+            return fut
+
+    def predict(self, texts: List[str], timeout: Optional[float] = None) -> List[Any]:
+        """Синхронно, для кода вне event loop: все тексты попадают в ближайшие пакеты."""
+        futures = [self.submit(t) for t in texts]
+        return [f.result(timeout) for f in futures]
+
+    def close(self) -> None:
+        """
+        Новые submit -> BatcherClosed. Пакет, который уже считается, досчитывается; всё, что ещё ждёт
+        в очереди, получает BatcherClosed — вызывающие не висят на своих Future после остановки.
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                key, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if key is None:
+                continue
+            with self._lock:
+                waiters = self._inflight.pop(key, [])
+            for fut in waiters:
+                _resolve(fut, error=BatcherClosed("Micro-batcher closed before the query was processed"))
+        try:
+            self._queue.put_nowait((None, None))   # разбудить обработчик
+        except queue.Full:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "items": self.items, "memo_hits": self.memo_hits,
+                "avg_batch": round(self.items / self.batches, 2) if self.batches else None,
+                "pending": self._queue.qsize(), "memo_entries": len(self._memo)}
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        if first[0] is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item[0] is None:
+                self._closed = True
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while not self._closed:
+            batch = self._collect()
+            if not batch:
+                continue
+            texts = [text for _, text in batch]
+            try:
+                results = self.predict_batch(texts)
+                error = None
+            except Exception as e:
+                logger.warning(f"Batch prediction failed ({len(texts)} items): {e}")
+                results, error = None, e
+            self.batches += 1
+            self.items += len(batch)
+            with self._lock:
+                for i, (key, _) in enumerate(batch):
+                    waiters = self._inflight.pop(key, [])
+                    if error is None:
+                        self._memo[key] = results[i]
+                        if len(self._memo) > self.memo_size:
+                            self._memo.popitem(last=False)
+                    for fut in waiters:
+                        _resolve(fut, results[i] if error is None else None, error)
@@ -0,0 +1,220 @@
+# nlp/paraphrase_index.py
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from nlp.entities import Entities, extract_entities
+from nlp.intent_model import char_ngrams
+from nlp.sql_cache import normalize_question
+from sql.query_templates import question_range
+
+# Маркеры параметров в шаблоне SQL (в самом SQL такие символы не встречаются)
+_MARK = "⟨{}⟩"
+_NUMBER = re.compile(r"\d+")
+_TOKEN = re.compile(r"#|\w+")
+_SQL_STRING = re.compile(r"'((?:[^']|'')*)'")
+
+# Слова вне параметров должны совпасть буквально: n-граммы почти не различают 'highest'/'lowest',
+# 'over'/'under', 'online'/'not online', 'Apple Pay'/'Google Pay' — а SQL у них противоположный.
+# Допустимы только эти синонимы (сравнения, отрицания и значения фильтров сюда не входят никогда)
+# и служебные слова, которые смысла запроса не меняют.
+_SYNONYMS = {
+    "purchase": "transaction", "purchases": "transaction", "transactions": "transaction",
+    "txn": "transaction", "txns": "transaction", "operations": "transaction", "operation": "transaction",
+    "merchants": "merchant", "shops": "merchant", "shop": "merchant", "stores": "merchant", "store": "merchant",
+    "cities": "city", "cards": "card",
+    "покупки": "транзакции", "покупок": "транзакций", "операции": "транзакции", "операций": "транзакций",
+    "магазины": "мерчанты", "магазинов": "мерчантов",
+}
+_FILLER = {"the", "a", "an", "please", "me", "show", "list", "give", "tell", "покажи", "пожалуйста"}
+
+
+def _overlaps_date(ents: Entities) -> bool:
+    """'in March 2023' извлекатель города тоже считает городом — для шаблона это дата, не город."""
+    cs, ce = ents.spans["city"]
+    return any(s < ce and cs < e for name, (s, e) in ents.spans.items() if name in ("month", "day", "year"))
+
+
+def _entity_kinds(ents: Entities) -> Dict[str, object]:
+    """Какие параметры названы в вопросе и их значения; дата — одной гранулярностью (day/month/year)."""
+    kinds: Dict[str, object] = {}
+    if ents.top_n is not None:
+        kinds["top_n"] = ents.top_n
+    if ents.card_id is not None:
+        kinds["card_id"] = ents.card_id
+    if ents.city and not _overlaps_date(ents):
+        kinds["city"] = ents.city
+    if ents.month and ents.day:
+        kinds["range:day"] = question_range(month=ents.month, day=ents.day, year=ents.year)
+    elif ents.month:
+        kinds["range:month"] = question_range(month=ents.month, year=ents.year)
+    elif ents.year:
+        kinds["range:year"] = question_range(year=ents.year)
+    return kinds
+
+
+def _free_numbers(question: str, ents: Entities) -> Tuple[str, ...]:
+    """
+    Числа вопроса, не ставшие параметрами ('больше 1000 тенге'): признаки n-грамм их не различают
+    (цифры -> '0'), поэтому перефразировка подходит, только если они совпадают буквально.
+    """
+    q = question.lower()
+    taken = [span for name, span in ents.spans.items() if name in ("top_n", "card_id", "day", "year")]
+    return tuple(m.group(0) for m in _NUMBER.finditer(q)
+                 if not any(s <= m.start() and m.end() <= e for s, e in taken))
+
+
+def _masked(question: str, ents: Entities) -> str:
+    """Текст для сравнения: значения параметров заменены на '#' — 'card id 42 in Almaty' ~ 'card id 7 in Astana'."""
+    q = question.lower()
+    spans = sorted((span for name, span in ents.spans.items()
+                    if name != "city" or not _overlaps_date(ents)), reverse=True)
+    end_prev = len(q) + 1
+    for start, end in spans:
+        if end <= end_prev:   # перекрытия (город "March 2023" поверх месяца) — берём правый
+            q = q[:start] + "#" + q[end:]
+            end_prev = start
+    return q
+
+
+def _tokens(question: str, ents: Entities) -> Tuple[str, ...]:
+    """Слова вопроса вне параметров (значения — '#'), с синонимами и без служебных слов."""
+    return tuple(_SYNONYMS.get(t, t) for t in _TOKEN.findall(_masked(question, ents)) if t not in _FILLER)
+
+
+def _pinned_literals(question: str, template: str) -> Tuple[str, ...]:
+    """Строковые литералы SQL, названные в исходном вопросе ('Apple Pay'): в перефразировке они обязательны."""
+    q = question.lower()
+    literals = (m.group(1).replace("''", "'").lower() for m in _SQL_STRING.finditer(template))
+    return tuple(sorted({lit for lit in literals if lit and "⟨" not in lit and lit in q}))
+
+
+def make_template(sql: str, kinds: Dict[str, object]) -> Tuple[str, Dict[str, object]]:
+    """
+    Заменяет в SQL литералы параметров вопроса маркерами. Возвращает (шаблон, fixed): fixed — параметры,
+    которые найти в SQL однозначно не удалось; такой шаблон подходит только при тех же значениях.
+    """
+    fixed: Dict[str, object] = {}
+    for kind, value in kinds.items():
+        if kind == "top_n":
+            pattern = re.compile(rf"(?i)(\bLIMIT\s+){value}\b")
+        elif kind == "card_id":
+            pattern = re.compile(rf"(?i)(\bcard_id\s*=\s*){value}\b")
+        elif kind == "city":
+            pattern = re.compile("(')" + re.escape(str(value).replace("'", "''")) + "(?=')")
+        else:
+            start, end = value
+            hits_start = len(re.findall(rf"'{start.isoformat()}(?:[ T]00:00:00)?'", sql))
+            hits_end = len(re.findall(rf"'{end.isoformat()}(?:[ T]00:00:00)?'", sql))
+            if hits_start and hits_end:
+                sql = re.sub(rf"(?<='){start.isoformat()}(?=(?:[ T]00:00:00)?')", _MARK.format("start"), sql)
+                sql = re.sub(rf"(?<='){end.isoformat()}(?=(?:[ T]00:00:00)?')", _MARK.format("end"), sql)
+            else:
+                fixed[kind] = value
+            continue
+        if len(pattern.findall(sql)) == 1:
+            sql = pattern.sub(lambda m: m.group(1) + _MARK.format(kind), sql)
+        else:
+            fixed[kind] = value
+    return sql, fixed
+
+
+def render_template(template: str, kinds: Dict[str, object]) -> str:
+    sql = template
+    for kind, value in kinds.items():
+        if kind.startswith("range:"):
+            start, end = value
+            sql = sql.replace(_MARK.format("start"), start.isoformat()).replace(_MARK.format("end"), end.isoformat())
+        elif kind == "city":
+            sql = sql.replace(_MARK.format(kind), str(value).replace("'", "''"))
+        else:
+            sql = sql.replace(_MARK.format(kind), str(int(value)))
+    return sql
+
+
+class ParaphraseIndex:
+    """
+    Индекс уже отвеченных LLM вопросов: вектор символьных n-грамм (как у nlp/intent_model.py —
+    цифры и месяцы обобщены) + инвертированный список n-грамма -> записи для поиска ближайшего
+    по косинусу. Совпадение выше порога -> SQL-шаблон прежнего вопроса с параметрами текущего.
+
+    Язык вопроса в ключ не входит: SQL от него не зависит, а ru/kk на коротких вопросах путаются.
+    Но n-граммы сравнивают написание, а не смысл: перефразировка на другом языке ('топ-5 городов'
+    после 'top 5 cities') — другие n-граммы и промах, её SQL снова генерирует LLM. Вопросы шаблонных
+    интентов на всех трёх языках до индекса не доходят — их узнают правила и локальная модель.
+    """
+
+    def __init__(self, min_similarity: float, max_entries: int = 50000):
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        # (вопрос, kinds-ключ, fixed, free_numbers, слова, литералы, шаблон); None — удалена
+        self._entries: List[Optional[tuple]] = []
+        self._questions: Dict[str, int] = {}         # нормализованный вопрос -> номер записи
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, question: str, sql: str) -> bool:
+        ents = extract_entities(question)
+        kinds = _entity_kinds(ents)
+        template, fixed = make_template(sql, kinds)
+        key = normalize_question(question)
+        with self._lock:
+            if key in self._questions or len(self._questions) >= self.max_entries:
+                return False
+            idx = len(self._entries)
+            self._questions[key] = idx
+            self._entries.append((question, frozenset(kinds), fixed, _free_numbers(question, ents),
+                                  _tokens(question, ents), _pinned_literals(question, template), template))
+            for g, v in char_ngrams(_masked(question, ents)).items():
+                self._postings.setdefault(g, []).append((idx, v))
+        return True
+
+    def lookup(self, question: str) -> Optional[Tuple[str, float, str]]:
+        """(SQL, сходство, исходный вопрос) или None, если подходящей перефразировки нет."""
+        ents = extract_entities(question)
+        kinds = _entity_kinds(ents)
+        free = _free_numbers(question, ents)
+        tokens = _tokens(question, ents)
+        q = question.lower()
+        with self._lock:
+            scores: Dict[int, float] = {}
+            for g, v in char_ngrams(_masked(question, ents)).items():
+                for idx, w in self._postings.get(g, ()):
+                    scores[idx] = scores.get(idx, 0.0) + v * w
+            for idx, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True):
+                if score < self.min_similarity:
+                    break
+                if self._entries[idx] is None:
+                    continue
+                src_question, src_kinds, fixed, src_free, src_tokens, literals, template = self._entries[idx]
+                if src_kinds != frozenset(kinds) or src_free != free or src_tokens != tokens:
+                    continue
+                if any(lit not in q for lit in literals):
+                    continue
+                if any(kinds[k] != v for k, v in fixed.items()):
+                    continue
+                self.hits += 1
+                return render_template(template, kinds), score, src_question
+            self.misses += 1
+        return None
+
+    def remove(self, question: str) -> bool:
+        """Убрать вопрос (его SQL удалён из постоянного кэша); ссылки в postings пропускает lookup."""
+        with self._lock:
+            idx = self._questions.pop(normalize_question(question), None)
+            if idx is None:
+                return False
+            self._entries[idx] = None
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = []
+            self._questions = {}
+            self._postings = {}
+
+    def stats(self) -> dict:
+        return {"entries": len(self._questions), "ngrams": len(self._postings),
+                "min_similarity": self.min_similarity, "hits": self.hits, "misses": self.misses}
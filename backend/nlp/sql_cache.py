@@ -0,0 +1,101 @@
+# nlp/sql_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def normalize_question(text: str) -> str:
+    """Регистр, лишние пробелы и финальная пунктуация не делают вопрос новым."""
+    return " ".join(text.lower().split()).rstrip(" ?!.")
+
+
+def prompt_hash(*parts: str) -> str:
+    """Хэш всего, от чего зависит ответ модели (схема, системный промпт, модель): сменились — старые записи не подходят."""
+    return hashlib.sha256("\n\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class LLMSQLCache:
+    """
+    Постоянный кэш SQL, сгенерированного LLM: SQLite-файл, ключ — нормализованный вопрос + schema_hash (см. prompt_hash).
+    Кладём только SQL, прошедший EXPLAIN и выполнившийся без ошибок (sql_generator.remember_sql).
+    """
+
+    def __init__(self, path: str, schema_hash: str):
+        self.path = path
+        self.schema_hash = schema_hash
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_sql_cache (
+                key         TEXT PRIMARY KEY,
+                question    TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                sql         TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                hits        INTEGER NOT NULL DEFAULT 0,
+                last_hit_at REAL
+            )
+        """)
+
+    def make_key(self, question: str) -> str:
+        return hashlib.sha256(f"{self.schema_hash}\n{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+    def get(self, question: str) -> Optional[str]:
+        key = self.make_key(question)
+        with self._lock:
+            row = self._conn.execute("SELECT sql FROM llm_sql_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_sql_cache SET hits = hits + 1, last_hit_at = ? WHERE key = ?",
+                               (time.time(), key))
+        return row[0]
+
+    def put(self, question: str, sql: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_sql_cache (key, question, schema_hash, sql, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.make_key(question), normalize_question(question), self.schema_hash, sql, time.time()),
+            )
+
+    def entries(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT key, question, schema_hash, sql, created_at, hits, last_hit_at FROM llm_sql_cache "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset))
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def question(self, key: str) -> Optional[str]:
+        """Нормализованный вопрос записи key (None — записи нет)."""
+        with self._lock:
+            row = self._conn.execute("SELECT question FROM llm_sql_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def current_entries(self) -> List[Tuple[str, str]]:
+        """(вопрос, SQL) для текущей schema_hash — из них при старте строится индекс перефразировок."""
+        with self._lock:
+            return self._conn.execute("SELECT question, sql FROM llm_sql_cache WHERE schema_hash = ? "
+                                      "ORDER BY created_at", (self.schema_hash,)).fetchall()
+
+    def purge(self, key: Optional[str] = None, stale_only: bool = False) -> int:
+        """Удалить одну запись (key), записи под старую схему (stale_only) или всё. Возвращает число удалённых."""
+        with self._lock:
+            if key:
+                cur = self._conn.execute("DELETE FROM llm_sql_cache WHERE key = ?", (key,))
+            elif stale_only:
+                cur = self._conn.execute("DELETE FROM llm_sql_cache WHERE schema_hash <> ?", (self.schema_hash,))
+            else:
+                cur = self._conn.execute("DELETE FROM llm_sql_cache")
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, current, hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(schema_hash = ?), 0), COALESCE(SUM(hits), 0) FROM llm_sql_cache",
+                (self.schema_hash,)).fetchone()
+        return {"path": self.path, "schema_hash": self.schema_hash, "entries": total,
+                "stale_entries": total - current, "hits": hits}
@@ -3,7 +3,17 @@
 import os
 import re
 import logging
-from typing import Optional
+import threading
+from typing import Optional, Tuple
+
+from config import (
+    OPENAI_BASE_URL, OPENAI_TIMEOUT_SEC, OPENAI_CONNECT_TIMEOUT_SEC, OPENAI_MAX_RETRIES, OPENAI_MAX_CONNECTIONS,
+    LLM_SQL_CACHE_ENABLED, LLM_SQL_CACHE_PATH,
+    PARAPHRASE_ENABLED, PARAPHRASE_MIN_SIMILARITY, PARAPHRASE_MAX_ENTRIES,
+)
+from executors import run_db
+from nlp.paraphrase_index import ParaphraseIndex
+from nlp.sql_cache import LLMSQLCache, prompt_hash
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +47,9 @@ SYSTEM_MSG = (
     "1) OUTPUT ONLY the SQL inside a ```sql code block. "
     '2) Use table and column names exactly as in the schema. '
     "3) NEVER use UPDATE/DELETE/INSERT/CREATE/ALTER/DROP. SELECT only. "
-    "4) If month mentioned, use MONTH(transaction_timestamp) and optional YEAR(). "
+    "4) If a date, month or year is mentioned, filter with a half-open range on transaction_timestamp "
+    "(e.g. transaction_timestamp >= '2023-03-01' AND transaction_timestamp < '2023-04-01'); "
+    "never wrap transaction_timestamp in MONTH()/DAY()/YEAR(). "
     "5) If user asks for top N, use ORDER BY and LIMIT N. "
 )
 
@@ -50,14 +62,137 @@ Convert this request into one safe MySQL SELECT query.
 Request: {query}
 """
 
-def _import_openai():
+# Клиенты OpenAI — по одному на процесс: пул keep-alive соединений и таймауты вместо
+# нового клиента (и TLS-рукопожатия) на каждый вопрос
+_clients = {}
+_clients_lock = threading.Lock()
+_sql_cache = None
+_sql_cache_lock = threading.Lock()
+_paraphrases = None
+_paraphrases_lock = threading.Lock()
+
+def _import_openai(async_client: bool = False):
     try:
-        from openai import OpenAI  # official SDK v1.x
-        return OpenAI
+        from openai import OpenAI, AsyncOpenAI  # official SDK v1.x
+        return AsyncOpenAI if async_client else OpenAI
     except Exception as e:
         logger.warning(f"OpenAI SDK not available: {e}")
         return None
 
+def _get_client(async_client: bool = False):
+    """None — нет OPENAI_API_KEY или SDK."""
+    client = _clients.get(async_client)
+    if client is not None:
+        return client
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.warning("OPENAI_API_KEY not set — LLM SQL generation disabled.")
+        return None
+    client_cls = _import_openai(async_client=async_client)
+    if client_cls is None:
+        return None
+    with _clients_lock:
+        if async_client not in _clients:
+            import openai
+            kwargs = {}
+            try:
+                import httpx  # транспорт SDK 1.x: свои лимиты пула
+                limits = httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                                      max_keepalive_connections=OPENAI_MAX_CONNECTIONS)
+                http_cls = openai.DefaultAsyncHttpxClient if async_client else openai.DefaultHttpxClient
+                kwargs["http_client"] = http_cls(limits=limits)
+            except ImportError:
+                pass  # остаётся пул SDK с лимитами по умолчанию — он тоже общий, раз клиент один
+            _clients[async_client] = client_cls(
+                api_key=api_key,
+                base_url=OPENAI_BASE_URL,
+                timeout=openai.Timeout(OPENAI_TIMEOUT_SEC, connect=OPENAI_CONNECT_TIMEOUT_SEC),
+                max_retries=OPENAI_MAX_RETRIES,
+                **kwargs,
+            )
+    return _clients[async_client]
+
+async def close_clients() -> None:
+    for async_client, client in list(_clients.items()):
+        try:
+            if async_client:
+                await client.close()
+            else:
+                client.close()
+        except Exception as e:
+            logger.warning(f"Could not close OpenAI client: {e}")
+    _clients.clear()
+
+def get_sql_cache() -> Optional[LLMSQLCache]:
+    """Постоянный кэш вопрос -> SQL; ключ учитывает схему, промпт и модель (LLM_SQL_CACHE_ENABLED=0 — выключен)."""
+    global _sql_cache
+    if not LLM_SQL_CACHE_ENABLED:
+        return None
+    with _sql_cache_lock:
+        if _sql_cache is None:
+            try:
+                _sql_cache = LLMSQLCache(LLM_SQL_CACHE_PATH, prompt_hash(SCHEMA, SYSTEM_MSG, USER_TEMPLATE, _OPENAI_MODEL))
+            except Exception as e:
+                logger.warning(f"LLM SQL cache unavailable: {e}")
+                return None
+    return _sql_cache
+
+def get_paraphrase_index() -> Optional[ParaphraseIndex]:
+    """Индекс перефразировок; при создании наполняется вопросами из постоянного кэша."""
+    global _paraphrases
+    if not PARAPHRASE_ENABLED:
+        return None
+    with _paraphrases_lock:
+        if _paraphrases is None:
+            index = ParaphraseIndex(PARAPHRASE_MIN_SIMILARITY, max_entries=PARAPHRASE_MAX_ENTRIES)
+            cache = get_sql_cache()
+            if cache is not None:
+                try:
+                    for question, sql in cache.current_entries():
+                        index.add(question, sql)
+                    logger.info(f"Paraphrase index loaded: {index.stats()['entries']} questions")
+                except Exception as e:
+                    logger.warning(f"Could not load paraphrase index: {e}")
+            _paraphrases = index
+    return _paraphrases
+
+def _cached_sql(query: str) -> Tuple[Optional[str], str]:
+    """Точное совпадение в постоянном кэше ("cache"), иначе — перефразировка уже отвеченного вопроса ("paraphrase")."""
+    cache = get_sql_cache()
+    if cache is not None:
+        try:
+            sql = cache.get(query)
+            if sql:
+                return sql, "cache"
+        except Exception as e:
+            logger.warning(f"LLM SQL cache get failed: {e}")
+    index = get_paraphrase_index()
+    if index is not None:
+        found = index.lookup(query)
+        if found:
+            sql, score, source = found
+            logger.info(f"Paraphrase of {source!r} (similarity {score:.3f}), LLM call skipped")
+            return sql, "paraphrase"
+    return None, "llm"
+
+def remember_sql(query: str, sql: Optional[str]) -> None:
+    """
+    SQL от LLM -> постоянный кэш и индекс перефразировок. Вызывать только для проверенного SQL —
+    после EXPLAIN (check_cost) и успешного выполнения (main.remember_llm_sql), а не сразу после ответа модели:
+    иначе запрос с несуществующей колонкой будет отдаваться из кэша снова и снова.
+    """
+    if not sql:
+        return
+    cache = get_sql_cache()
+    if cache is not None:
+        try:
+            cache.put(query, sql)
+        except Exception as e:
+            logger.warning(f"LLM SQL cache put failed: {e}")
+    index = get_paraphrase_index()
+    if index is not None:
+        index.add(query, sql)
+
 def _extract_sql(text: str) -> Optional[str]:
     if not text:
         return None
@@ -68,49 +203,79 @@ def _extract_sql(text: str) -> Optional[str]:
         return None
     return candidate
 
+def _messages(query: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_MSG},
+        {"role": "user", "content": USER_TEMPLATE.format(schema=SCHEMA, query=query)},
+    ]
+
+def _sql_from_response(resp) -> Optional[str]:
+    content = resp.choices[0].message.content if resp and resp.choices else ""
+    sql = _extract_sql(content)
+    if not sql:
+        logger.warning("LLM returned no valid SELECT SQL.")
+        return None
+
+    # защита от опасных операторов
+    if re.search(r"(?is)\b(update|delete|insert|create|alter|drop|truncate|grant|revoke)\b", sql):
+        logger.warning("LLM SQL contained a banned keyword.")
+        return None
+
+    return sql
+
 def sql_by_llm(query: str, lang: str = "en") -> Optional[str]:
     """
     Вернёт SELECT или None, если:
       - нет OPENAI_API_KEY,
       - нет SDK,
-      - модель не вернула валидный SELECT.
+      - модель не вернула валидный SELECT (или не уложилась в таймаут).
+    Ответ уже задававшегося вопроса берётся из постоянного кэша без обращения к API;
+    новый SQL в кэш не кладётся — это делает remember_sql, когда SQL проверен и выполнился.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.warning("OPENAI_API_KEY not set — LLM SQL generation disabled.")
-        return None
+    sql, _ = _cached_sql(query)
+    if sql:
+        return sql
 
-    OpenAI = _import_openai()
-    if OpenAI is None:
+    client = _get_client()
+    if client is None:
         return None
 
     try:
-        client = OpenAI(api_key=api_key)
-        user_msg = USER_TEMPLATE.format(schema=SCHEMA, query=query)
-
         resp = client.chat.completions.create(
             model=_OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_MSG},
-                {"role": "user", "content": user_msg},
-            ],
+            messages=_messages(query),
             temperature=0.0,
         )
+        return _sql_from_response(resp)
 
-        content = resp.choices[0].message.content if resp and resp.choices else ""
-        sql = _extract_sql(content)
-        if not sql:
-            logger.warning("LLM returned no valid SELECT SQL.")
-            return None
+    except Exception:
+        logger.exception("LLM SQL generation failed")
+        return None
 
-        # защита от опасных операторов
-        if re.search(r"(?is)\b(update|delete|insert|create|alter|drop|truncate|grant|revoke)\b", sql):
-            logger.warning("LLM SQL contained a banned keyword.")
-            return None
+async def sql_by_llm_async(query: str, lang: str = "en") -> Optional[str]:
+    """То же, что sql_by_llm, но через AsyncOpenAI — ожидание ответа модели не занимает поток."""
+    sql, _ = await sql_by_llm_with_source_async(query, lang)
+    return sql
 
-        return sql
+async def sql_by_llm_with_source_async(query: str, lang: str = "en") -> Tuple[Optional[str], str]:
+    """(SQL, откуда он: "cache" | "paraphrase" | "llm") — источник нужен метрикам /ask."""
+    # SQLite и поиск по индексу блокируют — не в event loop, а в db_executor, как и прочий I/O
+    sql, source = await run_db(_cached_sql, query)
+    if sql:
+        return sql, source
+
+    client = _get_client(async_client=True)
+    if client is None:
+        return None, source
+
+    try:
+        resp = await client.chat.completions.create(
+            model=_OPENAI_MODEL,
+            messages=_messages(query),
+            temperature=0.0,
+        )
+        return _sql_from_response(resp), source
 
     except Exception:
         logger.exception("LLM SQL generation failed")
-        return None
-
+        return None, source
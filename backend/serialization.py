@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import json
+
+try:
+    import orjson  # опционально: в разы быстрее json и сам пишет datetime/date; без него — stdlib json
+except ImportError:
+    orjson = None
+
+
+def json_default(o):
+    # то же, что сделал бы jsonable_encoder FastAPI — чтобы все форматы ответа совпадали
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return int(o) if o.as_tuple().exponent >= 0 else float(o)
+    if hasattr(o, "item"):  # numpy-скаляры
+        return o.item()
+    return str(o)
+
+
+def dumps(obj) -> bytes:
+    """Компактный JSON в UTF-8 (как тело JSONResponse), без прохода jsonable_encoder по каждой ячейке."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default)
+    return json.dumps(obj, default=json_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def ndjson_lines(columns, rows) -> bytes:
+    """Пачка строк-кортежей -> NDJSON (по объекту на строку)."""
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+
+class _ChunkSink:
+    """File-like приёмник для писателей pyarrow: копит байты, которые отдаём клиенту по мере записи."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def columnar_chunks(batches, fmt: str, metadata: dict):
+    """
+    Пачки pyarrow.RecordBatch -> байты Arrow IPC stream (fmt="arrow") или Parquet (fmt="parquet"),
+    по мере поступления пачек. metadata кладётся в метаданные схемы.
+    """
+    import pyarrow as pa
+
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                schema = batch.schema.with_metadata({k: str(v) for k, v in metadata.items()})
+                writer = _open_writer(pa.PythonFile(sink, mode="w"), schema, fmt)
+            writer.write_batch(batch)   # метаданные схемы при сверке не учитываются
+            yield sink.drain()
+        if writer is None:
+            # пустой результат: схему взять неоткуда, отдаём валидный пустой поток/файл
+            schema = pa.schema([]).with_metadata({k: str(v) for k, v in metadata.items()})
+            writer = _open_writer(pa.PythonFile(sink, mode="w"), schema, fmt)
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+def _open_writer(sink, schema, fmt: str):
+    import pyarrow as pa
+
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema)
+    raise ValueError(f"Unknown columnar format: {fmt}")
@@ -0,0 +1,32 @@
+import logging
+from typing import Optional
+
+from sql.statement import Statement
+
+logger = logging.getLogger(__name__)
+
+# Предварительная проверка SQL, которого мы не писали (от LLM): EXPLAIN без выполнения,
+# оценка числа прочитанных строк сравнивается с бюджетом. Шаблоны сюда не идут — они заведомо по индексам.
+# Оценка планировщика грубая (кросс-джойн, агрегат по всей таблице видны, точные числа — нет);
+# от ошибок оценки страхует лимит времени выполнения на сервере (QUERY_TIMEOUT_MS).
+
+
+class QueryTooExpensive(Exception):
+    def __init__(self, estimate: int, budget: int):
+        super().__init__(f"Generated SQL is too expensive: the planner estimates ~{estimate:,} rows examined "
+                         f"(budget {budget:,}). Try narrowing the question (date range, card, city).")
+        self.estimate = estimate
+        self.budget = budget
+
+
+def check_cost(engine, stmt: Statement, max_rows: int) -> Optional[int]:
+    """Оценка прочитанных строк (None — движок не оценивает); выше max_rows -> QueryTooExpensive."""
+    if not max_rows:
+        return None
+    estimate = engine.explain_rows(stmt)
+    if estimate is None:
+        return None
+    if estimate > max_rows:
+        logger.warning(f"Rejected LLM SQL: estimated {estimate} rows examined > {max_rows}: {stmt.render()}")
+        raise QueryTooExpensive(estimate, max_rows)
+    return estimate
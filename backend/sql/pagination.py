@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Keyset-пагинация листингов (transactions_in_month / transactions_on_date):
+# курсор = последняя отданная пара (transaction_timestamp, transaction_id), порядок выдачи — по ней же.
+# Следующая страница — seek по индексу idx_tx_ts_id от этой пары, без OFFSET.
+
+PAGINATED_INTENTS = ("transactions_in_month", "transactions_on_date")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ts, tx_id) -> str:
+    """ts — datetime/pd.Timestamp или ISO-строка (строки из кэша результатов)."""
+    ts_iso = ts.isoformat() if hasattr(ts, "isoformat") else str(ts)
+    raw = json.dumps([ts_iso, str(tx_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        ts_iso, tx_id = json.loads(raw)
+        return datetime.fromisoformat(ts_iso), str(tx_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from e
+
+
+def next_cursor(rows: list, page_size: Optional[int]) -> Optional[str]:
+    """Курсор на следующую страницу, если текущая заполнена целиком."""
+    if not rows or not page_size or len(rows) < page_size:
+        return None
+    last = rows[-1]
+    if "transaction_timestamp" not in last or "transaction_id" not in last:
+        return None  # не шаблонный листинг (например, SQL от LLM)
+    return encode_cursor(last["transaction_timestamp"], last["transaction_id"])
@@ -1,5 +1,8 @@
 
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sql.statement import Statement
 
 def _safe_int(v, default=None):
     try:
@@ -7,34 +10,152 @@ def _safe_int(v, default=None):
     except:
         return default
 
-def build_transactions_in_month_sql(month: int, year: Optional[int] = None, limit: Optional[int] = None) -> str:
-    where = [f"MONTH(transaction_timestamp) = {_safe_int(month, 1)}"]
-    if year:
-        where.append(f"YEAR(transaction_timestamp) = {_safe_int(year)}")
-    base = f"""
-        SELECT 
-            transaction_id,
-            transaction_timestamp,
-            merchant_city,
-            transaction_type,
-            transaction_amount_kzt,
-            wallet_type,
-            pos_entry_mode,
-            mcc_category
-        FROM transactions
-        WHERE {' AND '.join(where)}
-        ORDER BY transaction_timestamp
+# --- диапазоны дат ---
+# Никаких MONTH()/DAY()/YEAR() над колонкой: только полуоткрытый диапазон
+# transaction_timestamp >= start AND transaction_timestamp < end, чтобы MySQL шёл по индексу.
+
+# Год по умолчанию, если его нет в вопросе: последний год, присутствующий в данных
+# (main.py выставляет при старте через set_default_year). Иначе — текущий год.
+_default_year: Optional[int] = None
+
+def set_default_year(year: Optional[int]) -> None:
+    global _default_year
+    _default_year = _safe_int(year)
+
+def resolve_year(year: Optional[int] = None) -> int:
+    return _safe_int(year) or _default_year or date.today().year
+
+def month_range(month: int, year: Optional[int] = None):
+    y, m = resolve_year(year), _safe_int(month, 1)
+    start = date(y, m, 1)
+    end = date(y + 1, 1, 1) if m == 12 else date(y, m + 1, 1)
+    return start, end
+
+def day_range(month: int, day: int, year: Optional[int] = None):
+    y = resolve_year(year)
+    try:
+        start = date(y, _safe_int(month, 1), _safe_int(day, 1))
+    except ValueError:
+        return None  # 30 февраля и т.п.
+    return start, date.fromordinal(start.toordinal() + 1)
+
+def _year_range(year: int):
+    y = resolve_year(year)
+    return date(y, 1, 1), date(y + 1, 1, 1)
+
+# Интенты, чьи шаблоны фильтруют по дате; остальные читают все данные
+DATE_FILTERED_INTENTS = ("transactions_in_month", "transactions_on_date", "average_amount_in_month", "decline_rate_by_card")
+
+def date_range(intent: str, month: Optional[int] = None, day: Optional[int] = None, year: Optional[int] = None):
+    """
+    Полуоткрытый диапазон [start, end) дат, который читает шаблон интента с такими фильтрами;
+    None — фильтра по дате нет (читаются все данные). Нужен для точечной инвалидации кэша.
     """
-    if limit:
-        base += f" LIMIT {_safe_int(limit, 100)}"
-    return base
+    if intent not in DATE_FILTERED_INTENTS:
+        return None
+    return question_range(month=month, day=day, year=year)
 
-def build_transactions_on_date_sql(month: int, day: int, year: Optional[int] = None, limit: Optional[int] = None) -> str:
-    where = [f"MONTH(transaction_timestamp) = {_safe_int(month, 1)}",
-             f"DAY(transaction_timestamp) = {_safe_int(day, 1)}"]
+def question_range(month: Optional[int] = None, day: Optional[int] = None, year: Optional[int] = None):
+    """Диапазон [start, end) дат, названный в вопросе (день, месяц или год), без привязки к интенту."""
+    if month and day:
+        return day_range(month, day, year) or (date.min, date.min)
+    if month:
+        return month_range(month, year)
     if year:
-        where.append(f"YEAR(transaction_timestamp) = {_safe_int(year)}")
-    base = f"""
+        return _year_range(year)
+    return None
+
+# Значения в текст шаблона не подставляются: условия — (SQL с %s, параметры), итог — Statement.
+# Текст шаблона зависит только от интента и набора фильтров, поэтому драйвер готовит его один раз
+# (engines: prepared statements), а месяц/карта/LIMIT идут bind-параметрами.
+Condition = Tuple[str, tuple]
+
+def _ts_range_sql(rng, column: str = "transaction_timestamp") -> Condition:
+    if rng is None:
+        return "1 = 0", ()
+    start, end = rng
+    return f"{column} >= %s AND {column} < %s", (start, end)
+
+def _after_sql(after: Optional[Tuple[datetime, str]]) -> Optional[Condition]:
+    """
+    Keyset-условие "строго после (ts, id)" в порядке ORDER BY transaction_timestamp, transaction_id.
+    Отдельный `ts >= X` — чтобы MySQL сделал range по индексу, а не разбирал OR.
+    """
+    if not after:
+        return None
+    ts, tx_id = after
+    return ("transaction_timestamp >= %s AND (transaction_timestamp > %s OR transaction_id > %s)",
+            (ts, ts, str(tx_id)))
+
+def _where(conditions: List[Condition]) -> Tuple[str, tuple]:
+    sql = " AND ".join(c for c, _ in conditions)
+    return sql, tuple(p for _, params in conditions for p in params)
+
+# --- роллапы ---
+# Дневные агрегаты (sql/schema.py: rollup_daily_city / _merchant / _mcc) строит загрузчик.
+# Агрегатные интенты идут в них, если фильтры укладываются в гранулярность "день";
+# иначе (или если роллапов нет) — в сырые transactions.
+_rollups_enabled = False
+
+def set_rollups_enabled(enabled: bool) -> None:
+    global _rollups_enabled
+    _rollups_enabled = bool(enabled)
+
+def _rollup_sql(intent: str, top_n: int, month: Optional[int], year: Optional[int]) -> Optional[Statement]:
+    if intent == "count_transactions":
+        return Statement("""
+            SELECT CAST(COALESCE(SUM(tx_count), 0) AS SIGNED) AS total_transactions
+            FROM rollup_daily_mcc
+        """)
+
+    if intent == "average_amount":
+        return Statement("""
+            SELECT
+                ROUND(SUM(amount_sum) / NULLIF(SUM(amount_count), 0), 2) AS average_amount
+            FROM rollup_daily_mcc
+        """)
+
+    if intent == "average_amount_in_month" and month:
+        where, params = _ts_range_sql(month_range(month, year), column="day")
+        return Statement(f"""
+            SELECT
+                ROUND(SUM(amount_sum) / NULLIF(SUM(amount_count), 0), 2) AS average_amount
+            FROM rollup_daily_mcc
+            WHERE {where}
+        """, params)
+
+    if intent == "top_cities":
+        return Statement("""
+            SELECT merchant_city, CAST(SUM(tx_count) AS SIGNED) AS transaction_count
+            FROM rollup_daily_city
+            WHERE merchant_city IS NOT NULL AND merchant_city <> ''
+            GROUP BY merchant_city
+            ORDER BY transaction_count DESC
+            LIMIT %s
+        """, (int(top_n),))
+
+    if intent == "top_merchants_by_revenue":
+        return Statement("""
+            SELECT
+                merchant_id,
+                SUM(amount_sum) AS total_revenue,
+                CAST(SUM(tx_count) AS SIGNED) AS tx_count
+            FROM rollup_daily_merchant
+            WHERE merchant_id IS NOT NULL
+            GROUP BY merchant_id
+            ORDER BY total_revenue DESC
+            LIMIT %s
+        """, (int(top_n),))
+
+    return None
+
+def _transactions_listing(range_cond: Condition, limit: Optional[int],
+                          after: Optional[Tuple[datetime, str]]) -> Statement:
+    conditions = [range_cond]
+    if after:
+        conditions.append(_after_sql(after))
+    where, params = _where(conditions)
+    stmt = Statement(f"""
         SELECT 
             transaction_id,
             transaction_timestamp,
@@ -45,12 +166,18 @@ def build_transactions_on_date_sql(month: int, day: int, year: Optional[int] = N
             pos_entry_mode,
             mcc_category
         FROM transactions
-        WHERE {' AND '.join(where)}
-        ORDER BY transaction_timestamp
-    """
-    if limit:
-        base += f" LIMIT {_safe_int(limit, 100)}"
-    return base
+        WHERE {where}
+        ORDER BY transaction_timestamp, transaction_id
+    """, params)
+    return stmt.with_limit(_safe_int(limit, 100)) if limit else stmt
+
+def build_transactions_in_month_sql(month: int, year: Optional[int] = None, limit: Optional[int] = None,
+                                    after: Optional[Tuple[datetime, str]] = None) -> Statement:
+    return _transactions_listing(_ts_range_sql(month_range(month, year)), limit, after)
+
+def build_transactions_on_date_sql(month: int, day: int, year: Optional[int] = None, limit: Optional[int] = None,
+                                   after: Optional[Tuple[datetime, str]] = None) -> Statement:
+    return _transactions_listing(_ts_range_sql(day_range(month, day, year)), limit, after)
 
 def get_sql_by_intent(
     intent: str,
@@ -59,52 +186,58 @@ def get_sql_by_intent(
     year: Optional[int] = None,
     day: Optional[int] = None,
     city: Optional[str] = None,
-    card_id: Optional[int] = None
-) -> Optional[str]:
+    card_id: Optional[int] = None,
+    use_rollups: Optional[bool] = None,
+    after: Optional[Tuple[datetime, str]] = None
+) -> Optional[Statement]:
+
+    # фильтр по дню или карте роллапы не покрывают (да и нужны они только агрегатам)
+    if (use_rollups if use_rollups is not None else _rollups_enabled) and day is None and card_id is None:
+        stmt = _rollup_sql(intent, top_n=top_n, month=month, year=year)
+        if stmt:
+            return stmt
 
     if intent == "count_transactions":
-        return """
+        return Statement("""
             SELECT COUNT(*) AS total_transactions
             FROM transactions
-        """
+        """)
 
     if intent == "average_amount":
-        return """
+        return Statement("""
             SELECT
                 ROUND(AVG(transaction_amount_kzt), 2) AS average_amount
             FROM transactions
             WHERE transaction_amount_kzt IS NOT NULL
-        """
+        """)
 
     if intent == "average_amount_in_month" and month:
-        where = [f"MONTH(transaction_timestamp) = {int(month)}", "transaction_amount_kzt IS NOT NULL"]
-        if year:
-            where.append(f"YEAR(transaction_timestamp) = {int(year)}")
-        return f"""
+        where, params = _where([_ts_range_sql(month_range(month, year)), ("transaction_amount_kzt IS NOT NULL", ())])
+        return Statement(f"""
             SELECT
                 ROUND(AVG(transaction_amount_kzt), 2) AS average_amount
             FROM transactions
-            WHERE {' AND '.join(where)}
-        """
+            WHERE {where}
+        """, params)
 
     if intent == "top_cities":
-        return f"""
+        return Statement("""
             SELECT merchant_city, COUNT(*) AS transaction_count
             FROM transactions
             WHERE merchant_city IS NOT NULL AND merchant_city <> ''
             GROUP BY merchant_city
             ORDER BY transaction_count DESC
-            LIMIT {int(top_n)}
-        """
+            LIMIT %s
+        """, (int(top_n),))
 
     if intent == "transactions_in_month" and month:
-        return build_transactions_in_month_sql(month=month, year=year, limit=None)
+        return build_transactions_in_month_sql(month=month, year=year, limit=None, after=after)
 
     if intent == "transactions_on_date" and month and day:
-        return build_transactions_on_date_sql(month=month, day=day, year=year, limit=None)
+        return build_transactions_on_date_sql(month=month, day=day, year=year, limit=None, after=after)
 
     if intent == "top_merchants_by_revenue":
-        return f"""
+        return Statement("""
             SELECT
                 merchant_id,
                 SUM(transaction_amount_kzt) AS total_revenue,
@@ -113,26 +246,26 @@ def get_sql_by_intent(
             WHERE merchant_id IS NOT NULL
             GROUP BY merchant_id
             ORDER BY total_revenue DESC
-            LIMIT {int(top_n)}
-        """
+            LIMIT %s
+        """, (int(top_n),))
 
     if intent == "decline_rate_by_card" and card_id:
         # ПРИМЕЧАНИЕ: адаптируй под свою схему статусов
-        where = [f"card_id = {int(card_id)}"]
-        if month:
-            where.append(f"MONTH(transaction_timestamp) = {int(month)}")
-        if day:
-            where.append(f"DAY(transaction_timestamp) = {int(day)}")
-        if year:
-            where.append(f"YEAR(transaction_timestamp) = {int(year)}")
-        where_sql = " AND ".join(where)
-        return f"""
+        conditions = [("card_id = %s", (int(card_id),))]
+        if month and day:
+            conditions.append(_ts_range_sql(day_range(month, day, year)))
+        elif month:
+            conditions.append(_ts_range_sql(month_range(month, year)))
+        elif year:
+            conditions.append(_ts_range_sql(_year_range(year)))
+        where, params = _where(conditions)
+        return Statement(f"""
             SELECT
                 SUM(CASE WHEN auth_status = 'Declined' THEN 1 ELSE 0 END) AS declined_count,
                 COUNT(*) AS attempt_count,
                 ROUND(100.0 * SUM(CASE WHEN auth_status = 'Declined' THEN 1 ELSE 0 END) / NULLIF(COUNT(*),0), 2) AS decline_rate_pct
             FROM transactions
-            WHERE {where_sql}
-        """
+            WHERE {where}
+        """, params)
 
     return None
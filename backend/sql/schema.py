@@ -0,0 +1,250 @@
+from sqlalchemy import text
+
+# Составные индексы под шаблоны из query_templates.py:
+#   - диапазон по дате + keyset-пагинация  -> (transaction_timestamp, transaction_id)
+#   - decline rate по карте (+ дата)       -> (card_id, transaction_timestamp)
+#   - фильтр по городу (+ дата)            -> (merchant_city, transaction_timestamp)
+# merchant_city после to_sql — TEXT, поэтому индексируем префикс. transaction_id загрузчик
+# кладёт как VARCHAR(TRANSACTION_ID_LENGTH) — префиксный индекс не годится для ORDER BY.
+TRANSACTION_ID_LENGTH = 64
+TRANSACTION_INDEXES = {
+    "idx_tx_ts_id": "transaction_timestamp, transaction_id",
+    "idx_tx_id": "transaction_id",                 # дедупликация при дозагрузке (ingest.py --mode append)
+    "idx_tx_card_ts": "card_id, transaction_timestamp",
+    "idx_tx_city_ts": "merchant_city(64), transaction_timestamp",
+}
+
+
+def existing_indexes(conn, table: str = "transactions") -> set:
+    rows = conn.execute(text("""
+        SELECT DISTINCT index_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :table
+    """), {"table": table})
+    return {r[0] for r in rows}
+
+
+def create_indexes(conn, table: str = "transactions", indexes: dict = TRANSACTION_INDEXES) -> list:
+    """Создаёт недостающие индексы (в MySQL нет CREATE INDEX IF NOT EXISTS). Возвращает имена созданных."""
+    have = existing_indexes(conn, table)
+    created = []
+    for name, cols in indexes.items():
+        if name in have:
+            continue
+        conn.execute(text(f"CREATE INDEX {name} ON {table} ({cols})"))
+        created.append(name)
+    return created
+
+
+# --- дневные роллапы ---
+# Для агрегатных интентов (count / avg / top-N) вместо скана transactions.
+# tx_count = COUNT(*), amount_count = COUNT(amount) — нужен для честного AVG по не-NULL суммам.
+# NULL-ключи тоже попадают в роллап, поэтому SUM(tx_count) по любому из них = COUNT(*) по сырым строкам;
+# строки без transaction_timestamp — под day = NULL (в диапазон дат они и в сырых не попадают).
+# Суммы — DECIMAL, как transaction_amount_kzt (сумма в KZT, 2 знака), с запасом разрядов под SUM:
+# total_revenue и average_amount из роллапов совпадают с сырыми до копейки, DOUBLE терял бы последний знак.
+ROLLUP_AMOUNT_TYPE = "DECIMAL(20,2)"
+ROLLUPS = {
+    "rollup_daily_city": ("merchant_city", "VARCHAR(255) NULL"),
+    "rollup_daily_merchant": ("merchant_id", "BIGINT NULL"),
+    "rollup_daily_mcc": ("mcc_category", "VARCHAR(255) NULL"),
+}
+
+
+def rollup_columns_sql(key: str, key_type: str) -> str:
+    return f"""
+        day DATE NULL,
+        {key} {key_type},
+        tx_count BIGINT NOT NULL,
+        amount_count BIGINT NOT NULL,
+        amount_sum {ROLLUP_AMOUNT_TYPE} NULL,
+        amount_min {ROLLUP_AMOUNT_TYPE} NULL,
+        amount_max {ROLLUP_AMOUNT_TYPE} NULL
+    """
+
+
+def build_rollups(conn, source: str = "transactions", suffix: str = "") -> None:
+    """
+    Пересобирает все роллапы целиком из source. С suffix строит рядом (rollup_daily_city__new и т.п.) —
+    загрузчик потом подменяет их вместе с transactions одним RENAME TABLE.
+    """
+    for name, (key, key_type) in ROLLUPS.items():
+        table = name + suffix
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text(f"""
+            CREATE TABLE {table} (
+                {rollup_columns_sql(key, key_type)},
+                KEY idx_{name}_day (day),
+                KEY idx_{name}_key_day ({key}, day)
+            )
+        """))
+        conn.execute(text(_rollup_insert_sql(table, key, source)))
+
+
+def refresh_rollup_days(conn, start_day, end_day, source: str = "transactions") -> None:
+    """
+    Пересчитывает роллапы только за дни [start_day, end_day] (после дозагрузки) и строки без даты —
+    их в диапазон дозагрузки не посчитать, а по индексу (transaction_timestamp, ...) IS NULL — это seek.
+    """
+    params = {"start": start_day, "end": end_day}
+    for table, (key, _) in ROLLUPS.items():
+        conn.execute(text(f"DELETE FROM {table} WHERE day >= :start AND day <= :end"), params)
+        conn.execute(text(_rollup_insert_sql(
+            table, key, source,
+            where="WHERE transaction_timestamp >= :start AND transaction_timestamp < :end + INTERVAL 1 DAY",
+        )), params)
+        conn.execute(text(f"DELETE FROM {table} WHERE day IS NULL"))
+        conn.execute(text(_rollup_insert_sql(table, key, source, where="WHERE transaction_timestamp IS NULL")))
+
+
+def _rollup_insert_sql(table: str, key: str, source: str, where: str = "") -> str:
+    return f"""
+        INSERT INTO {table} (day, {key}, tx_count, amount_count, amount_sum, amount_min, amount_max)
+        SELECT
+            DATE(transaction_timestamp),
+            {key},
+            COUNT(*),
+            COUNT(transaction_amount_kzt),
+            SUM(transaction_amount_kzt),
+            MIN(transaction_amount_kzt),
+            MAX(transaction_amount_kzt)
+        FROM {source}
+        {where}
+        GROUP BY DATE(transaction_timestamp), {key}
+    """
+
+
+def rollups_exist(conn) -> bool:
+    rows = conn.execute(text("""
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE()
+    """))
+    return set(ROLLUPS) <= {r[0] for r in rows}
+
+
+# --- версия данных и журнал изменений ---
+# Загрузчик увеличивает счётчик после каждой загрузки и пишет в журнал, какой диапазон дат
+# затронут (NULL — полная перезагрузка). API по версии замечает изменение, а по журналу
+# сбрасывает кэш только за затронутые даты.
+DATA_VERSION_TABLE = "data_version"
+DATA_CHANGES_TABLE = "data_changes"
+# Дозагрузка: high-water mark по (transaction_timestamp, transaction_id) и уже загруженные файлы
+WATERMARK_TABLE = "ingest_watermark"
+INGESTED_FILES_TABLE = "ingest_files"
+
+
+def ensure_meta_tables(conn) -> None:
+    """DDL служебных таблиц (в MySQL DDL коммитит транзакцию — поэтому отдельно от DML)."""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+            table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {DATA_CHANGES_TABLE} (
+            table_name VARCHAR(64) NOT NULL,
+            version BIGINT NOT NULL,
+            changed_from DATETIME(6) NULL,
+            changed_to DATETIME(6) NULL,
+            row_count BIGINT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (table_name, version)
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+            max_ts DATETIME(6) NULL,
+            max_id VARCHAR({TRANSACTION_ID_LENGTH}) NULL,
+            updated_at DATETIME NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {INGESTED_FILES_TABLE} (
+            path VARCHAR(512) NOT NULL PRIMARY KEY,
+            size BIGINT NOT NULL,
+            mtime_ns BIGINT NOT NULL,
+            row_count BIGINT NOT NULL,
+            ingested_at DATETIME NOT NULL
+        )
+    """))
+
+
+def bump_data_version(conn, table: str = "transactions",
+                      changed_from=None, changed_to=None, row_count=None) -> int:
+    """
+    Новая версия данных + запись в журнал. changed_from/changed_to — затронутый диапазон
+    transaction_timestamp (включительно); None — изменилось всё (полная перезагрузка).
+    """
+    conn.execute(text(f"""
+        INSERT INTO {DATA_VERSION_TABLE} (table_name, version, updated_at)
+        VALUES (:table, 1, NOW())
+        ON DUPLICATE KEY UPDATE version = version + 1, updated_at = NOW()
+    """), {"table": table})
+    version = read_data_version(conn, table)
+    conn.execute(text(f"""
+        INSERT INTO {DATA_CHANGES_TABLE} (table_name, version, changed_from, changed_to, row_count, created_at)
+        VALUES (:table, :version, :changed_from, :changed_to, :row_count, NOW())
+    """), {"table": table, "version": version, "changed_from": changed_from,
+           "changed_to": changed_to, "row_count": row_count})
+    return version
+
+
+def read_data_version(conn, table: str = "transactions"):
+    """Текущая версия или None, если загрузчик её ещё не писал."""
+    try:
+        return conn.execute(
+            text(f"SELECT version FROM {DATA_VERSION_TABLE} WHERE table_name = :table"),
+            {"table": table},
+        ).scalar()
+    except Exception:
+        return None
+
+
+def read_data_changes(conn, since_version, table: str = "transactions"):
+    """
+    Затронутые диапазоны [(from, to), ...] по версиям после since_version.
+    None — нужна полная инвалидация (была перезагрузка, журнал неполон или версия неизвестна).
+    """
+    if since_version is None:
+        return None
+    try:
+        rows = conn.execute(text(f"""
+            SELECT version, changed_from, changed_to
+            FROM {DATA_CHANGES_TABLE}
+            WHERE table_name = :table AND version > :since
+            ORDER BY version
+        """), {"table": table, "since": since_version}).fetchall()
+    except Exception:
+        return None
+    current = read_data_version(conn, table)
+    versions = [r[0] for r in rows]
+    if versions != list(range(since_version + 1, (current or 0) + 1)):
+        return None
+    if any(r[1] is None or r[2] is None for r in rows):
+        return None
+    return [(r[1], r[2]) for r in rows]
+
+
+def read_watermark(conn, table: str = "transactions"):
+    """(max_ts, max_id) последней загрузки или (None, None)."""
+    row = conn.execute(
+        text(f"SELECT max_ts, max_id FROM {WATERMARK_TABLE} WHERE table_name = :table"),
+        {"table": table},
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def write_watermark(conn, table: str = "transactions") -> None:
+    """Watermark = последняя строка table в порядке (transaction_timestamp, transaction_id) — seek по idx_tx_ts_id."""
+    conn.execute(text(f"""
+        INSERT INTO {WATERMARK_TABLE} (table_name, max_ts, max_id, updated_at)
+        SELECT :table, transaction_timestamp, transaction_id, NOW()
+        FROM {table}
+        ORDER BY transaction_timestamp DESC, transaction_id DESC
+        LIMIT 1
+        ON DUPLICATE KEY UPDATE max_ts = VALUES(max_ts), max_id = VALUES(max_id), updated_at = NOW()
+    """), {"table": table})
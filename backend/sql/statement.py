@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Tuple, Union
+
+# Плейсхолдер параметра в тексте шаблона — %s (paramstyle mysql-connector; DuckDB получает '?')
+PLACEHOLDER = "%s"
+
+
+@dataclass(frozen=True)
+class Statement:
+    """
+    Текст SQL с плейсхолдерами %s и значения для них по порядку. Текст шаблона не зависит от
+    значений, поэтому драйвер/сервер может один раз разобрать его и переиспользовать план
+    (engines: prepared statements), а значения идут отдельными bind-параметрами.
+
+    prepare=False — произвольный SQL (от LLM): в нём могут быть литералы с '%', поэтому он
+    выполняется как есть, без подготовки и подстановки параметров.
+    """
+    sql: str
+    params: Tuple = ()
+    prepare: bool = True
+
+    def with_limit(self, limit: int) -> "Statement":
+        sql = self.sql.rstrip().rstrip(";")
+        if not self.prepare:
+            return Statement(f"{sql} LIMIT {int(limit)}", self.params, prepare=False)
+        return Statement(f"{sql} LIMIT {PLACEHOLDER}", self.params + (int(limit),))
+
+    def render(self) -> str:
+        """SQL со значениями-литералами — для ответа, логов и ключа кэша; выполнять — через params."""
+        if not self.params:
+            return self.sql
+        parts = self.sql.split(PLACEHOLDER)
+        if len(parts) != len(self.params) + 1:
+            raise ValueError(f"Statement has {len(parts) - 1} placeholders for {len(self.params)} params")
+        out = [parts[0]]
+        for value, part in zip(self.params, parts[1:]):
+            out.append(sql_literal(value))
+            out.append(part)
+        return "".join(out)
+
+
+def sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, date):
+        value = value.isoformat()
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def as_statement(query: Union[str, Statement]) -> Statement:
+    """Строка — SQL без параметров (служебные запросы, SQL от LLM)."""
+    return query if isinstance(query, Statement) else Statement(query, (), prepare=False)
+
+
+def is_single_row_aggregate(sql: str) -> bool:
+    """Агрегат без GROUP BY — одна строка, LIMIT к такому SQL не добавляем."""
+    s = sql.lower()
+    has_agg = any(fn in s for fn in ("avg(", "sum(", "count(", "min(", "max("))
+    has_group = " group by " in s
+    return has_agg and not has_group
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Тесты запускаются из backend/ (python -m pytest tests), модули приложения импортируются как в main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config читает окружение при первом импорте (он случается уже при сборке тестов) — поэтому здесь:
+# DuckDB над синтетическими parquet, без кэша результатов и memory_store, LLM — локальная заглушка
+_WORKDIR = tempfile.mkdtemp(prefix="backend-tests-")
+DATA_DIR = os.path.join(_WORKDIR, "data")
+os.environ.update({
+    "QUERY_ENGINE": "duckdb",
+    "PARQUET_PATH": os.path.join(DATA_DIR, "*.parquet"),
+    "CACHE_ENABLED": "0",
+    "MEMORY_STORE_ENABLED": "0",
+    "INTENT_CLASSIFIER": "local",
+    "LLM_SQL_CACHE_PATH": os.path.join(_WORKDIR, "llm_sql_cache.sqlite3"),
+    "OPENAI_API_KEY": "stub",
+})
+
+DATA_ROWS = 20000
+DATA_YEAR = 2024
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    """Синтетический год транзакций (bench/synth_data.py) — тот же генератор, что у нагрузочного теста."""
+    from bench.synth_data import generate
+    return generate(DATA_ROWS, DATA_DIR, seed=0, year=DATA_YEAR)
+
+
+@pytest.fixture(scope="session")
+def llm_stub():
+    from bench.openai_stub import start_stub
+    stub = start_stub()
+    yield stub
+    stub.shutdown()
+
+
+@pytest.fixture(scope="session")
+def main_module(dataset, llm_stub):
+    """main (движок создаётся при импорте — данные уже должны лежать); клиент OpenAI смотрит на заглушку."""
+    from nlp import sql_generator
+    sql_generator.OPENAI_BASE_URL = llm_stub.base_url
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(main_module):
+    """Один startup/shutdown на сессию: shutdown гасит db_executor насовсем, как и при остановке процесса."""
+    from fastapi.testclient import TestClient
+    with TestClient(main_module.app) as c:
+        yield c
+
+
+@pytest.fixture
+def empty_llm_cache(client, llm_stub):
+    """Пустые кэш SQL от LLM и индекс перефразировок; после теста заглушка снова отвечает CANNED_SQL."""
+    from bench.openai_stub import CANNED_SQL
+    assert client.post("/llm-cache/purge").status_code == 200
+    yield
+    llm_stub.sql = CANNED_SQL
@@ -0,0 +1,67 @@
+import pytest
+
+from config import ASK_BATCH_MAX_QUERIES
+from tests.conftest import DATA_YEAR
+
+COUNT = "Total number of transactions"
+TOP_CITIES = "Top 5 cities by transactions"
+DAY = f"Transactions on March 5, {DATA_YEAR}"
+LLM_QUESTION = "List merchants with more than 100 transactions"   # шаблона нет — SQL от заглушки LLM
+
+
+def _counting_fetch(monkeypatch, main_module, fail_intent=None):
+    """fetch_answer, который считает выполнения (и роняет одно по интенту)."""
+    real = main_module.fetch_answer
+    calls = []
+
+    def fetch(plan):
+        calls.append(plan["intent"])
+        if plan["intent"] == fail_intent:
+            raise RuntimeError("boom")
+        return real(plan)
+
+    monkeypatch.setattr(main_module, "fetch_answer", fetch)
+    return calls
+
+
+def test_duplicates_run_once_and_order_is_kept(client, main_module, monkeypatch):
+    calls = _counting_fetch(monkeypatch, main_module)
+    queries = [TOP_CITIES, COUNT, TOP_CITIES.upper(), DAY, COUNT]
+
+    body = client.post("/ask/batch", json={"queries": queries, "limit": 5}).json()
+
+    assert body["count"] == 5
+    assert body["distinct_sql"] == 3
+    assert sorted(calls) == ["count_transactions", "top_cities", "transactions_on_date"]
+    assert [r["query"] for r in body["results"]] == queries
+    assert [r["intent"] for r in body["results"]] == [
+        "top_cities", "count_transactions", "top_cities", "transactions_on_date", "count_transactions"]
+    assert body["results"][0]["result"] == body["results"][2]["result"]
+
+    single = client.get("/ask", params={"query": DAY, "limit": 5}).json()
+    assert body["results"][3]["result"] == single["result"]
+
+
+@pytest.mark.usefixtures("empty_llm_cache")
+def test_one_failing_question_does_not_fail_the_others(client, main_module, monkeypatch, llm_stub):
+    _counting_fetch(monkeypatch, main_module, fail_intent="top_cities")
+    llm_stub.sql = "SELECT no_such_column FROM transactions"
+
+    resp = client.post("/ask/batch", json={"queries": [COUNT, TOP_CITIES, LLM_QUESTION, DAY]})
+
+    assert resp.status_code == 200
+    count, top, bad_sql, day = resp.json()["results"]
+    assert count["result"][0]["total_transactions"] > 0
+    assert top["error"] == "boom" and top["status"] == 500   # упал fetch_answer
+    assert "no_such_column" in bad_sql["error"]               # SQL от LLM не выполнился в БД
+    assert day["count"] > 0
+
+
+def test_too_many_queries(client):
+    resp = client.post("/ask/batch", json={"queries": [COUNT] * (ASK_BATCH_MAX_QUERIES + 1)})
+    assert resp.status_code == 400
+    assert "Too many queries" in resp.json()["error"]
+
+
+def test_empty_batch(client):
+    assert client.post("/ask/batch", json={"queries": []}).json() == {"count": 0, "distinct_sql": 0, "results": []}
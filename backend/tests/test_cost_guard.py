@@ -0,0 +1,82 @@
+import pytest
+
+from config import PARQUET_PATH
+from engines.base import QueryTimeout
+from engines.duckdb_engine import DuckDBEngine, _plan_rows
+from sql.cost_guard import QueryTooExpensive, check_cost
+from sql.statement import Statement
+
+# декартово произведение трёх копий таблицы (20000^3 строк) — заведомо не успевает за таймаут
+HEAVY_SQL = "SELECT count(*) AS n FROM transactions a, transactions b, transactions c WHERE a.card_id + b.card_id = c.card_id"
+
+
+def _node(name, cardinality=None, *children):
+    extra = {"Estimated Cardinality": cardinality} if cardinality is not None else {}
+    return {"name": name, "extra_info": extra, "children": list(children)}
+
+
+def test_plan_rows_sums_scans_and_multiplies_nested_loops():
+    scan = _node("TABLE_SCAN", "1,000")
+    assert _plan_rows(scan) == (1000, 1000)
+    # фильтр без своей оценки наследует оценку входа
+    assert _plan_rows(_node("FILTER", None, scan)) == (1000, 2000)
+    # хеш-джойн: прочитанное — сумма входов плюс выход
+    assert _plan_rows(_node("HASH_JOIN", "50", scan, _node("TABLE_SCAN", "200"))) == (50, 1250)
+    # вложенные циклы читают произведение входов
+    rows, examined = _plan_rows(_node("CROSS_PRODUCT", None, scan, _node("TABLE_SCAN", "200")))
+    assert rows == 200_000 and examined == 1200 + 200_000
+
+
+class FakeEngine:
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.calls = 0
+
+    def explain_rows(self, stmt):
+        self.calls += 1
+        return self.estimate
+
+
+def test_check_cost_thresholds():
+    stmt = Statement("SELECT * FROM transactions")
+    assert check_cost(FakeEngine(1000), stmt, 1000) == 1000   # ровно бюджет — можно
+    with pytest.raises(QueryTooExpensive) as exc:
+        check_cost(FakeEngine(1001), stmt, 1000)
+    assert (exc.value.estimate, exc.value.budget) == (1001, 1000)
+    assert check_cost(FakeEngine(None), stmt, 1000) is None    # движок не оценивает
+    unlimited = FakeEngine(10 ** 12)
+    assert check_cost(unlimited, stmt, 0) is None              # проверка выключена — EXPLAIN не нужен
+    assert unlimited.calls == 0
+
+
+@pytest.fixture(scope="module")
+def duckdb_engine(dataset):
+    eng = DuckDBEngine(PARQUET_PATH, statement_timeout_ms=200)
+    yield eng
+    eng.dispose()
+
+
+def test_duckdb_explain_rejects_cross_join(duckdb_engine):
+    budget = 1_000_000
+    filtered = check_cost(duckdb_engine, Statement("SELECT * FROM transactions WHERE card_id = %s", (7,)), budget)
+    assert filtered is not None and filtered < budget
+    with pytest.raises(QueryTooExpensive):
+        check_cost(duckdb_engine, Statement("SELECT count(*) FROM transactions a, transactions b"), budget)
+
+
+def test_duckdb_interrupt_raises_query_timeout(duckdb_engine):
+    with pytest.raises(QueryTimeout):
+        duckdb_engine.fetch_all(HEAVY_SQL)
+    # курсор после interrupt снова пригоден
+    assert duckdb_engine.scalar("SELECT 1") == 1
+
+
+@pytest.mark.usefixtures("empty_llm_cache")
+def test_llm_sql_timeout_is_504(client, main_module, llm_stub, monkeypatch):
+    monkeypatch.setattr(main_module, "LLM_SQL_MAX_ROWS_EXAMINED", 0)   # EXPLAIN такой SQL не пропустил бы
+    monkeypatch.setattr(main_module.engine, "statement_timeout_ms", 200)
+    llm_stub.sql = HEAVY_SQL
+
+    resp = client.get("/ask", params={"query": "List merchants with more than 100 transactions"})
+
+    assert resp.status_code == 504
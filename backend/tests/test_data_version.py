@@ -0,0 +1,94 @@
+import datetime
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import config
+from data_version import DataVersionWatcher
+from sql import query_templates
+from tests.conftest import DATA_DIR, DATA_YEAR
+
+
+class FakeSource:
+    def __init__(self):
+        self.version = 1
+        self.changes = None
+
+    def data_version(self):
+        return self.version
+
+    def data_changes(self, since_version):
+        return self.changes
+
+
+def test_watcher_notifies_only_on_change():
+    source, seen = FakeSource(), []
+    watcher = DataVersionWatcher(source.data_version, poll_sec=0, changes_fn=source.data_changes)
+    watcher.subscribe(seen.append)
+    watcher.start()
+
+    assert watcher.check() is False
+    source.version, source.changes = 2, [(datetime.date(2024, 3, 1), datetime.date(2024, 3, 2))]
+    assert watcher.check() is True
+    assert watcher.check() is False
+
+    assert seen == [[(datetime.date(2024, 3, 1), datetime.date(2024, 3, 2))]]
+    assert watcher.version == 2
+
+
+def test_failing_hook_or_version_read_does_not_break_watcher():
+    source, seen = FakeSource(), []
+    watcher = DataVersionWatcher(source.data_version, poll_sec=0)
+    watcher.subscribe(lambda changes: 1 / 0)
+    watcher.subscribe(seen.append)
+    watcher.start()
+
+    source.version = 2
+    assert watcher.check() is True
+    assert seen == [None]   # без changes_fn — изменилось всё
+
+    def broken():
+        raise RuntimeError("db is down")
+    watcher._version_fn = broken
+    assert watcher.check() is False   # версия неизвестна — считаем, что не менялась
+
+
+def test_background_poll():
+    source, seen = FakeSource(), []
+    watcher = DataVersionWatcher(source.data_version, poll_sec=0.01)
+    watcher.subscribe(seen.append)
+    watcher.start()
+    try:
+        source.version = 2
+        for _ in range(200):
+            if seen:
+                break
+            watcher._stop.wait(0.01)
+    finally:
+        watcher.stop()
+    assert seen == [None]
+
+
+@pytest.fixture
+def next_year_file(main_module):
+    """Файл с транзакциями следующего года: после его появления год по умолчанию должен смениться."""
+    path = os.path.join(DATA_DIR, "transactions_next_year.parquet")
+    pq.write_table(pa.table({
+        "transaction_id": ["tx-next-year"],
+        "transaction_timestamp": pa.array([datetime.datetime(DATA_YEAR + 1, 1, 5, 10)], pa.timestamp("s")),
+        "transaction_amount_kzt": [1000.0],
+    }), path)
+    yield
+    os.remove(path)
+    main_module.data_watcher.check()
+
+
+def test_default_year_follows_data_without_result_cache(client, main_module, next_year_file):
+    assert not config.CACHE_ENABLED and main_module.result_cache is None
+    assert query_templates.resolve_year() == DATA_YEAR
+
+    assert main_module.data_watcher.check() is True
+
+    assert query_templates.resolve_year() == DATA_YEAR + 1
@@ -0,0 +1,27 @@
+import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from engines.duckdb_engine import DuckDBEngine
+
+
+def write_day(path, day: int, rows: int):
+    ts = datetime.datetime(2024, 3, day, 12)
+    pq.write_table(pa.table({
+        "transaction_id": [f"tx{day:02d}{i:06d}" for i in range(rows)],
+        "transaction_timestamp": pa.array([ts] * rows, pa.timestamp("us")),
+        "transaction_amount_kzt": [100.0] * rows,
+    }), path)
+
+
+def test_new_parquet_files_are_queried_without_restart(tmp_path):
+    write_day(tmp_path / "part-1.parquet", 1, 3)
+    engine = DuckDBEngine(str(tmp_path / "*.parquet"))
+    version = engine.data_version()
+    assert engine.scalar("SELECT COUNT(*) FROM transactions") == 3
+
+    write_day(tmp_path / "part-2.parquet", 2, 5)
+
+    assert engine.data_version() != version
+    assert engine.scalar("SELECT COUNT(*) FROM transactions") == 8
@@ -0,0 +1,125 @@
+import datetime
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, text
+
+import ingest
+from ingest import merge_delta_sql, plan_files, write_tsv
+from sql.schema import INGESTED_FILES_TABLE
+
+_UNESCAPE = {"n": "\n", "t": "\t", "r": "\r", "0": "\0", "Z": "\x1a", "b": "\b"}
+
+
+def _load_data_fields(line: str) -> list:
+    """Разбор строки TSV так, как его делает LOAD DATA ... FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'."""
+    fields = []
+    for raw in line.split("\t"):
+        if raw == "\\N":
+            fields.append(None)
+            continue
+        out, i = [], 0
+        while i < len(raw):
+            if raw[i] == "\\" and i + 1 < len(raw):
+                out.append(_UNESCAPE.get(raw[i + 1], raw[i + 1]))
+                i += 2
+            else:
+                out.append(raw[i])
+                i += 1
+        fields.append("".join(out))
+    return fields
+
+
+def test_write_tsv_round_trips_special_characters(tmp_path):
+    names = ['Cafe "Dastarkhan"', 'say "hi"\tand\nleave\r', "C:\\path\\", None, "plain"]
+    batch = pa.RecordBatch.from_arrays([
+        pa.array(names, pa.string()),
+        pa.array([1, 2, None, 4, 5], pa.int64()),
+        pa.array([datetime.datetime(2024, 3, 1, 12, 30)] * 5, pa.timestamp("us")),
+        pa.array([True, False, None, True, False]),
+    ], names=["merchant_name", "card_id", "transaction_timestamp", "is_flagged"])
+    path = tmp_path / "batch.tsv"
+
+    write_tsv(batch, str(path))
+
+    lines = path.read_bytes().decode("utf-8").split("\n")
+    assert lines[-1] == ""
+    rows = [_load_data_fields(line) for line in lines[:-1]]
+    assert [r[0] for r in rows] == names
+    assert [r[1] for r in rows] == ["1", "2", None, "4", "5"]
+    assert rows[0][2].startswith("2024-03-01 12:30:00")
+    assert [r[3] for r in rows] == ["1", "0", None, "1", "0"]
+
+
+def test_write_tsv_empty_batch(tmp_path):
+    batch = pa.RecordBatch.from_arrays([pa.array([], pa.string())], names=["merchant_city"])
+    path = tmp_path / "empty.tsv"
+    write_tsv(batch, str(path))
+    assert path.read_bytes() == b""
+
+
+# Журнал файлов и слияние дельты — обычный SQL; гоняем на SQLite, без MySQL
+
+def _sqlite():
+    return create_engine("sqlite://")
+
+
+def _write_parquet(path, ids):
+    pq.write_table(pa.table({"transaction_id": ids}), str(path))
+
+
+def test_plan_files_splits_new_changed_and_unchanged(tmp_path):
+    old, grown, fresh = (tmp_path / n for n in ("old.parquet", "grown.parquet", "fresh.parquet"))
+    _write_parquet(old, ["a"])
+    _write_parquet(grown, ["b"])
+    engine = _sqlite()
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE {INGESTED_FILES_TABLE} "
+                          "(path TEXT PRIMARY KEY, size INT, mtime_ns INT, row_count INT, ingested_at TEXT)"))
+        for f in (old, grown):
+            st = os.stat(f)
+            conn.execute(text(f"INSERT INTO {INGESTED_FILES_TABLE} VALUES (:p, :s, :m, 1, '')"),
+                         {"p": os.path.abspath(f), "s": st.st_size, "m": st.st_mtime_ns})
+
+        _write_parquet(grown, ["b", "c", "late-correction"])   # файл перезаписан с новыми строками
+        _write_parquet(fresh, ["d"])
+
+        new, changed = plan_files(conn, [str(old), str(grown), str(fresh)])
+    assert new == [str(fresh)]
+    assert changed == [str(grown)]
+
+
+def test_merge_delta_keeps_late_rows_and_drops_duplicates():
+    engine = _sqlite()
+    cols = "transaction_id, transaction_timestamp, amount"
+    with engine.begin() as conn:
+        for table in ("transactions", "transactions__delta"):
+            conn.execute(text(f"CREATE TABLE {table} (transaction_id TEXT, transaction_timestamp TEXT, amount INT)"))
+        conn.execute(text("INSERT INTO transactions VALUES ('tx1', '2024-03-01 10:00:00', 1), "
+                          "('tx2', '2024-03-05 10:00:00', 2)"))
+        # изменившийся файл перечитан целиком: старые строки, поздняя строка с временем до watermark
+        # (2024-03-05) и дубль внутри самой дельты
+        conn.execute(text("INSERT INTO transactions__delta VALUES "
+                          "('tx1', '2024-03-01 10:00:00', 1), ('tx2', '2024-03-05 10:00:00', 2), "
+                          "('tx_late', '2024-03-02 09:00:00', 3), "
+                          "('tx3', '2024-03-06 10:00:00', 4), ('tx3', '2024-03-06 11:00:00', 5)"))
+
+        inserted = conn.execute(text(merge_delta_sql("transactions", "transactions__delta", cols))).rowcount
+        rows = conn.execute(text("SELECT transaction_id, amount FROM transactions ORDER BY transaction_id")).all()
+
+    assert inserted == 2
+    assert rows == [("tx1", 1), ("tx2", 2), ("tx3", 4), ("tx_late", 3)]
+
+
+def test_append_without_table_runs_full_load_outside_its_transaction(tmp_path, monkeypatch):
+    """replace_all делает RENAME/DROP своими соединениями — соединение append_new к этому моменту закрыто."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    calls = []
+    monkeypatch.setattr(ingest, "ensure_meta_tables", lambda conn: None)
+    monkeypatch.setattr(ingest, "_table_columns", lambda conn, table: [])
+    monkeypatch.setattr(ingest, "replace_all", lambda *a: calls.append(engine.pool.checkedout()))
+
+    ingest.append_new(engine, [], pa.schema([]), None)
+
+    assert calls == [0]
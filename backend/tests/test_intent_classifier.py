@@ -0,0 +1,56 @@
+import pytest
+
+from nlp import intent_detector
+from nlp.intent_detector import _confident_label, classify_intents, detect_intent
+
+# Вопросы по данным, для которых шаблона нет (в обучении их нет): должны уйти в LLM, а не в похожий шаблон
+UNSUPPORTED = [
+    "number of unique merchants",
+    "How many cards were used in Almaty?",
+    "Which issuer bank has most declines?",
+    "Қай банк ең көп?",
+    "how many distinct cities are there",
+    "сколько уникальных карт",
+    "top wallets by usage",
+    "which currency is used most often",
+    "maximum transaction amount",
+    "Which acquirer country dominates?",
+]
+
+# Шаблонные вопросы, на которых правила молчат, — их модель по-прежнему должна узнавать
+SUPPORTED = [
+    ("how many payments were made", "count_transactions"),
+    ("сколько всего было платежей", "count_transactions"),
+    ("қанша транзакция жасалды", "count_transactions"),
+    ("typical spend per purchase", "average_amount"),
+    ("mean payment size", "average_amount"),
+    ("which cities are busiest", "top_cities"),
+    ("ең көп транзакция болған қалалар", "top_cities"),
+]
+
+
+@pytest.fixture(autouse=True)
+def local_classifier(monkeypatch):
+    monkeypatch.setattr(intent_detector, "INTENT_CLASSIFIER", "local")
+
+
+def test_unsupported_questions_are_unknown():
+    assert classify_intents(UNSUPPORTED) == ["unknown"] * len(UNSUPPORTED)
+
+
+@pytest.mark.parametrize("question", UNSUPPORTED[:4])
+def test_unsupported_questions_fall_through_rules_to_llm(question):
+    assert detect_intent(question, lang=None) == "unknown"
+
+
+def test_supported_questions_keep_their_template():
+    questions = [q for q, _ in SUPPORTED]
+    assert classify_intents(questions) == [intent for _, intent in SUPPORTED]
+
+
+def test_confidence_and_margin_gate():
+    assert _confident_label({"count_transactions": 0.9, "top_cities": 0.05, "unknown": 0.05}) == "count_transactions"
+    # уверенность выше порога, но вторая метка рядом — не угадываем
+    assert _confident_label({"count_transactions": 0.55, "top_cities": 0.45}) == "unknown"
+    assert _confident_label({"count_transactions": 0.3, "top_cities": 0.1, "unknown": 0.1,
+                             "average_amount": 0.1, "transactions_in_month": 0.4}) == "unknown"
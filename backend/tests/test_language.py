@@ -0,0 +1,47 @@
+import pytest
+
+from nlp import language
+from nlp.language import _by_script, detect_language
+
+
+@pytest.mark.parametrize("text,lang", [
+    ("Қаңтардағы транзакциялар саны", "kk"),
+    ("Алматыдағы орташа сома", "kk"),         # одна казахская буква решает
+    ("Top 5 қала", "kk"),                      # даже среди латиницы
+    ("Сколько транзакций в марте?", "ru"),
+    ("Сколько транзакций в марте 2024 по card 7", "ru"),   # латиницы меньше 20% — не спорно
+    ("How many transactions in March?", "en"),
+    ("2024-03-05", "en"),                      # букв нет
+])
+def test_script_decides(text, lang):
+    assert _by_script(text.lower()) == lang
+    assert detect_language(text) == lang
+
+
+@pytest.mark.parametrize("text", ["top 5 мерчантов", "средний amount по merchant", "café à almaty"])
+def test_mixed_script_goes_to_detector(text, monkeypatch):
+    calls = []
+    monkeypatch.setattr(language, "_detector", lambda t: calls.append(t) or "ru")
+    language._detect_normalized.cache_clear()
+
+    assert _by_script(text) is None
+    assert detect_language(text.upper()) == "ru"
+    assert calls == [text]   # детектору — нормализованный текст, один раз
+    language._detect_normalized.cache_clear()
+
+
+def test_detection_is_deterministic(monkeypatch):
+    texts = ["top 5 мерчантов", "средний amount по merchant", "Top 5 городов по revenue"]
+    first = [detect_language(t) for t in texts]
+    for _ in range(3):
+        language._detect_normalized.cache_clear()
+        monkeypatch.setattr(language, "_detector", None)   # и заново загруженный langdetect
+        assert [detect_language(t) for t in texts] == first
+
+
+def test_whitespace_and_case_share_a_cache_entry():
+    language._detect_normalized.cache_clear()
+    detect_language("How many  transactions")
+    detect_language("  how MANY transactions ")
+    info = language._detect_normalized.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from nlp import sql_generator
+from sql.cost_guard import QueryTooExpensive
+
+# Ни правила, ни локальная модель его не узнают — SQL генерирует LLM (заглушка)
+LLM_QUESTION = "List merchants with more than 100 transactions"
+
+
+pytestmark = pytest.mark.usefixtures("empty_llm_cache")
+
+
+def ask(client, query):
+    return client.get("/ask", params={"query": query})
+
+
+def test_valid_llm_sql_is_cached_after_execution(client, llm_stub):
+    before = llm_stub.requests
+
+    first = ask(client, LLM_QUESTION)
+    second = ask(client, LLM_QUESTION)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["intent"] == "unknown"
+    assert second.json()["result"] == first.json()["result"]
+    assert llm_stub.requests == before + 1
+    assert sql_generator.get_sql_cache().stats()["entries"] == 1
+
+
+def test_llm_sql_that_fails_is_not_cached(client, llm_stub):
+    llm_stub.sql = "SELECT merchant_id, amount FROM transactions"   # колонки amount нет
+    before = llm_stub.requests
+
+    assert ask(client, LLM_QUESTION).status_code >= 400
+    assert ask(client, LLM_QUESTION).status_code >= 400
+
+    assert llm_stub.requests == before + 2   # второй раз — снова к модели, а не из кэша
+    assert sql_generator.get_sql_cache().stats()["entries"] == 0
+    assert sql_generator.get_paraphrase_index().stats()["entries"] == 0
+
+
+def test_too_expensive_llm_sql_is_not_cached(client, main_module, monkeypatch):
+    def reject(engine, stmt, max_rows):   # DuckDB строк не оценивает — отказ EXPLAIN имитируем
+        raise QueryTooExpensive(10 ** 9, max_rows)
+    monkeypatch.setattr(main_module, "check_cost", reject)
+
+    assert ask(client, LLM_QUESTION).status_code == 422
+    assert sql_generator.get_sql_cache().stats()["entries"] == 0
+
+
+def test_cache_lookup_runs_in_db_executor(client, monkeypatch):
+    assert sql_generator._paraphrases is not None   # индекс построен при старте
+    threads = []
+    lookup = sql_generator._cached_sql
+
+    def spy(query):
+        threads.append(threading.current_thread().name)
+        return lookup(query)
+    monkeypatch.setattr(sql_generator, "_cached_sql", spy)
+
+    assert ask(client, LLM_QUESTION).status_code == 200
+    assert threads and all(name.startswith("db") for name in threads)
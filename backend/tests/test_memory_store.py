@@ -0,0 +1,136 @@
+import json
+import math
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from engines.duckdb_engine import DuckDBEngine
+from engines.memory_store import ColumnStore
+from serialization import dumps
+from sql.pagination import decode_cursor, next_cursor
+from sql.query_templates import get_sql_by_intent
+
+YEAR = 2024
+NOON = datetime(YEAR, 3, 15, 12, 0, 0)
+
+# интент -> параметры, как их собирает main.plan_query
+PARITY_CASES = [
+    ("count_transactions", {}),
+    ("average_amount", {}),
+    ("average_amount_in_month", {"month": 3}),
+    ("average_amount_in_month", {"month": 2}),
+    ("top_cities", {"top_n": 3}),
+    ("top_cities", {"top_n": 500}),
+    ("top_merchants_by_revenue", {"top_n": 10}),
+    ("top_merchants_by_revenue", {"top_n": 5000}),
+    ("transactions_in_month", {"month": 3, "limit": 100}),
+    ("transactions_in_month", {"month": 12, "limit": 1000}),
+    ("transactions_on_date", {"month": 3, "day": 15, "limit": 2}),
+    ("transactions_on_date", {"month": 2, "day": 29, "limit": 10}),
+    ("transactions_on_date", {"month": 2, "day": 30, "limit": 10}),
+]
+
+
+def _write_edge_rows(path, rows):
+    """(id, timestamp, сумма, город, мерчант) — остальные колонки листинга пустые."""
+    pq.write_table(pa.table({
+        "transaction_id": [r[0] for r in rows],
+        "transaction_timestamp": pa.array([r[1] for r in rows], type=pa.timestamp("s")),
+        "transaction_amount_kzt": pa.array([r[2] for r in rows], type=pa.float64()),
+        "merchant_city": pa.array([r[3] for r in rows], type=pa.string()),
+        "merchant_id": pa.array([r[4] for r in rows], type=pa.int32()),
+    }), str(path))
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    """Синтетические данные + NULL-суммы, NULL/пустые города, NULL-мерчант и строки с одинаковым timestamp."""
+    from bench.synth_data import generate
+
+    path = tmp_path_factory.mktemp("memory_store")
+    generate(5000, str(path), seed=2, year=YEAR)
+    _write_edge_rows(path / "edge.parquet", [
+        ("edge_c", NOON, None, "Almaty", 1),
+        ("edge_a", NOON, 12.5, None, 1),
+        ("edge_b", NOON, 0.01, "", None),
+        ("edge_d", NOON, None, None, None),
+        ("edge_first", datetime(YEAR, 3, 1, 0, 0, 0), 99.99, "Astana", 2),
+        ("edge_apr", datetime(YEAR, 4, 1, 0, 0, 0), 1.0, "Astana", 2),
+    ])
+    return path
+
+
+@pytest.fixture(scope="module")
+def engine(data_dir):
+    eng = DuckDBEngine(str(data_dir / "*.parquet"))
+    yield eng
+    eng.dispose()
+
+
+@pytest.fixture(scope="module")
+def store(engine):
+    s = ColumnStore(engine, max_rows=0, poll_sec=3600)
+    s._reload()   # синхронно, без фонового потока start()
+    assert s.stats()["loaded"], s.last_error
+    return s
+
+
+def _db_rows(engine, intent, params, after):
+    """Тот же ответ из БД: шаблон на сырых transactions (+ LIMIT страницы, как в main.plan_query)."""
+    stmt = get_sql_by_intent(intent, top_n=params.get("top_n", 10), month=params.get("month"),
+                             day=params.get("day"), year=YEAR, after=after, use_rollups=False)
+    if params.get("limit"):
+        stmt = stmt.with_limit(params["limit"])
+    cols, rows = engine.fetch_all(stmt)
+    return [dict(zip(cols, r)) for r in rows]
+
+
+def _same(a, b):
+    """Как ответ уйдёт клиенту (serialization.dumps); DOUBLE-суммы DuckDB складывает в своём порядке."""
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+@pytest.mark.parametrize("intent,params", PARITY_CASES)
+def test_memory_store_matches_database(engine, store, intent, params):
+    params = dict(params, year=YEAR)
+    after, pages = None, 0
+    while True:
+        db = json.loads(dumps(_db_rows(engine, intent, params, after)))
+        mem = json.loads(dumps(store.answer(intent, params, after)))
+        assert _same(db, mem), (intent, params, after)
+        pages += 1
+        cursor = next_cursor(db, params.get("limit")) if intent.startswith("transactions_") else None
+        if not cursor or pages == 5:
+            break
+        after = decode_cursor(cursor)
+
+
+def test_unsupported_intent_goes_to_database(store):
+    assert store.answer("decline_rate_by_card", {"card_id": 7}) is None
+    assert store.answer("transactions_in_month", {"month": None}) is None
+
+
+def test_new_data_makes_snapshot_stale_until_reloaded(data_dir, engine):
+    s = ColumnStore(engine, max_rows=0, poll_sec=0)
+    s._reload()
+    before = s.answer("count_transactions", {})[0]["total_transactions"]
+
+    extra = data_dir / "late.parquet"
+    _write_edge_rows(extra, [("late_1", datetime(YEAR, 6, 1, 9, 0, 0), 5.0, "Shymkent", 3)])
+    try:
+        assert s.answer("count_transactions", {}) is None   # срез устарел — вопрос уйдёт в БД
+        deadline = time.monotonic() + 10
+        while (rows := s.answer("count_transactions", {})) is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert rows == [{"total_transactions": before + 1}]
+    finally:
+        extra.unlink()
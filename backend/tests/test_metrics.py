@@ -0,0 +1,43 @@
+import re
+
+COUNT = "Total number of transactions"
+_SAMPLE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _scrape(client) -> dict:
+    """Текст /metrics -> {(имя, frozenset(меток)): значение}."""
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    samples = {}
+    for line in resp.text.splitlines():
+        m = _SAMPLE.match(line)
+        if m:
+            samples[(m.group(1), frozenset(_LABEL.findall(m.group(2))))] = float(m.group(3))
+    return samples
+
+
+def _value(samples: dict, name: str, **labels) -> float:
+    return samples.get((name, frozenset(labels.items())), 0.0)
+
+
+def test_one_ask_shows_up_in_stage_row_and_byte_series(client):
+    before = _scrape(client)
+    resp = client.get("/ask", params={"query": COUNT})
+    assert resp.json()["intent"] == "count_transactions"
+    after = _scrape(client)
+
+    def delta(name, **labels):
+        return _value(after, name, **labels) - _value(before, name, **labels)
+
+    labels = {"intent": "count_transactions", "sql_source": "template"}
+    for stage in ("db_read", "to_records", "serialize"):
+        assert delta("ask_stage_seconds_count", stage=stage, **labels) == 1, stage
+    assert delta("ask_stage_seconds_count", stage="sql_template", intent="count_transactions", sql_source="") == 1
+    assert delta("ask_stage_seconds_count", stage="entities", intent="", sql_source="") >= 1
+    assert delta("ask_request_seconds_count", endpoint="/ask", **labels) == 1
+    # один агрегат — одна строка: попадает в корзину le="1", но не в le="0"
+    assert delta("ask_result_rows_bucket", intent="count_transactions", le="1") == 1
+    assert delta("ask_result_rows_bucket", intent="count_transactions", le="0") == 0
+    assert delta("ask_response_bytes_sum", endpoint="/ask", format="json") == len(resp.content)
+
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from nlp.micro_batcher import BatcherClosed, MicroBatcher
+
+
+class BlockingModel:
+    """predict_batch, который держит первый пакет, пока тест не отпустит release."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        assert self.release.wait(5)
+        return [t.upper() for t in texts]
+
+
+def test_concurrent_calls_share_a_batch_and_memo():
+    model = BlockingModel()
+    model.release.set()
+    batcher = MicroBatcher(model, max_batch=8, max_wait_sec=0.2)
+    try:
+        assert batcher.predict(["a", "b", "A "]) == ["A", "B", "A"]
+        assert model.batches == [["a", "b"]]       # "A " — тот же нормализованный запрос, что и "a"
+        assert batcher.submit("b").result(1) == "B"
+        assert batcher.stats()["memo_hits"] == 1
+    finally:
+        batcher.close()
+
+
+def test_close_fails_queued_calls_and_rejects_new_ones():
+    model = BlockingModel()
+    batcher = MicroBatcher(model, max_batch=1, max_wait_sec=0)
+    running = batcher.submit("running")
+    assert model.started.wait(5)
+    queued = [batcher.submit(q) for q in ("q1", "q2")]
+
+    batcher.close()
+
+    for fut in queued:
+        with pytest.raises(BatcherClosed):
+            fut.result(1)
+    with pytest.raises(BatcherClosed):
+        batcher.submit("late")
+    model.release.set()
+    assert running.result(5) == "RUNNING"   # уже начатый пакет досчитывается
+
+
+def test_cancelled_caller_does_not_kill_worker():
+    model = BlockingModel()
+    batcher = MicroBatcher(model, max_batch=1, max_wait_sec=0)
+    try:
+        first = batcher.submit("first")
+        assert model.started.wait(5)
+        cancelled = batcher.submit("cancelled")
+        assert cancelled.cancel()
+        model.release.set()
+        assert first.result(5) == "FIRST"
+        assert batcher.submit("after").result(5) == "AFTER"
+    finally:
+        batcher.close()
+
+
+def test_cancelled_waiter_does_not_cancel_others_on_same_text():
+    """Как classify_intent_async: каждый запрос ждёт через asyncio.wrap_future; один клиент отключился."""
+    model = BlockingModel()
+    batcher = MicroBatcher(model, max_batch=1, max_wait_sec=0)
+
+    async def scenario():
+        first = asyncio.ensure_future(asyncio.wrap_future(batcher.submit("same question")))
+        second = asyncio.ensure_future(asyncio.wrap_future(batcher.submit("Same  question")))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        model.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.wait_for(second, 5)
+
+    try:
+        assert asyncio.run(scenario()) == "SAME QUESTION"
+        assert model.batches == [["same question"]]   # посчитан один раз
+    finally:
+        batcher.close()
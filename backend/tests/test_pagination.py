@@ -0,0 +1,110 @@
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from tests.conftest import DATA_YEAR
+from engines.duckdb_engine import DuckDBEngine
+from sql.pagination import InvalidCursor, decode_cursor, encode_cursor, next_cursor
+from sql.query_templates import (_ts_range_sql, build_transactions_in_month_sql, build_transactions_on_date_sql,
+                                 day_range, month_range)
+
+DAY_QUESTION = f"Transactions on March 5, {DATA_YEAR}"
+
+
+def test_cursor_round_trip():
+    ts = datetime(2024, 3, 5, 12, 30, 1)
+    assert decode_cursor(encode_cursor(ts, "tx42")) == (ts, "tx42")
+    # строки из кэша результатов — ISO-текст вместо datetime
+    assert decode_cursor(encode_cursor(ts.isoformat(), "tx42")) == (ts, "tx42")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [{"transaction_timestamp": datetime(2024, 3, 5), "transaction_id": "tx1"}]
+    assert next_cursor(rows, 2) is None
+    assert decode_cursor(next_cursor(rows, 1)) == (datetime(2024, 3, 5), "tx1")
+    assert next_cursor([{"merchant_id": 1}], 1) is None   # не листинг — курсора нет
+
+
+def test_ranges_are_half_open():
+    assert month_range(12, 2024) == (date(2024, 12, 1), date(2025, 1, 1))
+    assert month_range(2, 2024) == (date(2024, 2, 1), date(2024, 3, 1))
+    assert day_range(2, 29, 2024) == (date(2024, 2, 29), date(2024, 3, 1))
+    assert day_range(12, 31, 2024) == (date(2024, 12, 31), date(2025, 1, 1))
+    # несуществующий день — пустое условие, а не ошибка и не чужой день
+    assert day_range(2, 30, 2024) is None
+    assert _ts_range_sql(day_range(2, 30, 2024)) == ("1 = 0", ())
+    assert _ts_range_sql(month_range(3, 2024)) == (
+        "transaction_timestamp >= %s AND transaction_timestamp < %s", (date(2024, 3, 1), date(2024, 4, 1)))
+
+
+@pytest.fixture
+def boundary_engine(tmp_path):
+    """Строки на границах марта и несколько с одинаковым timestamp — на них keyset по одному ts сломался бы."""
+    noon = datetime(2024, 3, 15, 12, 0, 0)
+    rows = [
+        ("tx_feb_last", datetime(2024, 2, 29, 23, 59, 59)),
+        ("tx_mar_first", datetime(2024, 3, 1, 0, 0, 0)),
+        ("tx_c", noon), ("tx_a", noon), ("tx_d", noon), ("tx_b", noon),
+        ("tx_mar_last", datetime(2024, 3, 31, 23, 59, 59)),
+        ("tx_apr_first", datetime(2024, 4, 1, 0, 0, 0)),
+    ]
+    pq.write_table(pa.table({
+        "transaction_id": [r[0] for r in rows],
+        "transaction_timestamp": pa.array([r[1] for r in rows], type=pa.timestamp("s")),
+        "merchant_city": ["Almaty"] * len(rows),
+        "transaction_type": ["POS"] * len(rows),
+        "transaction_amount_kzt": [100.0] * len(rows),
+        "wallet_type": [None] * len(rows),
+        "pos_entry_mode": ["Chip"] * len(rows),
+        "mcc_category": ["Grocery"] * len(rows),
+    }), str(tmp_path / "part-0.parquet"))
+    engine = DuckDBEngine(str(tmp_path / "*.parquet"))
+    yield engine
+    engine.dispose()
+
+
+def test_month_listing_boundaries(boundary_engine):
+    _, rows = boundary_engine.fetch_all(build_transactions_in_month_sql(month=3, year=2024))
+    ids = [r[0] for r in rows]
+    assert ids == ["tx_mar_first", "tx_a", "tx_b", "tx_c", "tx_d", "tx_mar_last"]
+
+
+def test_keyset_pages_through_equal_timestamps(boundary_engine):
+    pages, after = [], None
+    while True:
+        columns, rows = boundary_engine.fetch_all(
+            build_transactions_in_month_sql(month=3, year=2024, limit=2, after=after))
+        if not rows:
+            break
+        pages.append([r[0] for r in rows])
+        last = dict(zip(columns, rows[-1]))
+        after = decode_cursor(encode_cursor(last["transaction_timestamp"], last["transaction_id"]))
+
+    assert pages == [["tx_mar_first", "tx_a"], ["tx_b", "tx_c"], ["tx_d", "tx_mar_last"]]
+
+
+def test_ask_pages_cover_the_day_exactly_once(client, main_module):
+    first = client.get("/ask", params={"query": DAY_QUESTION, "limit": 10}).json()
+    assert first["intent"] == "transactions_on_date"
+
+    seen, page, pages = [], first, 0
+    while True:
+        seen += [r["transaction_id"] for r in page["result"]]
+        pages += 1
+        if not page["next_cursor"]:
+            break
+        page = client.get("/ask", params={"query": DAY_QUESTION, "limit": 10, "cursor": page["next_cursor"]}).json()
+
+    _, expected = main_module.engine.fetch_all(build_transactions_on_date_sql(month=3, day=5, year=DATA_YEAR))
+    assert pages > 1
+    assert len(seen) == len(set(seen))
+    assert seen == [r[0] for r in expected]
+
+
+def test_ask_rejects_bad_cursor(client):
+    resp = client.get("/ask", params={"query": DAY_QUESTION, "cursor": "garbage"})
+    assert resp.status_code == 400
@@ -0,0 +1,104 @@
+import pytest
+
+from config import PARAPHRASE_MIN_SIMILARITY
+from nlp import sql_generator
+from nlp.entities import extract_entities
+from nlp.intent_model import char_ngrams
+from nlp.paraphrase_index import ParaphraseIndex, _masked
+
+CITY_QUESTION = "Which merchants had over 100 purchases in Almaty"
+CITY_SQL = ("SELECT merchant_id, COUNT(*) AS tx_count FROM transactions WHERE merchant_city = 'Almaty' "
+            "GROUP BY merchant_id HAVING COUNT(*) > 100")
+
+
+def make_index():
+    index = ParaphraseIndex(min_similarity=0.8)
+    index.add(CITY_QUESTION, CITY_SQL)
+    return index
+
+
+def test_lookup_rebinds_city_of_paraphrase():
+    sql, score, source = make_index().lookup("Which merchants had over 100 purchases in Astana?")
+    assert "merchant_city = 'Astana'" in sql and "Almaty" not in sql
+    assert source == CITY_QUESTION
+
+
+def test_lookup_requires_same_free_numbers():
+    assert make_index().lookup("Which merchants had over 500 purchases in Almaty") is None
+
+
+# (проиндексированный вопрос, его SQL, вопрос с противоположным смыслом): по n-граммам они выше порога
+OPPOSITES = [
+    ("Top 5 merchants with the highest revenue",
+     "SELECT merchant_id, SUM(transaction_amount_kzt) AS revenue FROM transactions "
+     "GROUP BY merchant_id ORDER BY revenue DESC LIMIT 5",
+     "Top 5 merchants with the lowest revenue"),
+    (CITY_QUESTION, CITY_SQL, "Which merchants had under 100 purchases in Almaty"),
+    ("How many transactions were not online",
+     "SELECT COUNT(*) FROM transactions WHERE transaction_type <> 'Online'",
+     "How many transactions were online"),
+    ("How many transactions were paid with Apple Pay",
+     "SELECT COUNT(*) FROM transactions WHERE wallet_type = 'Apple Pay'",
+     "How many transactions were paid with Google Pay"),
+    ("What is the total sum of ATM withdrawals by card",
+     "SELECT SUM(transaction_amount_kzt) FROM transactions WHERE transaction_type = 'ATM Withdrawal'",
+     "What is the total sum of POS withdrawals by card"),
+    ("Which merchant has the most purchases",
+     "SELECT merchant_id, COUNT(*) AS n FROM transactions GROUP BY merchant_id ORDER BY n DESC LIMIT 1",
+     "Which merchant has the fewest purchases"),
+]
+
+
+def _similarity(a: str, b: str) -> float:
+    fa, fb = (char_ngrams(_masked(q, extract_entities(q))) for q in (a, b))
+    return sum(v * fb.get(g, 0.0) for g, v in fa.items())
+
+
+@pytest.mark.parametrize("question,sql,opposite", OPPOSITES)
+def test_opposite_meaning_is_not_a_paraphrase(question, sql, opposite):
+    assert _similarity(question, opposite) >= PARAPHRASE_MIN_SIMILARITY   # одного косинуса мало
+    index = ParaphraseIndex(min_similarity=PARAPHRASE_MIN_SIMILARITY)
+    index.add(question, sql)
+    assert index.lookup(opposite) is None
+    assert index.lookup(question)[0] == sql
+
+
+def test_synonyms_and_filler_words_still_match():
+    index = ParaphraseIndex(min_similarity=0.7)
+    index.add(CITY_QUESTION, CITY_SQL)
+    sql, _, _ = index.lookup("Please show which merchants had over 100 transactions in Astana")
+    assert "merchant_city = 'Astana'" in sql
+
+
+def test_remove_and_clear():
+    index = make_index()
+    assert index.remove(CITY_QUESTION.upper() + "?")
+    assert index.lookup(CITY_QUESTION) is None
+    assert index.stats()["entries"] == 0
+    assert index.add(CITY_QUESTION, CITY_SQL)   # после remove вопрос можно добавить снова
+    index.clear()
+    assert index.lookup(CITY_QUESTION) is None
+    assert index.stats()["entries"] == 0
+
+
+@pytest.mark.usefixtures("empty_llm_cache")
+def test_purge_forgets_question_and_its_paraphrases(client, llm_stub):
+    llm_stub.sql = CITY_SQL
+    variant = CITY_QUESTION.replace("Almaty", "Astana")
+
+    def llm_calls(query):
+        before = llm_stub.requests
+        assert client.get("/ask", params={"query": query}).status_code == 200
+        return llm_stub.requests - before
+
+    assert llm_calls(CITY_QUESTION) == 1
+    assert llm_calls(variant) == 0        # перефразировка: SQL из индекса, город подставлен
+
+    assert client.post("/llm-cache/purge").json()["removed"] == 1
+    assert llm_calls(CITY_QUESTION + "?") == 1
+    assert llm_calls(variant) == 0
+
+    # одна запись по ключу: её вопрос уходит и из индекса
+    key = sql_generator.get_sql_cache().entries()[0]["key"]
+    assert client.post("/llm-cache/purge", params={"key": key}).json()["removed"] == 1
+    assert llm_calls(variant) == 1
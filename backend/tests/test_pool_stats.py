@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+from engines.pool_stats import WAIT_BUCKETS_MS, PoolTelemetry
+
+
+@pytest.fixture
+def pooled(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.sqlite3'}", poolclass=QueuePool,
+                           pool_size=1, max_overflow=1, pool_timeout=0.05)
+    yield engine, PoolTelemetry(engine.pool, pool_size=1, max_overflow=1, timeout_sec=0.05)
+    engine.dispose()
+
+
+def _checkout(engine, telemetry):
+    with telemetry.checkout():
+        return engine.raw_connection()
+
+
+def test_snapshot_tracks_checkouts_overflow_and_timeouts(pooled):
+    engine, telemetry = pooled
+    first = _checkout(engine, telemetry)
+    second = _checkout(engine, telemetry)   # сверх pool_size
+    with pytest.raises(PoolTimeout):
+        _checkout(engine, telemetry)
+
+    snap = telemetry.snapshot()
+    assert snap["checked_out"] == 2
+    assert snap["overflow_in_use"] == 1
+    assert snap["saturation"] == 1.0
+    assert snap["checkouts"] == 2            # не дождавшаяся выдача в гистограмму не идёт
+    assert snap["checkout_timeouts"] == 1
+    assert snap["wait_histogram_ms"]["le_inf"] == 2
+
+    first.close()
+    second.close()
+    snap = telemetry.snapshot()
+    assert (snap["checked_out"], snap["saturation"]) == (0, 0.0)
+
+
+def test_wait_histogram_is_cumulative(pooled):
+    _, telemetry = pooled
+    for seconds in (0.0005, 0.003, 0.003, 20.0):
+        telemetry.observe_wait(seconds)
+
+    hist = telemetry.snapshot()["wait_histogram_ms"]
+    assert list(hist) == [f"le_{b}ms" for b in WAIT_BUCKETS_MS] + ["le_inf"]
+    assert (hist["le_1ms"], hist["le_5ms"], hist["le_10000ms"], hist["le_inf"]) == (1, 3, 3, 4)
+    assert telemetry.snapshot()["wait_avg_ms"] == pytest.approx((0.5 + 3 + 3 + 20000) / 4)
+
+
+def test_metrics_collector_renders_pool_snapshot(pooled, main_module, monkeypatch):
+    engine, telemetry = pooled
+    conn = _checkout(engine, telemetry)
+    telemetry.observe_wait(0.2)
+    monkeypatch.setattr(main_module.engine, "pool_status", telemetry.snapshot)
+    try:
+        lines = main_module.pool_metrics()
+    finally:
+        conn.close()
+
+    assert "db_pool_checked_out 1" in lines
+    assert "db_pool_saturation 0.5" in lines
+    assert "db_pool_checkout_timeouts_total 0" in lines
+    assert 'db_pool_wait_seconds_bucket{le="0.1"} 1' in lines    # быстрая выдача из _checkout
+    assert 'db_pool_wait_seconds_bucket{le="0.25"} 2' in lines
+    assert 'db_pool_wait_seconds_bucket{le="+Inf"} 2' in lines
+    assert "db_pool_wait_seconds_count 2" in lines
+
+
+def test_metrics_collector_is_empty_without_pool(main_module):
+    assert main_module.engine.pool_status() in (None, {})   # DuckDB — пула нет
+    assert main_module.pool_metrics() == []
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+
+from serialization import dumps
+from tests.conftest import DATA_YEAR
+
+LISTING = f"Transactions on March 5, {DATA_YEAR}"
+LIMIT = 7
+
+
+@pytest.fixture(scope="module")
+def expected(client):
+    body = client.get("/ask", params={"query": LISTING, "limit": LIMIT}).json()
+    assert body["intent"] == "transactions_on_date" and body["count"] == LIMIT
+    return body
+
+
+def _as_json(rows: list) -> list:
+    """Строки из Arrow/Parquet -> то, что отдал бы JSON-ответ (datetime -> ISO, Decimal -> число)."""
+    return json.loads(dumps(rows))
+
+
+def _get(client, fmt: str):
+    resp = client.get("/ask", params={"query": LISTING, "limit": LIMIT, "format": fmt})
+    assert resp.status_code == 200
+    assert resp.headers["x-ask-intent"] == "transactions_on_date"
+    return resp
+
+
+def test_ndjson_rows_match_json(client, expected):
+    resp = _get(client, "ndjson")
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.content.splitlines()]
+    assert rows == expected["result"]
+    assert list(rows[0]) == list(expected["result"][0])
+
+
+@pytest.mark.parametrize("fmt,read", [
+    ("arrow", lambda data: pa.ipc.open_stream(data).read_all()),
+    ("parquet", lambda data: pq.read_table(io.BytesIO(data))),
+])
+def test_columnar_rows_and_schema_match_json(client, expected, fmt, read):
+    table = read(_get(client, fmt).content)
+
+    assert table.column_names == list(expected["result"][0])
+    assert _as_json(table.to_pylist()) == expected["result"]
+    meta = {k.decode(): v.decode() for k, v in table.schema.metadata.items()}
+    assert meta["intent"] == expected["intent"]
+    assert meta["sql"] == expected["sql"]
+    assert json.loads(meta["params"]) == expected["params"]
+
+
+def test_accept_header_selects_format(client, expected):
+    resp = client.get("/ask", params={"query": LISTING, "limit": LIMIT},
+                      headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert resp.headers["content-type"].startswith("application/vnd.apache.arrow.stream")
+    assert pa.ipc.open_stream(resp.content).read_all().num_rows == LIMIT
+
+
+def test_unknown_format_is_400(client):
+    assert client.get("/ask", params={"query": LISTING, "format": "xml"}).status_code == 400
@@ -0,0 +1,107 @@
+import datetime
+import threading
+
+from cache import MemoryBackend, ResultCache
+from data_version import DataVersionWatcher
+
+MARCH = (datetime.date(2024, 3, 1), datetime.date(2024, 4, 1))
+APRIL = (datetime.date(2024, 4, 1), datetime.date(2024, 5, 1))
+
+
+def make_cache(max_bytes=1 << 20, **kwargs):
+    return ResultCache(MemoryBackend(max_bytes), ttl_default=300, **kwargs)
+
+
+def test_hit_miss_and_stats():
+    cache = make_cache()
+    key = ResultCache.make_key("duckdb", "SELECT  COUNT(*)\n FROM transactions")
+    assert key == ResultCache.make_key("duckdb", "SELECT COUNT(*) FROM transactions")
+    assert key != ResultCache.make_key("mysql", "SELECT COUNT(*) FROM transactions")
+
+    assert cache.get(key) is None
+    cache.put(key, [{"tx_count": 3}])
+    assert cache.get(key) == [{"tx_count": 3}]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_ttl_by_intent_zero_disables_caching():
+    cache = make_cache(ttl_by_intent={"transactions_on_date": 0})
+    cache.put("k", [1], intent="transactions_on_date")
+    assert cache.get("k") is None
+
+
+def test_data_change_drops_only_overlapping_ranges():
+    cache = make_cache()
+    cache.put("march", [1], date_range=MARCH)
+    cache.put("april", [2], date_range=APRIL)
+    cache.put("all_time", [3], date_range=None)
+
+    # дозагрузка: изменились 15–20 марта (границы включительно)
+    cache.on_data_change([(datetime.datetime(2024, 3, 15), datetime.datetime(2024, 3, 20, 23, 59))])
+
+    assert cache.get("march") is None
+    assert cache.get("all_time") is None   # запрос без фильтра по дате задевает любое изменение
+    assert cache.get("april") == [2]
+
+
+def test_change_on_range_boundary():
+    cache = make_cache()
+    cache.put("march", [1], date_range=MARCH)
+    cache.on_data_change([(datetime.date(2024, 4, 1), datetime.date(2024, 4, 1))])   # 1 апреля — уже не март
+    assert cache.get("march") == [1]
+    cache.on_data_change([(datetime.datetime(2024, 3, 31, 23, 59), datetime.date(2024, 4, 1))])
+    assert cache.get("march") is None
+
+
+def test_full_reload_drops_everything():
+    cache = make_cache()
+    cache.put("march", [1], date_range=MARCH)
+    cache.put("april", [2], date_range=APRIL)
+    cache.on_data_change(None)
+    assert cache.get("march") is None and cache.get("april") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_data_version_watcher_invalidates_cache():
+    version = [1]
+    cache = make_cache()
+    watcher = DataVersionWatcher(lambda: version[0], poll_sec=0)
+    watcher.subscribe(cache.on_data_change)
+    watcher.start()
+    cache.put("march", [1], date_range=MARCH)
+
+    watcher.check()
+    assert cache.get("march") == [1]
+    version[0] = 2
+    watcher.check()
+    assert cache.get("march") is None
+
+
+def test_lru_byte_budget():
+    cache = make_cache(max_bytes=40)
+    cache.put("a", "x" * 15)
+    cache.put("b", "y" * 15)
+    assert cache.get("a") is not None   # a — свежее b
+    cache.put("c", "z" * 15)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_counters_are_exact_under_threads():
+    cache = make_cache()
+    cache.put("hit", [1])
+
+    def worker():
+        for _ in range(2000):
+            cache.get("hit")
+            cache.get("miss")
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert stats["hits"] == stats["misses"] == 8 * 2000
@@ -0,0 +1,95 @@
+import glob
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from engines.duckdb_engine import DuckDBEngine
+from sql import query_templates
+from sql.query_templates import get_sql_by_intent
+from sql.schema import ROLLUPS, _rollup_insert_sql, rollup_columns_sql
+
+YEAR = 2024
+AMOUNT = pa.decimal128(12, 2)   # transaction_amount_kzt в MySQL — DECIMAL
+
+# агрегатные интенты, у которых есть путь через роллапы, и их параметры
+ROLLUP_CASES = [
+    ("count_transactions", {}),
+    ("average_amount", {}),
+    ("average_amount_in_month", {"month": 3, "year": YEAR}),
+    ("average_amount_in_month", {"month": 12, "year": YEAR}),
+    ("top_cities", {"top_n": 5}),
+    ("top_merchants_by_revenue", {"top_n": 5}),
+]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    """
+    DuckDB над синтетическими данными с DECIMAL-суммами + строки с NULL-суммой, NULL/пустым городом,
+    NULL-мерчантом и NULL-временем; роллапы — те же колонки и INSERT ... SELECT, что у загрузчика (sql/schema.py).
+    """
+    from bench.synth_data import generate
+
+    data_dir = tmp_path_factory.mktemp("rollups")
+    generate(5000, str(data_dir), seed=1, year=YEAR)
+    for path in glob.glob(str(data_dir / "*.parquet")):
+        table = pq.read_table(path)
+        i = table.schema.get_field_index("transaction_amount_kzt")
+        pq.write_table(table.set_column(i, "transaction_amount_kzt", table.column(i).cast(AMOUNT)), path)
+    edge = [
+        (datetime(YEAR, 3, 1, 0, 0, 0), None, "Almaty", 1),
+        (datetime(YEAR, 3, 31, 23, 59, 59), Decimal("10.01"), None, 1),
+        (datetime(YEAR, 4, 1, 0, 0, 0), Decimal("20.05"), "", None),
+        (datetime(YEAR, 12, 31, 23, 59, 59), None, None, None),
+        (None, Decimal("0.07"), "Almaty", 1),
+    ]
+    pq.write_table(pa.table({
+        "transaction_id": [f"edge{i}" for i in range(len(edge))],
+        "transaction_timestamp": pa.array([e[0] for e in edge], type=pa.timestamp("s")),
+        "transaction_amount_kzt": pa.array([e[1] for e in edge], type=AMOUNT),
+        "merchant_city": pa.array([e[2] for e in edge], type=pa.string()),
+        "merchant_id": pa.array([e[3] for e in edge], type=pa.int32()),
+        "mcc_category": pa.array([None] * len(edge), type=pa.string()),
+    }), str(data_dir / "edge.parquet"))
+
+    eng = DuckDBEngine(str(data_dir / "*.parquet"))
+    for table, (key, key_type) in ROLLUPS.items():
+        eng._con.execute(f"CREATE TABLE {table} ({rollup_columns_sql(key, key_type)})")
+        eng._con.execute(_rollup_insert_sql(table, key, "transactions"))
+    yield eng
+    eng.dispose()
+
+
+@pytest.mark.parametrize("intent,params", ROLLUP_CASES)
+def test_rollup_matches_raw(engine, intent, params):
+    rollup = get_sql_by_intent(intent, use_rollups=True, **params)
+    raw = get_sql_by_intent(intent, use_rollups=False, **params)
+    assert "rollup_daily_" in rollup.sql and "rollup_daily_" not in raw.sql
+
+    rollup_cols, rollup_rows = engine.fetch_all(rollup)
+    raw_cols, raw_rows = engine.fetch_all(raw)
+    assert rollup_cols == raw_cols
+    assert rollup_rows == raw_rows   # точно: суммы в роллапах DECIMAL, как в сырых
+
+
+@pytest.mark.parametrize("intent,params", [
+    ("transactions_in_month", {"month": 3}),                    # листинг — роллапы не про него
+    ("transactions_on_date", {"month": 3, "day": 5}),
+    ("decline_rate_by_card", {"card_id": 7}),                  # карты в роллапах нет
+])
+def test_filters_rollups_do_not_cover_go_to_raw(intent, params):
+    stmt = get_sql_by_intent(intent, use_rollups=True, **params)
+    assert stmt is not None and "FROM transactions" in stmt.sql
+
+
+def test_default_follows_detected_rollups():
+    try:
+        query_templates.set_rollups_enabled(True)
+        assert "rollup_daily_mcc" in get_sql_by_intent("count_transactions").sql
+        query_templates.set_rollups_enabled(False)
+        assert "FROM transactions" in get_sql_by_intent("count_transactions").sql
+    finally:
+        query_templates.set_rollups_enabled(False)
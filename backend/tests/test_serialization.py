@@ -0,0 +1,48 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import serialization
+from serialization import dumps, ndjson_lines
+
+ROW = {
+    "transaction_id": "tx-1",
+    "merchant_city": "Алматы",                                   # не-ASCII пишется как есть
+    "transaction_amount_kzt": Decimal("12345.67"),
+    "rounded_total": Decimal("100"),                             # целый Decimal -> int
+    "tiny": Decimal("0.01"),
+    "transaction_timestamp": datetime.datetime(2024, 3, 5, 10, 7, 9, 123456),
+    "whole_second": datetime.datetime(2024, 3, 5, 0, 0),
+    "day": datetime.date(2024, 3, 5),
+    "avg_amount": 1234.5,
+    "card_id": 7,
+    "is_flagged": False,
+    "mcc_category": None,
+}
+PAYLOAD = {"query": "Transactions on March 5, 2024", "count": 1, "result": [ROW], "next_cursor": None}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    """dumps с orjson (если установлен) и запасной путь через stdlib json."""
+    if request.param == "orjson":
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_dumps_matches_jsonable_encoder_response(backend):
+    """Тело /ask мимо jsonable_encoder побайтно то же, что отдавал JSONResponse(jsonable_encoder(...))."""
+    assert dumps(PAYLOAD) == JSONResponse(content=jsonable_encoder(PAYLOAD)).body
+
+
+def test_ndjson_lines_match_encoder(backend):
+    columns, row = list(ROW), tuple(ROW.values())
+    lines = ndjson_lines(columns, [row, row]).splitlines()
+    assert [json.loads(line) for line in lines] == [jsonable_encoder(ROW)] * 2
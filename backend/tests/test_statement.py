@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from engines.duckdb_engine import _duckdb_args
+from sql.query_templates import get_sql_by_intent
+from sql.statement import Statement, as_statement, sql_literal
+
+
+@pytest.mark.parametrize("value,literal", [
+    (None, "NULL"),
+    (True, "1"),
+    (7, "7"),
+    (Decimal("12.50"), "12.50"),
+    (date(2024, 3, 5), "'2024-03-05'"),
+    (datetime(2024, 3, 5, 10, 0, 1), "'2024-03-05 10:00:01'"),
+    ("O'Brien", "'O''Brien'"),
+    ("C:\\x", "'C:\\\\x'"),
+])
+def test_sql_literal(value, literal):
+    assert sql_literal(value) == literal
+
+
+def test_render_substitutes_params_in_order():
+    stmt = Statement("SELECT * FROM transactions WHERE merchant_city = %s AND card_id = %s", ("Almaty", 7))
+    assert stmt.render() == "SELECT * FROM transactions WHERE merchant_city = 'Almaty' AND card_id = 7"
+
+
+def test_render_rejects_placeholder_count_mismatch():
+    with pytest.raises(ValueError):
+        Statement("SELECT %s, %s", (1,)).render()
+
+
+def test_with_limit_binds_for_templates_and_inlines_for_raw_sql():
+    stmt = Statement("SELECT * FROM transactions WHERE card_id = %s;", (7,)).with_limit(10)
+    assert stmt.sql.endswith("LIMIT %s") and stmt.params == (7, 10)
+    assert stmt.render().endswith("card_id = 7 LIMIT 10")
+
+    raw = as_statement("SELECT '100%' AS pct").with_limit(5)
+    assert raw == Statement("SELECT '100%' AS pct LIMIT 5", (), prepare=False)
+    assert raw.render() == raw.sql
+
+
+def test_template_values_are_bound_not_inlined():
+    """Текст шаблона один для разных значений — план переиспользуется; значения идут параметрами."""
+    march = get_sql_by_intent("transactions_on_date", month=3, day=5, year=2024, use_rollups=False)
+    april = get_sql_by_intent("transactions_on_date", month=4, day=1, year=2024, use_rollups=False)
+    assert march.sql == april.sql and march.prepare
+    assert march.params != april.params
+    assert "2024-03-05" not in march.sql and "2024-03-05" in march.render()
+
+    card7 = get_sql_by_intent("decline_rate_by_card", card_id=7)
+    card8 = get_sql_by_intent("decline_rate_by_card", card_id=8)
+    assert card7.sql == card8.sql and 7 in card7.params and 8 in card8.params
+
+
+def test_duckdb_placeholders():
+    assert _duckdb_args(Statement("SELECT %s, %s", (1, "a"))) == ("SELECT ?, ?", [1, "a"])
+    assert _duckdb_args("SELECT 1") == ("SELECT 1",)